@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Stress the Qt console: pipe a large synthetic stream through _run_command
+
+Runs headless on the offscreen Qt platform. Reports how long it takes until
+every line has reached the log and the process exit has been handled, and
+the longest stall of the GUI event loop while the output was streaming.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from PySide6.QtCore import QTimer, QEventLoop
+
+from feedback_ui import FeedbackUI, create_application
+
+def bench(lines: int, project_directory: str) -> dict:
+    create_application()
+    ui = FeedbackUI(project_directory, "Console throughput benchmark")
+    ui._ensure_command_section()
+    ui.command_entry.setText(f'"{sys.executable}" -c "for i in range({lines}): print(\'line\', i, \'x\' * 60)"')
+    ui.show()
+
+    loop = QEventLoop()
+    stalls: list[float] = []
+    last_tick = time.perf_counter()
+
+    def heartbeat():
+        # The gap between ticks is how long the event loop was busy
+        nonlocal last_tick
+        now = time.perf_counter()
+        stalls.append(now - last_tick)
+        last_tick = now
+        if ui.process is None and not ui.flush_timer.isActive():
+            loop.quit()
+
+    timer = QTimer()
+    timer.timeout.connect(heartbeat)
+
+    start = time.perf_counter()
+    ui._run_command()
+    timer.start(5)
+    loop.exec()
+    elapsed = time.perf_counter() - start
+    timer.stop()
+
+    # "$ command" plus every generated line plus the exit message
+    logged = ui.log_buffer.total_lines
+    ui.close()
+    return {
+        "lines": lines,
+        "logged_lines": logged,
+        "seconds": elapsed,
+        "lines_per_second": lines / elapsed,
+        "max_stall_ms": max(stalls) * 1000,
+        "console_blocks": ui.log_text.blockCount(),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress the feedback UI console with a large command output")
+    parser.add_argument("--lines", type=int, default=100000)
+    parser.add_argument("--json", help="Also save the results to this JSON file")
+    args = parser.parse_args()
+
+    result = bench(args.lines, ROOT_DIR)
+    print(
+        f"{result['lines']} lines in {result['seconds']:.2f} s "
+        f"({result['lines_per_second']:.0f} lines/s), "
+        f"max event loop stall {result['max_stall_ms']:.1f} ms, "
+        f"{result['console_blocks']} console blocks"
+    )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+    return result
+
+if __name__ == "__main__":
+    main()
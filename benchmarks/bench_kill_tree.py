@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark kill_tree on deep and wide process trees
+
+Builds a tree of sleeping processes (a chain of the given depth, each
+level also starting fanout-1 leaf children), waits until every process is
+up, then times kill_tree on the root and checks that nothing survived.
+
+--method group starts the root in its own process group, as the UIs and
+the headless runner do, so kill_tree signals the group; walk starts it in
+the benchmark's group, which makes kill_tree walk the tree with psutil.
+--ignore-term makes every process ignore SIGTERM, which measures the
+escalation to SIGKILL after --grace seconds.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+import psutil
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from command_runner import NEW_PROCESS_GROUP, kill_tree
+
+# Each level starts the next level plus some leaves, then sleeps
+NODE = """
+import sys, time, signal, subprocess
+depth, fanout = int(sys.argv[1]), int(sys.argv[2])
+if sys.argv[4] == "1":
+    # Inherited by the sleep leaves through exec
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+if depth > 1:
+    subprocess.Popen([sys.executable, "-c", sys.argv[3], str(depth - 1), str(fanout), sys.argv[3], sys.argv[4]])
+    for _ in range(fanout - 1):
+        subprocess.Popen(["sleep", "600"])
+time.sleep(600)
+"""
+
+def tree_size(depth: int, fanout: int) -> int:
+    return depth + (depth - 1) * (fanout - 1)
+
+def start_tree(depth: int, fanout: int, method: str = "group", ignore_term: bool = False, timeout: float = 60) -> tuple[subprocess.Popen, list[psutil.Process]]:
+    root = subprocess.Popen(
+        [sys.executable, "-c", NODE, str(depth), str(fanout), NODE, "1" if ignore_term else "0"],
+        **(NEW_PROCESS_GROUP if method == "group" else {}),
+    )
+    expected = tree_size(depth, fanout) - 1
+    deadline = time.monotonic() + timeout
+    while True:
+        children = psutil.Process(root.pid).children(recursive=True)
+        if len(children) >= expected:
+            return root, children
+        if time.monotonic() > deadline:
+            kill_tree(root)
+            raise RuntimeError(f"Only {len(children)} of {expected} processes started")
+        time.sleep(0.05)
+
+def bench(depth: int, fanout: int, iterations: int, method: str = "group", ignore_term: bool = False, grace: float = 0.5) -> dict:
+    samples = []
+    survivors = 0
+    for _ in range(iterations):
+        root, children = start_tree(depth, fanout, method, ignore_term)
+        start = time.perf_counter()
+        kill_tree(root, grace=grace)
+        samples.append(time.perf_counter() - start)
+        root.wait()
+        _, alive = psutil.wait_procs(children, timeout=5)
+        survivors += len(alive)
+        for proc in alive:
+            proc.kill()
+    return {
+        "method": method,
+        "ignore_term": ignore_term,
+        "depth": depth,
+        "fanout": fanout,
+        "processes": tree_size(depth, fanout),
+        "iterations": iterations,
+        "mean_ms": statistics.mean(samples) * 1000,
+        "median_ms": statistics.median(samples) * 1000,
+        "max_ms": max(samples) * 1000,
+        "survivors": survivors,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Time kill_tree on process trees")
+    parser.add_argument("--shapes", default="10x1,50x1,10x10", help="Comma-separated DEPTHxFANOUT tree shapes")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--method", choices=("group", "walk", "both"), default="both", help="Signal the process group or walk the tree")
+    parser.add_argument("--ignore-term", action="store_true", help="Processes ignore SIGTERM, so kill_tree has to escalate")
+    parser.add_argument("--grace", type=float, default=0.5, help="Seconds between SIGTERM and SIGKILL")
+    parser.add_argument("--json", help="Also save the results to this JSON file")
+    args = parser.parse_args()
+
+    methods = ("group", "walk") if args.method == "both" else (args.method,)
+    results = []
+    for shape in args.shapes.split(","):
+        depth, fanout = (int(part) for part in shape.split("x"))
+        for method in methods:
+            row = bench(depth, fanout, args.iterations, method, args.ignore_term, args.grace)
+            results.append(row)
+            print(
+                f"{method:<5}  depth {depth:>3} fanout {fanout:>3} ({row['processes']:>4} processes)  "
+                f"mean {row['mean_ms']:8.2f} ms  median {row['median_ms']:8.2f} ms  max {row['max_ms']:8.2f} ms  "
+                f"survivors {row['survivors']}"
+            )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+if __name__ == "__main__":
+    main()
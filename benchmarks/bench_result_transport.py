@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark the UI -> server result handoff: temp file vs framed stdout line
+
+A tiny child process stands in for the UI so the numbers only cover process
+exit plus the result transport, not toolkit startup.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import statistics
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from result_channel import result_transport
+from ui_worker import run_ui_process
+
+# Mimics feedback_ui.py's handling of --output-file / --result-stdout
+CHILD = """
+import sys
+sys.path.insert(0, {root!r})
+from result_channel import write_result, save_result_file
+result = {{"logs": "x" * int(sys.argv[1]), "interactive_feedback": "ok"}}
+if sys.argv[2] == "--result-stdout":
+    write_result(sys.stdout, result)
+else:
+    save_result_file(sys.argv[3], result)
+"""
+
+async def round_trip(log_bytes: int) -> float:
+    start = time.perf_counter()
+    with result_transport() as (transport_args, read_transport_result):
+        args = [sys.executable, "-c", CHILD.format(root=ROOT_DIR), str(log_bytes), *transport_args]
+        returncode, stdout, stderr = await run_ui_process(args)
+        if returncode != 0:
+            raise RuntimeError(stderr)
+        result = read_transport_result(stdout)
+    assert len(result["logs"]) == log_bytes
+    return time.perf_counter() - start
+
+async def bench(transport: str, log_bytes: int, iterations: int) -> dict:
+    os.environ["INTERACTIVE_FEEDBACK_RESULT_TRANSPORT"] = transport
+    await round_trip(log_bytes)  # warm up
+    samples = [await round_trip(log_bytes) for _ in range(iterations)]
+    return {
+        "transport": transport,
+        "log_bytes": log_bytes,
+        "iterations": iterations,
+        "mean_ms": statistics.mean(samples) * 1000,
+        "median_ms": statistics.median(samples) * 1000,
+        "min_ms": min(samples) * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the file and stdout result transports")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--sizes", default="1000,1000000,20000000", help="Comma-separated log sizes in bytes")
+    parser.add_argument("--json", help="Also save the results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    for log_bytes in (int(size) for size in args.sizes.split(",")):
+        for transport in ("file", "stdout"):
+            row = asyncio.run(bench(transport, log_bytes, args.iterations))
+            results.append(row)
+            print(f"{transport:>6} {log_bytes:>10} B  mean {row['mean_ms']:8.2f} ms  median {row['median_ms']:8.2f} ms  min {row['min_ms']:8.2f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark the interactive_feedback tool call end to end with a UI that submits by itself
+
+Calls the tool in-process through a FastMCP client, so the numbers cover
+the server, the UI launch or worker request, the window and the result
+handoff. INTERACTIVE_FEEDBACK_AUTO_SUBMIT makes the window submit as soon
+as it is shown. The first call starts the UI process (cold), the others
+reuse the worker (warm). --no-worker starts a process per call, --standby
+takes each call's process from the pre-started standby pool.
+
+Qt runs on the offscreen platform; tkinter needs a display (Xvfb works).
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import statistics
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ["INTERACTIVE_FEEDBACK_AUTO_SUBMIT"] = "0"
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+def load_server(backend: str, worker_mode: str):
+    # Read at import time by the server modules
+    os.environ["INTERACTIVE_FEEDBACK_WORKER"] = worker_mode
+    if backend == "qt":
+        import server
+    else:
+        import server_tkinter as server
+    return server
+
+async def bench(backend: str, iterations: int, worker_mode: str, pause: float = 0.0) -> dict:
+    from fastmcp import Client
+
+    server = load_server(backend, worker_mode)
+    samples = []
+    async with Client(server.mcp) as client:
+        for i in range(iterations + 1):
+            start = time.perf_counter()
+            await client.call_tool("interactive_feedback", {
+                "project_directory": ROOT_DIR,
+                "summary": f"Round trip benchmark {i}",
+            })
+            samples.append(time.perf_counter() - start)
+            # Gives a standby pool time to start the next process, as a human would
+            await asyncio.sleep(pause)
+    await server.get_session_manager().stop_workers()
+    if worker_mode == "standby":
+        await server.get_standby_pool().close()
+    # The first call starts the UI process; with the worker the rest reuse it
+    first, rest = samples[0], samples[1:]
+    return {
+        "backend": backend,
+        "worker_mode": worker_mode,
+        "iterations": iterations,
+        "first_call_ms": first * 1000,
+        "mean_ms": statistics.mean(rest) * 1000,
+        "median_ms": statistics.median(rest) * 1000,
+        "min_ms": min(rest) * 1000,
+        "max_ms": max(rest) * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Time interactive_feedback tool calls with an auto-submitting UI")
+    parser.add_argument("--backend", choices=("qt", "tkinter"), default="qt")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--no-worker", action="store_true", help="Start a fresh UI process for every call")
+    parser.add_argument("--standby", action="store_true", help="Take a fresh pre-started UI process from the standby pool for every call (PySide6)")
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to wait between calls")
+    parser.add_argument("--json", help="Also save the results to this JSON file")
+    args = parser.parse_args()
+
+    worker_mode = "standby" if args.standby else "0" if args.no_worker else "1"
+    result = asyncio.run(bench(args.backend, args.iterations, worker_mode, args.pause))
+    mode = {"1": "worker", "0": "process per call", "standby": "standby pool"}[worker_mode]
+    print(
+        f"{result['backend']} ({mode}): "
+        f"first call {result['first_call_ms']:.1f} ms, then mean {result['mean_ms']:.1f} ms "
+        f"median {result['median_ms']:.1f} ms min {result['min_ms']:.1f} ms max {result['max_ms']:.1f} ms"
+    )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+    return result
+
+if __name__ == "__main__":
+    main()
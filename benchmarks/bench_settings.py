@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark SettingsManager with many project groups
+
+For each store size a legacy settings.json with that many project groups is
+migrated, then the operations of one window lifetime are timed on a fresh
+manager: loading a project's settings, saving a change, and close() with
+its index update and garbage collection. The server-side SettingsSnapshot
+lookup is timed as well.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from settings_manager import SettingsManager, SettingsSnapshot, get_project_settings_group
+
+def write_legacy_store(settings_dir: str, groups: int) -> list[str]:
+    projects = [f"/home/user/src/project{i}" for i in range(groups)]
+    legacy = {
+        get_project_settings_group(project): {
+            "run_command": f"make test PROJECT={i}",
+            "execute_automatically": False,
+            "commandSectionVisible": True,
+        }
+        for i, project in enumerate(projects)
+    }
+    legacy["MainWindow_General"] = {"geometry": "800x600+100+100", "windowState": "normal"}
+    with open(os.path.join(settings_dir, "settings.json"), "w") as f:
+        json.dump(legacy, f)
+    return projects
+
+def timed(samples: list[float], func):
+    start = time.perf_counter()
+    value = func()
+    samples.append(time.perf_counter() - start)
+    return value
+
+def summarize(samples: list[float]) -> dict:
+    return {
+        "mean_ms": statistics.mean(samples) * 1000,
+        "median_ms": statistics.median(samples) * 1000,
+        "max_ms": max(samples) * 1000,
+    }
+
+def bench(groups: int, iterations: int) -> dict:
+    with tempfile.TemporaryDirectory() as settings_dir:
+        projects = write_legacy_store(settings_dir, groups)
+
+        migrate = []
+        timed(migrate, lambda: SettingsManager("Bench", "Bench", settings_dir=settings_dir)).close()
+
+        load, save, close, snapshot = [], [], [], []
+        lookups = SettingsSnapshot("Bench", "Bench", settings_dir=settings_dir)
+        for i in range(iterations):
+            project_group = get_project_settings_group(projects[i * 7 % groups])
+
+            def open_window():
+                manager = SettingsManager("Bench", "Bench", save_delay=60, settings_dir=settings_dir)
+                with manager.beginGroup(project_group):
+                    manager.value("run_command", "", type=str)
+                with manager.beginGroup("MainWindow_General"):
+                    manager.value("geometry")
+                return manager
+
+            manager = timed(load, open_window)
+
+            def save_command():
+                with manager.beginGroup(project_group):
+                    manager.setValue("run_command", f"make test ITERATION={i}")
+                manager.flush()
+
+            timed(save, save_command)
+            timed(close, manager.close)
+            timed(snapshot, lambda: lookups.project_settings(projects[i * 7 % groups]))
+
+    return {
+        "groups": groups,
+        "iterations": iterations,
+        "migrate_ms": migrate[0] * 1000,
+        "load": summarize(load),
+        "save": summarize(save),
+        "close": summarize(close),
+        "snapshot_lookup": summarize(snapshot),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Time SettingsManager load/save with many project groups")
+    parser.add_argument("--groups", default="10,1000,10000", help="Comma-separated numbers of project groups")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--json", help="Also save the results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    for groups in (int(count) for count in args.groups.split(",")):
+        row = bench(groups, args.iterations)
+        results.append(row)
+        print(
+            f"{groups:>6} groups  migrate {row['migrate_ms']:8.1f} ms  "
+            f"load {row['load']['median_ms']:6.2f} ms  save {row['save']['median_ms']:6.2f} ms  "
+            f"close {row['close']['median_ms']:7.2f} ms  snapshot {row['snapshot_lookup']['median_ms']:6.3f} ms"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+if __name__ == "__main__":
+    main()
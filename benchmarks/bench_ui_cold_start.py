@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark UI cold start: launch a fresh UI process until its result is back
+
+The window submits as soon as it is shown (INTERACTIVE_FEEDBACK_AUTO_SUBMIT),
+so every sample is process start, imports, window build, first paint and
+the result handoff. For the Qt UI the per-phase startup breakdown the UI
+reports with its result is averaged as well.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from result_channel import read_result
+from ui_worker import run_ui_process
+
+SCRIPTS = {
+    "qt": "feedback_ui.py",
+    "tkinter": "feedback_ui_tkinter.py",
+}
+
+async def launch(backend: str, env: dict) -> tuple[float, dict]:
+    args = [
+        sys.executable, "-u", os.path.join(ROOT_DIR, SCRIPTS[backend]),
+        "--project-directory", ROOT_DIR,
+        "--prompt", "Cold start benchmark",
+        "--result-stdout",
+    ]
+    start = time.perf_counter()
+    returncode, stdout, stderr = await run_ui_process(args, env=env)
+    elapsed = time.perf_counter() - start
+    if returncode != 0:
+        raise RuntimeError(stderr)
+    return elapsed, read_result(stdout)
+
+async def bench(backend: str, iterations: int) -> dict:
+    with tempfile.TemporaryDirectory() as metrics_dir:
+        env = os.environ.copy()
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+        env["INTERACTIVE_FEEDBACK_AUTO_SUBMIT"] = "0"
+        # Makes the Qt UI time its startup phases and send them with the result
+        env["INTERACTIVE_FEEDBACK_METRICS_DIR"] = metrics_dir
+
+        await launch(backend, env)  # warm up the OS file cache
+        samples = []
+        phases: dict[str, list[float]] = {}
+        for _ in range(iterations):
+            elapsed, result = await launch(backend, env)
+            samples.append(elapsed)
+            for phase, seconds in result.get("timing", {}).get("startup", {}).items():
+                phases.setdefault(phase, []).append(seconds)
+
+    return {
+        "backend": backend,
+        "iterations": iterations,
+        "mean_ms": statistics.mean(samples) * 1000,
+        "median_ms": statistics.median(samples) * 1000,
+        "min_ms": min(samples) * 1000,
+        "max_ms": max(samples) * 1000,
+        "phases_mean_ms": {phase: statistics.mean(values) * 1000 for phase, values in phases.items()},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Time UI process cold starts")
+    parser.add_argument("--backend", choices=tuple(SCRIPTS), default="qt")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--json", help="Also save the results to this JSON file")
+    args = parser.parse_args()
+
+    result = asyncio.run(bench(args.backend, args.iterations))
+    print(
+        f"{result['backend']}: mean {result['mean_ms']:.1f} ms median {result['median_ms']:.1f} ms "
+        f"min {result['min_ms']:.1f} ms max {result['max_ms']:.1f} ms"
+    )
+    for phase, ms in result["phases_mean_ms"].items():
+        print(f"  {phase:<20} {ms:8.1f} ms")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+    return result
+
+if __name__ == "__main__":
+    main()
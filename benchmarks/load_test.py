@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Load test the MCP server: drive many interactive_feedback calls through it
+
+The server answers from a scripted responder (feedback_ui_scripted.py)
+instead of a window, so no human or display is needed. By default the
+server runs as a subprocess over stdio, exactly as an MCP client would
+start it; --transport memory calls it in-process instead. Reports
+throughput and the latency distribution of the whole pipeline.
+
+Without --script every call is answered immediately, which measures the
+server's own overhead. Pass a responder script with latency distributions
+to simulate humans.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+SERVERS = {
+    "qt": "server.py",
+    "tkinter": "server_tkinter.py",
+}
+
+def percentile(sorted_samples: list[float], fraction: float) -> float:
+    index = min(len(sorted_samples) - 1, max(0, round(fraction * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+def server_env(script: str, concurrency: int, use_worker: bool) -> dict[str, str]:
+    env = os.environ.copy()
+    env["INTERACTIVE_FEEDBACK_SCRIPT"] = script
+    env["INTERACTIVE_FEEDBACK_MAX_SESSIONS"] = str(concurrency)
+    env["INTERACTIVE_FEEDBACK_WORKER"] = "1" if use_worker else "0"
+    return env
+
+def load_server(server: str, env: dict[str, str]):
+    # In-process: the server module reads its settings from the environment on import
+    os.environ.update(env)
+    if server == "qt":
+        import server as module
+    else:
+        import server_tkinter as module
+    return module
+
+async def run_load(client, calls: int, concurrency: int) -> tuple[list[float], int, float]:
+    latencies: list[float] = []
+    errors = 0
+    next_call = 0
+
+    async def caller():
+        nonlocal next_call, errors
+        while next_call < calls:
+            call = next_call
+            next_call += 1
+            start = time.perf_counter()
+            try:
+                await client.call_tool("interactive_feedback", {
+                    "project_directory": ROOT_DIR,
+                    "summary": f"Load test call {call}",
+                })
+            except Exception as e:
+                errors += 1
+                print(f"Call {call} failed: {e}", file=sys.stderr)
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+async def bench(server: str, transport: str, calls: int, concurrency: int, script: str, use_worker: bool, warmup: int) -> dict:
+    from fastmcp import Client
+    from fastmcp.client.transports import PythonStdioTransport
+
+    env = server_env(script, concurrency, use_worker)
+    module = None
+    if transport == "stdio":
+        client = Client(PythonStdioTransport(os.path.join(ROOT_DIR, SERVERS[server]), env=env, cwd=ROOT_DIR))
+    else:
+        module = load_server(server, env)
+        client = Client(module.mcp)
+    async with client:
+        # Start the server's UI workers before measuring
+        await run_load(client, warmup, concurrency)
+        latencies, errors, elapsed = await run_load(client, calls, concurrency)
+    if module is not None:
+        await module.get_session_manager().stop_workers()
+
+    latencies.sort()
+    result = {
+        "server": server,
+        "transport": transport,
+        "worker": use_worker,
+        "calls": calls,
+        "concurrency": concurrency,
+        "errors": errors,
+        "seconds": elapsed,
+        "calls_per_second": len(latencies) / elapsed,
+    }
+    if latencies:
+        result.update({
+            "mean_ms": statistics.mean(latencies) * 1000,
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p90_ms": percentile(latencies, 0.90) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "max_ms": latencies[-1] * 1000,
+        })
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive interactive_feedback calls through the server with a scripted responder")
+    parser.add_argument("--server", choices=tuple(SERVERS), default="qt")
+    parser.add_argument("--transport", choices=("stdio", "memory"), default="stdio")
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=4, help="Calls in flight, also the server's window limit")
+    parser.add_argument("--script", help="Responder script (default: answer every call immediately)")
+    parser.add_argument("--warmup", type=int, default=10, help="Calls made before measuring")
+    parser.add_argument("--no-worker", action="store_true", help="Start a responder process for every call")
+    parser.add_argument("--json", help="Also save the results to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        script = args.script
+        if script is None:
+            script = os.path.join(tmp_dir, "responder.json")
+            with open(script, "w") as f:
+                json.dump({"responses": ["Load test reply {call}"]}, f)
+        result = asyncio.run(bench(
+            args.server, args.transport, args.calls, args.concurrency,
+            os.path.abspath(script), not args.no_worker, args.warmup,
+        ))
+
+    print(
+        f"{result['calls']} calls ({result['concurrency']} concurrent, {result['errors']} errors) "
+        f"in {result['seconds']:.2f} s: {result['calls_per_second']:.1f} calls/s"
+    )
+    if "mean_ms" in result:
+        print(
+            f"latency mean {result['mean_ms']:.1f} ms  p50 {result['p50_ms']:.1f} ms  "
+            f"p90 {result['p90_ms']:.1f} ms  p99 {result['p99_ms']:.1f} ms  max {result['max_ms']:.1f} ms"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+    return result
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Run the benchmark suite headless and save all results to one JSON file
+
+Every benchmark runs in its own process. Qt uses the offscreen platform
+plugin. tkinter needs an X display: without one a private Xvfb is started
+when it is installed, otherwise the tkinter benchmarks are skipped.
+
+Results go to benchmarks/results/<UTC timestamp>.json together with the
+commit, Python version and platform. Pass --compare with an earlier file
+to print how every timing changed.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from contextlib import contextmanager
+from typing import Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+# name -> (script, arguments, needs an X display)
+BENCHMARKS = {
+    "result_transport": ("bench_result_transport.py", ["--iterations", "10"], False),
+    "console_throughput": ("bench_console_throughput.py", ["--lines", "100000"], False),
+    "ui_cold_start_qt": ("bench_ui_cold_start.py", ["--backend", "qt"], False),
+    "ui_cold_start_tkinter": ("bench_ui_cold_start.py", ["--backend", "tkinter"], True),
+    "round_trip_qt": ("bench_round_trip.py", ["--backend", "qt"], False),
+    "round_trip_qt_standby": ("bench_round_trip.py", ["--backend", "qt", "--standby", "--pause", "0.5"], False),
+    "round_trip_tkinter": ("bench_round_trip.py", ["--backend", "tkinter"], True),
+    "settings": ("bench_settings.py", [], False),
+    "kill_tree": ("bench_kill_tree.py", [], False),
+    "load_test": ("load_test.py", ["--calls", "1000"], False),
+}
+
+@contextmanager
+def x_display():
+    """Yield a usable DISPLAY, or None when tkinter can't open a window"""
+    if sys.platform != "linux" or os.environ.get("DISPLAY"):
+        yield os.environ.get("DISPLAY", "")
+        return
+    xvfb = shutil.which("Xvfb")
+    if xvfb is None:
+        yield None
+        return
+    display = f":{os.getpid() % 1000 + 100}"
+    process = subprocess.Popen(
+        [xvfb, display, "-screen", "0", "1280x1024x24", "-nolisten", "tcp"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        # Xvfb creates its socket once it accepts connections
+        socket_path = f"/tmp/.X11-unix/X{display[1:]}"
+        deadline = time.monotonic() + 10
+        while not os.path.exists(socket_path) and process.poll() is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+        yield display if os.path.exists(socket_path) else None
+    finally:
+        process.terminate()
+        process.wait()
+
+def run_benchmark(name: str, env: dict) -> dict:
+    script, args, _ = BENCHMARKS[name]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output = os.path.join(tmp_dir, "result.json")
+        start = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, os.path.join(BENCH_DIR, script), *args, "--json", output],
+            cwd=ROOT_DIR, env=env, capture_output=True, text=True,
+        )
+        elapsed = time.perf_counter() - start
+        if completed.returncode != 0 or not os.path.exists(output):
+            return {"error": (completed.stderr.strip().splitlines() or [f"exit code {completed.returncode}"])[-1]}
+        print(completed.stdout.rstrip())
+        with open(output) as f:
+            return {"wall_seconds": elapsed, "result": json.load(f)}
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def timings(value, path: str = "") -> dict[str, float]:
+    """Flatten a result to {path: value} for every millisecond or seconds field"""
+    found = {}
+    if isinstance(value, dict):
+        for key, item in value.items():
+            found.update(timings(item, f"{path}.{key}" if path else key))
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            found.update(timings(item, f"{path}[{i}]"))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        if path.endswith("_ms") or path.endswith("seconds"):
+            found[path] = value
+    return found
+
+def compare(previous: dict, current: dict):
+    old, new = timings(previous["benchmarks"]), timings(current["benchmarks"])
+    print(f"\nCompared with {previous.get('commit') or 'unknown commit'} ({previous.get('timestamp')})")
+    for path in sorted(set(old) & set(new)):
+        if old[path] > 0:
+            change = (new[path] - old[path]) / old[path] * 100
+            print(f"{path:<70} {old[path]:10.2f} -> {new[path]:10.2f}  {change:+6.1f}%")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite and save the results as JSON")
+    parser.add_argument("--only", help="Comma-separated benchmarks to run: " + ", ".join(BENCHMARKS))
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown)}")
+
+    timestamp = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+    report = {
+        "timestamp": timestamp,
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "benchmarks": {},
+    }
+    env = os.environ.copy()
+    env["QT_QPA_PLATFORM"] = "offscreen"
+    # On Linux this keeps the benchmarks away from the user's real settings
+    with tempfile.TemporaryDirectory() as config_home, x_display() as display:
+        env["XDG_CONFIG_HOME"] = config_home
+        if display:
+            env["DISPLAY"] = display
+        for name in names:
+            print(f"== {name}")
+            if BENCHMARKS[name][2] and display is None:
+                print("skipped: no X display and no Xvfb")
+                report["benchmarks"][name] = {"skipped": "no X display"}
+                continue
+            report["benchmarks"][name] = run_benchmark(name, env)
+            if "error" in report["benchmarks"][name]:
+                print(f"failed: {report['benchmarks'][name]['error']}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{timestamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,676 @@
+# Command execution shared by the feedback UIs and the headless runner
+# Process-tree killing, the user's environment and an asyncio runner that
+# executes a project's command without a window
+import os
+import re
+import sys
+import time
+import codecs
+import signal
+import asyncio
+import subprocess
+import threading
+from typing import Callable, Optional, TypedDict
+
+from log_store import LogStore
+from ui_worker import EventHandler
+
+# Output is forwarded to the event handler at most this often (seconds)
+STREAM_INTERVAL = 0.25
+# Larger batches only forward their end; the full output is in the result
+STREAM_MAX_CHARS = 64 * 1024
+READ_CHUNK_SIZE = 64 * 1024
+# A line without a newline is cut after this many characters
+MAX_LINE_LENGTH = 64 * 1024
+DEFAULT_TIMEOUT = 600.0
+
+# Set INTERACTIVE_FEEDBACK_PTY=1 to run commands on pseudo-terminals (Linux), so
+# tools that buffer or drop progress output on pipes stream it line by line
+PTY_SUPPORTED = sys.platform.startswith("linux")
+# Size the pseudo-terminals report to the command
+PTY_ROWS, PTY_COLUMNS = 50, 120
+
+# CSI (colours, cursor movement) and OSC (titles, links) sequences, plus the
+# two-character escapes; see AnsiFilter
+ANSI_ESCAPE = re.compile(r"\x1b(?:\[[0-?]*[ -/]*[@-~]|\][^\x07\x1b]*(?:\x07|\x1b\\)|[@-Z\\-_])")
+
+# Seconds a command gets to exit after SIGTERM before it is killed
+KILL_GRACE_SECONDS = 2.0
+# While it does, whether it exited is checked after this long, then ever less often
+KILL_POLL_SECONDS = 0.01
+KILL_POLL_MAX_SECONDS = 0.25
+
+# Popen arguments that start a command in a process group of its own, so
+# kill_tree can signal the whole tree in one call
+if sys.platform == "win32":
+    NEW_PROCESS_GROUP = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+else:
+    NEW_PROCESS_GROUP = {"start_new_session": True}
+
+def kill_tree(process: subprocess.Popen, grace: float = KILL_GRACE_SECONDS, wait: bool = True):
+    """Stop a command and everything it started: SIGTERM, then SIGKILL after grace seconds
+
+    A command started with NEW_PROCESS_GROUP on POSIX is signalled as a
+    whole process group, so children forked while it is being stopped
+    can't escape, and no process table walk is needed. Anything else
+    (Windows, or a process that isn't a group leader) falls back to
+    walking its children with psutil. Either way the command is reaped.
+
+    With wait=False the escalation runs on a background thread, so a GUI
+    doesn't freeze while a stubborn command gets its grace period.
+    """
+    if wait:
+        _kill_tree(process, grace)
+    else:
+        threading.Thread(target=_kill_tree, args=(process, grace), daemon=True).start()
+
+def _kill_tree(process: subprocess.Popen, grace: float):
+    if sys.platform != "win32":
+        try:
+            pgid = os.getpgid(process.pid)
+        except ProcessLookupError:
+            # Already exited and reaped
+            return
+        if pgid == process.pid:
+            _kill_process_group(process, grace)
+            return
+    _kill_children(process, grace)
+
+def _kill_process_group(process: subprocess.Popen, grace: float):
+    pgid = process.pid
+    try:
+        os.killpg(pgid, signal.SIGTERM)
+    except ProcessLookupError:
+        return
+    deadline = time.monotonic() + grace
+    # Checks back off exponentially, a group that ignores SIGTERM costs a few checks
+    delay = KILL_POLL_SECONDS
+    while True:
+        # Reap the leader, a zombie would keep the group alive
+        process.poll()
+        try:
+            # Signal 0 only checks whether anything is left in the group
+            os.killpg(pgid, 0)
+        except ProcessLookupError:
+            return
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, KILL_POLL_MAX_SECONDS)
+        if process.returncode is not None and delay >= 4 * KILL_POLL_SECONDS and not _group_has_live_members(pgid):
+            # Only unreaped orphans left, e.g. under a container init that doesn't reap
+            return
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    process.wait()
+
+def _group_has_live_members(pgid: int) -> bool:
+    """Whether a process group has a member that isn't a zombie (Linux /proc; True elsewhere)
+
+    Walks the whole process table, so it is only used once killpg(pgid, 0)
+    has kept succeeding for a while.
+    """
+    try:
+        pids = [name for name in os.listdir("/proc") if name.isdigit()]
+    except OSError:
+        return True
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat", "rb") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces, the fields after it don't
+        fields = stat[stat.rfind(b")") + 2:].split()
+        if int(fields[2]) == pgid and fields[0] != b"Z":
+            return True
+    return False
+
+def _kill_children(process: subprocess.Popen, grace: float):
+    # Imported on first use: most feedback rounds never run a command
+    import psutil
+
+    try:
+        parent = psutil.Process(process.pid)
+        procs = [parent, *parent.children(recursive=True)]
+    except psutil.Error:
+        return
+    for proc in procs:
+        try:
+            proc.terminate()
+        except psutil.Error:
+            pass
+    _, alive = psutil.wait_procs(procs, timeout=grace)
+    for proc in alive:
+        try:
+            proc.kill()
+        except psutil.Error:
+            pass
+    psutil.wait_procs(alive, timeout=grace)
+    try:
+        process.wait(timeout=grace)
+    except subprocess.TimeoutExpired:
+        pass
+
+_environment_snapshot: Optional[dict[str, str]] = None
+_environment_lock = threading.Lock()
+
+def get_user_environment(overlay: Optional[dict[str, str]] = None) -> dict[str, str]:
+    """The environment commands run with: the user's environment plus overlay
+
+    The user's environment is read once and cached until
+    refresh_user_environment(); every call returns a fresh dict.
+    """
+    global _environment_snapshot
+    snapshot = _environment_snapshot
+    if snapshot is None:
+        with _environment_lock:
+            if _environment_snapshot is None:
+                _environment_snapshot = _read_user_environment()
+            snapshot = _environment_snapshot
+    env = dict(snapshot)
+    if overlay:
+        env.update(overlay)
+    return env
+
+def refresh_user_environment():
+    """Read the user's environment again on the next command"""
+    global _environment_snapshot
+    with _environment_lock:
+        _environment_snapshot = None
+
+def prewarm_user_environment():
+    """Read the user's environment in the background so the first command doesn't wait"""
+    threading.Thread(target=get_user_environment, daemon=True).start()
+
+def parse_environment(text: str) -> dict[str, str]:
+    """Parse a project's environment overlay: shell-style NAME=value assignments
+
+    Values may be quoted, e.g. 'RUST_LOG=debug PYTHONPATH="src lib"'.
+    Raises ValueError on unbalanced quotes or an item without "=".
+    """
+    import shlex
+
+    overlay = {}
+    for item in shlex.split(text, comments=True):
+        name, sep, value = item.partition("=")
+        if not sep or not name:
+            raise ValueError(f"Not a NAME=value assignment: {item}")
+        overlay[name] = value
+    return overlay
+
+def _read_user_environment() -> dict[str, str]:
+    if sys.platform != "win32":
+        return os.environ.copy()
+
+    import ctypes
+    from ctypes import wintypes
+
+    # Load required DLLs
+    advapi32 = ctypes.WinDLL("advapi32")
+    userenv = ctypes.WinDLL("userenv")
+    kernel32 = ctypes.WinDLL("kernel32")
+
+    # Constants
+    TOKEN_QUERY = 0x0008
+
+    # Function prototypes
+    OpenProcessToken = advapi32.OpenProcessToken
+    OpenProcessToken.argtypes = [wintypes.HANDLE, wintypes.DWORD, ctypes.POINTER(wintypes.HANDLE)]
+    OpenProcessToken.restype = wintypes.BOOL
+
+    CreateEnvironmentBlock = userenv.CreateEnvironmentBlock
+    CreateEnvironmentBlock.argtypes = [ctypes.POINTER(ctypes.c_void_p), wintypes.HANDLE, wintypes.BOOL]
+    CreateEnvironmentBlock.restype = wintypes.BOOL
+
+    DestroyEnvironmentBlock = userenv.DestroyEnvironmentBlock
+    DestroyEnvironmentBlock.argtypes = [wintypes.LPVOID]
+    DestroyEnvironmentBlock.restype = wintypes.BOOL
+
+    GetCurrentProcess = kernel32.GetCurrentProcess
+    GetCurrentProcess.argtypes = []
+    GetCurrentProcess.restype = wintypes.HANDLE
+
+    CloseHandle = kernel32.CloseHandle
+    CloseHandle.argtypes = [wintypes.HANDLE]
+    CloseHandle.restype = wintypes.BOOL
+
+    # Get process token
+    token = wintypes.HANDLE()
+    if not OpenProcessToken(GetCurrentProcess(), TOKEN_QUERY, ctypes.byref(token)):
+        raise RuntimeError("Failed to open process token")
+
+    try:
+        # Create environment block
+        environment = ctypes.c_void_p()
+        if not CreateEnvironmentBlock(ctypes.byref(environment), token, False):
+            raise RuntimeError("Failed to create environment block")
+
+        try:
+            return _parse_environment_block(environment.value)
+        finally:
+            DestroyEnvironmentBlock(environment)
+
+    finally:
+        CloseHandle(token)
+
+def _parse_environment_block(address: int) -> dict[str, str]:
+    """Read a Windows environment block: NAME=value strings, each NUL-terminated, ending with an empty one"""
+    import ctypes
+
+    result = {}
+    offset = 0
+    while True:
+        # wstring_at finds the terminator in C, so the block is read in one pass
+        entry = ctypes.wstring_at(address + offset)
+        if not entry:
+            break
+        # Step over the entry in UTF-16 code units, characters outside the BMP take two
+        offset += len(entry.encode("utf-16-le")) + 2
+        # Names of the per-drive current directories ("=C:=C:\\src") start with "="
+        equal_index = entry.find("=", 1)
+        if equal_index == -1:
+            continue
+        result[entry[:equal_index]] = entry[equal_index + 1:]
+    return result
+
+def use_pty() -> bool:
+    return PTY_SUPPORTED and os.environ.get("INTERACTIVE_FEEDBACK_PTY", "0") == "1"
+
+def _open_pty() -> tuple[int, int]:
+    import pty
+    import fcntl
+    import struct
+    import termios
+
+    master, slave = pty.openpty()
+    attrs = termios.tcgetattr(slave)
+    # No output processing: "\n" stays "\n" instead of becoming "\r\n"
+    attrs[1] &= ~termios.OPOST
+    termios.tcsetattr(slave, termios.TCSANOW, attrs)
+    fcntl.ioctl(slave, termios.TIOCSWINSZ, struct.pack("HHHH", PTY_ROWS, PTY_COLUMNS, 0, 0))
+    return master, slave
+
+def start_command(
+    command: str,
+    cwd: str,
+    stdin=None,
+    pty: Optional[bool] = None,
+    environment: Optional[dict[str, str]] = None,
+) -> subprocess.Popen:
+    """Start a shell command for a PipeReader: own process group, the user's environment
+
+    stdout and stderr are binary pipes, or with pty (default: use_pty())
+    one pseudo-terminal each, so the command sees a terminal but the two
+    streams can still be told apart. process.stdout/stderr are then the
+    terminals' master ends. environment is the project's overlay.
+    """
+    if pty is None:
+        pty = use_pty()
+    env = get_user_environment(environment)
+    if not pty:
+        return subprocess.Popen(
+            command,
+            shell=True,
+            cwd=cwd,
+            stdin=stdin,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=env,
+            bufsize=0,
+            close_fds=True,
+            **NEW_PROCESS_GROUP,
+        )
+
+    stdout_master, stdout_slave = _open_pty()
+    stderr_master, stderr_slave = _open_pty()
+    try:
+        process = subprocess.Popen(
+            command,
+            shell=True,
+            cwd=cwd,
+            stdin=stdin,
+            stdout=stdout_slave,
+            stderr=stderr_slave,
+            env=env,
+            close_fds=True,
+            **NEW_PROCESS_GROUP,
+        )
+    except BaseException:
+        os.close(stdout_master)
+        os.close(stderr_master)
+        raise
+    finally:
+        # Only the command may hold the terminals open, or reading never ends
+        os.close(stdout_slave)
+        os.close(stderr_slave)
+    process.stdout = open(stdout_master, "rb", buffering=0)
+    process.stderr = open(stderr_master, "rb", buffering=0)
+    return process
+
+class AnsiFilter:
+    """Turns terminal output into plain lines for the console and the logs
+
+    Escape sequences (colours, cursor movement, titles) are removed and a
+    line that was redrawn with "\r" (progress bars, spinners) keeps only
+    what was drawn last. It works on complete lines, each at most
+    MAX_LINE_LENGTH characters, with one regex pass, and lines without an
+    ESC or "\r" are passed through after a single find, so the cost per
+    line is bounded however much a tool redraws.
+    """
+
+    def __call__(self, text: str) -> str:
+        if "\x1b" in text:
+            text = ANSI_ESCAPE.sub("", text)
+        if "\r" not in text:
+            return text
+        lines = []
+        for line in text.split("\n"):
+            # A terminal shows what follows the last carriage return
+            line = line.rstrip("\r")
+            lines.append(line[line.rfind("\r") + 1:])
+        return "\n".join(lines)
+
+class CommandResult(TypedDict):
+    command: str
+    exit_code: Optional[int]
+    timed_out: bool
+    duration_seconds: float
+    logs: str
+    truncated: bool
+    total_lines: int
+    total_bytes: int
+    stderr_lines: int
+
+def keep_last_lines(text: str, max_lines: int) -> str:
+    """The last max_lines lines of text, after a marker counting the skipped ones"""
+    lines = text.split("\n")
+    # A final newline doesn't start another line
+    count = len(lines) - (lines[-1] == "")
+    if count <= max_lines:
+        return text
+    skipped = count - max_lines
+    return f"... {skipped} lines skipped ...\n" + "\n".join(lines[skipped:])
+
+class OutputThrottle:
+    """Batches command output that is forwarded to the server
+
+    take() hands out at most one batch per STREAM_INTERVAL seconds, and a
+    batch keeps only its last STREAM_MAX_CHARS characters after a
+    "... N characters skipped ..." marker; the full output is in the result.
+    add() may be called from any thread.
+    """
+
+    def __init__(self, interval: float = STREAM_INTERVAL, max_chars: int = STREAM_MAX_CHARS):
+        self.interval = interval
+        self.max_chars = max_chars
+        self._pending: list[str] = []
+        self._size = 0
+        self._skipped = 0
+        self._taken_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def add(self, text: str):
+        with self._lock:
+            self._pending.append(text)
+            self._size += len(text)
+            # Don't hold on to more than the next batch can use
+            if self._size > 2 * self.max_chars:
+                text = "".join(self._pending)
+                self._skipped += len(text) - self.max_chars
+                self._pending = [text[-self.max_chars:]]
+                self._size = self.max_chars
+
+    def take(self, force: bool = True) -> str:
+        """The pending output as one batch, "" if there is none
+
+        Without force, also "" while the last batch is less than interval old.
+        """
+        with self._lock:
+            if not self._pending:
+                return ""
+            now = time.monotonic()
+            if not force and now - self._taken_at < self.interval:
+                return ""
+            text = "".join(self._pending)
+            skipped = self._skipped + max(len(text) - self.max_chars, 0)
+            self._pending, self._size, self._skipped = [], 0, 0
+            self._taken_at = now
+        if skipped:
+            text = f"... {skipped} characters skipped ...\n" + text[-self.max_chars:]
+        return text
+
+class _OutputSink:
+    """Collects output into a LogStore and batches it for the event handler
+
+    write() is called from the reader thread, flush() from the event loop.
+    """
+
+    def __init__(self, log_buffer: LogStore, on_event: Optional[EventHandler]):
+        self.log_buffer = log_buffer
+        self.on_event = on_event
+        self._throttle = OutputThrottle()
+
+    def write(self, text: str, stream: str = "info"):
+        self.log_buffer.append(text, stream)
+        if self.on_event is not None:
+            self._throttle.add(text)
+
+    async def flush(self):
+        text = self._throttle.take()
+        if text:
+            await self.on_event({"type": "output", "text": text})
+
+    async def forward(self):
+        # Runs until cancelled once the command is done
+        while True:
+            await asyncio.sleep(STREAM_INTERVAL)
+            await self.flush()
+
+class PipeReader:
+    """Reads a command's stdout and stderr on a single thread
+
+    Both pipes are read in large byte chunks as soon as data arrives
+    (selectors on POSIX) and decoded incrementally as UTF-8, so a
+    character split between two reads is kept intact and invalid bytes
+    become U+FFFD instead of disappearing. on_output(stream, text) gets
+    complete lines tagged "stdout" or "stderr"; a line longer than
+    MAX_LINE_LENGTH is cut. Terminal escapes and redrawn line parts are
+    removed by an AnsiFilter. Once the command exited and the pipes are
+    drained, or DRAIN_SECONDS later if background children keep them open,
+    the pipes are closed and on_exit(exit_code) is called, always last.
+
+    Pass binary pipes (no text=True) with bufsize=0, as start_command does.
+    """
+
+    # How long the pipes are drained after the command exited
+    DRAIN_SECONDS = 1.0
+    # How often the reader checks for exit and stop() while the pipes are quiet
+    POLL_SECONDS = 0.05
+
+    def __init__(
+        self,
+        process: subprocess.Popen,
+        on_output: Callable[[str, str], None],
+        on_exit: Optional[Callable[[int], None]] = None,
+    ):
+        self.process = process
+        self.on_output = on_output
+        self.on_exit = on_exit
+        self._pipes = {
+            stream: pipe
+            for stream, pipe in (("stdout", process.stdout), ("stderr", process.stderr))
+            if pipe is not None
+        }
+        self._decoders = {stream: codecs.getincrementaldecoder("utf-8")(errors="replace") for stream in self._pipes}
+        self._partial = {stream: "" for stream in self._pipes}
+        self._filter = AnsiFilter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> "PipeReader":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop reading and drop unread output; on_exit still runs once the command exited"""
+        self._stopped.set()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the reader to finish; True once it has"""
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def _feed(self, stream: str, chunk: bytes, final: bool = False):
+        text = self._partial[stream] + self._decoders[stream].decode(chunk, final=final)
+        cut = len(text) if final else text.rfind("\n") + 1
+        if not cut and len(text) > MAX_LINE_LENGTH:
+            cut = len(text)
+        self._partial[stream] = text[cut:]
+        if cut:
+            text = self._filter(text[:cut])
+            if text:
+                self.on_output(stream, text)
+
+    def _run(self):
+        try:
+            if sys.platform == "win32":
+                self._read_threaded()
+            else:
+                self._read_selector()
+        finally:
+            for stream, pipe in self._pipes.items():
+                if not self._stopped.is_set():
+                    self._feed(stream, b"", final=True)
+                pipe.close()
+            exit_code = self.process.wait()
+            if self.on_exit is not None:
+                self.on_exit(exit_code)
+
+    def _read_selector(self):
+        import selectors
+
+        with selectors.DefaultSelector() as selector:
+            for stream, pipe in self._pipes.items():
+                selector.register(pipe, selectors.EVENT_READ, stream)
+            drain_until = None
+            while selector.get_map() and not self._stopped.is_set():
+                if drain_until is None and self.process.poll() is not None:
+                    drain_until = time.monotonic() + self.DRAIN_SECONDS
+                if drain_until is not None and time.monotonic() > drain_until:
+                    break
+                for key, _ in selector.select(self.POLL_SECONDS):
+                    try:
+                        chunk = os.read(key.fd, READ_CHUNK_SIZE)
+                    except OSError:
+                        # EIO: the command closed its end of a pseudo-terminal
+                        chunk = b""
+                    if chunk:
+                        self._feed(key.data, chunk)
+                    else:
+                        selector.unregister(key.fileobj)
+
+    def _read_threaded(self):
+        # Anonymous pipes on Windows can't be selected; one blocking read per
+        # pipe feeds a queue that this thread alone decodes
+        import queue
+
+        chunks: queue.Queue = queue.Queue()
+
+        def read(stream, pipe):
+            try:
+                while chunk := pipe.read(READ_CHUNK_SIZE):
+                    chunks.put((stream, chunk))
+            except (OSError, ValueError):
+                pass
+            chunks.put((stream, b""))
+
+        for stream, pipe in self._pipes.items():
+            threading.Thread(target=read, args=(stream, pipe), daemon=True).start()
+        open_pipes = len(self._pipes)
+        drain_until = None
+        while open_pipes and not self._stopped.is_set():
+            if drain_until is None and self.process.poll() is not None:
+                drain_until = time.monotonic() + self.DRAIN_SECONDS
+            if drain_until is not None and time.monotonic() > drain_until:
+                break
+            try:
+                stream, chunk = chunks.get(timeout=self.POLL_SECONDS)
+            except queue.Empty:
+                continue
+            if chunk:
+                self._feed(stream, chunk)
+            else:
+                open_pipes -= 1
+
+async def run_command(
+    command: str,
+    cwd: str,
+    timeout: float = DEFAULT_TIMEOUT,
+    log_buffer: Optional[LogStore] = None,
+    on_event: Optional[EventHandler] = None,
+    environment: Optional[dict[str, str]] = None,
+) -> CommandResult:
+    """Run a shell command the way the UI's command section does, without a window
+
+    stdout and stderr are collected into log_buffer (head+tail capped) and
+    sent to on_event in batches while the command runs. The process tree is
+    killed when the timeout expires or the call is cancelled. environment
+    is added to the user's environment.
+    """
+    log_buffer = log_buffer if log_buffer is not None else LogStore.from_env()
+    sink = _OutputSink(log_buffer, on_event)
+    sink.write(f"$ {command}\n")
+
+    started = time.monotonic()
+    process = start_command(command, cwd, stdin=subprocess.DEVNULL, environment=environment)
+    # Same exit handling as the UIs; asyncio's own Process.wait() would also
+    # wait for background children that keep the pipes open
+    loop = asyncio.get_running_loop()
+    finished = asyncio.Event()
+    PipeReader(
+        process,
+        lambda stream, text: sink.write(text, stream),
+        lambda exit_code: loop.call_soon_threadsafe(finished.set),
+    ).start()
+
+    forwarder = asyncio.create_task(sink.forward()) if on_event is not None else None
+    timed_out = False
+    try:
+        try:
+            await asyncio.wait_for(finished.wait(), timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+            # The grace period runs off the event loop
+            await asyncio.to_thread(kill_tree, process)
+            await finished.wait()
+    except asyncio.CancelledError:
+        if process.poll() is None:
+            kill_tree(process, wait=False)
+        raise
+    finally:
+        if forwarder is not None:
+            forwarder.cancel()
+    duration = time.monotonic() - started
+
+    if timed_out:
+        sink.write(f"\nProcess killed after timing out ({timeout:g} s)\n")
+    else:
+        sink.write(f"\nProcess exited with code {process.returncode}\n")
+    if on_event is not None:
+        await sink.flush()
+
+    return CommandResult(
+        command=command,
+        exit_code=None if timed_out else process.returncode,
+        timed_out=timed_out,
+        duration_seconds=round(duration, 3),
+        logs=log_buffer.getvalue(),
+        truncated=log_buffer.truncated,
+        total_lines=log_buffer.total_lines,
+        total_bytes=log_buffer.total_bytes,
+        stderr_lines=log_buffer.count("stderr"),
+    )
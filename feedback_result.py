@@ -0,0 +1,123 @@
+# Feedback result schema
+# The structured result every UI returns to the server: the feedback text,
+# the command log and machine-readable facts about the command and the round
+import time
+from typing import Optional, TypedDict
+
+from log_store import LogRecords, LogStore
+
+# Bumped whenever a field changes meaning or is removed
+RESULT_VERSION = 1
+
+class CommandInfo(TypedDict):
+    command: str
+    # None while the command is still running or after it was stopped
+    exit_code: Optional[int]
+    duration_seconds: float
+    finished: bool
+
+class LogInfo(TypedDict):
+    total_lines: int
+    total_bytes: int
+    truncated: bool
+    elided_lines: int
+    stderr_lines: int
+
+class TimingInfo(TypedDict, total=False):
+    time_to_first_keystroke_seconds: float
+    time_to_submit_seconds: float
+    # Wall clock (epoch seconds), so the server can line them up with its own
+    shown_at: float
+    closed_at: float
+    # Startup phases of a freshly started UI process, in seconds
+    startup: dict[str, float]
+
+class FeedbackResult(TypedDict, total=False):
+    version: int
+    interactive_feedback: str
+    logs: str
+    log_info: LogInfo
+    # Stream and arrival time of every line; the server keeps them for
+    # command_logs and takes them out before the agent sees the result
+    log_records: LogRecords
+    # Only present when a command was run from the window
+    command: CommandInfo
+    timing: TimingInfo
+
+class CommandRun:
+    """The last command started from the window"""
+
+    def __init__(self, command: str):
+        self.command = command
+        self.started_at = time.monotonic()
+        self.exit_code: Optional[int] = None
+        self.finished_at: Optional[float] = None
+
+    def finish(self, exit_code: int):
+        self.exit_code = exit_code
+        self.finished_at = time.monotonic()
+
+    def describe(self) -> CommandInfo:
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return CommandInfo(
+            command=self.command,
+            exit_code=self.exit_code,
+            duration_seconds=round(end - self.started_at, 3),
+            finished=self.finished_at is not None,
+        )
+
+class InteractionTimer:
+    """Measures how long the human took, from the window being shown"""
+
+    def __init__(self):
+        self.start()
+
+    def start(self):
+        self.shown_at = time.monotonic()
+        self.shown_at_wall = time.time()
+        self.first_keystroke_at: Optional[float] = None
+        self.startup: Optional[dict[str, float]] = None
+
+    def keystroke(self):
+        if self.first_keystroke_at is None:
+            self.first_keystroke_at = time.monotonic()
+
+    def describe(self, submitted: bool) -> TimingInfo:
+        timing = TimingInfo(shown_at=round(self.shown_at_wall, 3), closed_at=round(time.time(), 3))
+        if self.startup:
+            timing["startup"] = self.startup
+        if self.first_keystroke_at is not None:
+            timing["time_to_first_keystroke_seconds"] = round(self.first_keystroke_at - self.shown_at, 3)
+        if submitted:
+            timing["time_to_submit_seconds"] = round(time.monotonic() - self.shown_at, 3)
+        return timing
+
+def build_result(
+    interactive_feedback: str,
+    log_buffer: Optional[LogStore] = None,
+    command: Optional[CommandRun] = None,
+    timer: Optional[InteractionTimer] = None,
+    submitted: bool = True,
+    log_records: bool = False,
+) -> FeedbackResult:
+    result = FeedbackResult(version=RESULT_VERSION, interactive_feedback=interactive_feedback)
+    if log_buffer is None:
+        result["logs"] = ""
+        return result
+    # The server asks for records and rebuilds the plain log from them: don't send it twice
+    log_records = log_records and command is not None
+    result["logs"] = "" if log_records else log_buffer.getvalue()
+    result["log_info"] = LogInfo(
+        total_lines=log_buffer.total_lines,
+        total_bytes=log_buffer.total_bytes,
+        truncated=log_buffer.truncated,
+        elided_lines=log_buffer.elided_lines,
+        stderr_lines=log_buffer.count("stderr"),
+    )
+    if command is not None:
+        result["command"] = command.describe()
+    if log_records:
+        result["log_records"] = log_buffer.records()
+    if timer is not None:
+        result["timing"] = timer.describe(submitted)
+    return result
@@ -1,10 +1,11 @@
 # Interactive Feedback MCP UI
 # Developed by Fábio Ferreira (https://x.com/fabiomlferreira)
 # Inspired by/related to dotcursorrules.com (https://dotcursorrules.com/)
+import time
+_MODULE_START = time.perf_counter()
+
 import os
 import sys
-import json
-import psutil
 import argparse
 import subprocess
 import threading
@@ -13,18 +14,71 @@ from typing import Optional, TypedDict
 
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QLabel, QLineEdit, QPushButton, QCheckBox, QTextEdit, QGroupBox
+    QLabel, QLineEdit, QPushButton, QCheckBox, QTextEdit, QPlainTextEdit, QGroupBox
 )
-from PySide6.QtCore import Qt, Signal, QObject, QTimer, QSettings
+from PySide6.QtCore import Qt, Signal, QObject, QTimer, QSettings, QSignalBlocker
 from PySide6.QtGui import QTextCursor, QIcon, QKeyEvent, QFont, QFontDatabase, QPalette, QColor
 
-class FeedbackResult(TypedDict):
-    command_logs: str
-    interactive_feedback: str
+from ui_worker import read_requests
+from command_runner import OutputThrottle, PipeReader, keep_last_lines, kill_tree, parse_environment, start_command
+from result_channel import write_event, write_result, save_result_file
+from log_store import LogStore
+from feedback_result import FeedbackResult, CommandRun, InteractionTimer, build_result
+
+def _process_age() -> float:
+    """Seconds since this process was created"""
+    if sys.platform.startswith("linux"):
+        # Both values count from boot, with clock tick resolution
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    import psutil
+    return time.time() - psutil.Process().create_time()
+
+class StartupProfiler:
+    """Per-phase startup timings, printed to stderr with --profile-startup"""
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.phases: list[tuple[str, float]] = []
+        self._last = _MODULE_START
+        if enabled:
+            self.phases.append(("interpreter start", max(0.0, _process_age() - (time.perf_counter() - _MODULE_START))))
+
+    def mark(self, phase: str):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def report(self):
+        if not self.enabled:
+            return
+        total = sum(seconds for _, seconds in self.phases)
+        for phase, seconds in self.phases:
+            print(f"{phase:<20} {seconds * 1000:8.1f} ms", file=sys.stderr)
+        print(f"{'total':<20} {total * 1000:8.1f} ms", file=sys.stderr)
+
+# Checked before argparse runs so the import phase can be timed too
+PROFILE_STARTUP = "--profile-startup" in sys.argv
+# With metrics on, the phases are also sent back with the first result
+profiler = StartupProfiler(PROFILE_STARTUP or bool(os.environ.get("INTERACTIVE_FEEDBACK_METRICS_DIR")))
+profiler.mark("imports")
+
+# Command output is batched and written to the console at most this often
+CONSOLE_FLUSH_INTERVAL_MS = 33
+# Oldest console lines are dropped past this; the full log lives in log_buffer
+CONSOLE_MAX_LINES = int(os.environ.get("INTERACTIVE_FEEDBACK_CONSOLE_MAX_LINES", "5000"))
+# For benchmarks and headless runs: submit this many seconds after the window is shown
+AUTO_SUBMIT_SECONDS = float(os.environ["INTERACTIVE_FEEDBACK_AUTO_SUBMIT"]) if os.environ.get("INTERACTIVE_FEEDBACK_AUTO_SUBMIT") else None
 
 class FeedbackConfig(TypedDict):
     run_command: str
     execute_automatically: bool
+    environment: str
 
 def set_dark_title_bar(widget: QWidget, dark_title_bar: bool) -> None:
     # Ensure we're on Windows
@@ -85,111 +139,6 @@ def get_dark_mode_palette(app: QApplication):
     darkPalette.setColor(QPalette.PlaceholderText, QColor(127, 127, 127))
     return darkPalette
 
-def kill_tree(process: subprocess.Popen):
-    killed: list[psutil.Process] = []
-    parent = psutil.Process(process.pid)
-    for proc in parent.children(recursive=True):
-        try:
-            proc.kill()
-            killed.append(proc)
-        except psutil.Error:
-            pass
-    try:
-        parent.kill()
-    except psutil.Error:
-        pass
-    killed.append(parent)
-
-    # Terminate any remaining processes
-    for proc in killed:
-        try:
-            if proc.is_running():
-                proc.terminate()
-        except psutil.Error:
-            pass
-
-def get_user_environment() -> dict[str, str]:
-    if sys.platform != "win32":
-        return os.environ.copy()
-
-    import ctypes
-    from ctypes import wintypes
-
-    # Load required DLLs
-    advapi32 = ctypes.WinDLL("advapi32")
-    userenv = ctypes.WinDLL("userenv")
-    kernel32 = ctypes.WinDLL("kernel32")
-
-    # Constants
-    TOKEN_QUERY = 0x0008
-
-    # Function prototypes
-    OpenProcessToken = advapi32.OpenProcessToken
-    OpenProcessToken.argtypes = [wintypes.HANDLE, wintypes.DWORD, ctypes.POINTER(wintypes.HANDLE)]
-    OpenProcessToken.restype = wintypes.BOOL
-
-    CreateEnvironmentBlock = userenv.CreateEnvironmentBlock
-    CreateEnvironmentBlock.argtypes = [ctypes.POINTER(ctypes.c_void_p), wintypes.HANDLE, wintypes.BOOL]
-    CreateEnvironmentBlock.restype = wintypes.BOOL
-
-    DestroyEnvironmentBlock = userenv.DestroyEnvironmentBlock
-    DestroyEnvironmentBlock.argtypes = [wintypes.LPVOID]
-    DestroyEnvironmentBlock.restype = wintypes.BOOL
-
-    GetCurrentProcess = kernel32.GetCurrentProcess
-    GetCurrentProcess.argtypes = []
-    GetCurrentProcess.restype = wintypes.HANDLE
-
-    CloseHandle = kernel32.CloseHandle
-    CloseHandle.argtypes = [wintypes.HANDLE]
-    CloseHandle.restype = wintypes.BOOL
-
-    # Get process token
-    token = wintypes.HANDLE()
-    if not OpenProcessToken(GetCurrentProcess(), TOKEN_QUERY, ctypes.byref(token)):
-        raise RuntimeError("Failed to open process token")
-
-    try:
-        # Create environment block
-        environment = ctypes.c_void_p()
-        if not CreateEnvironmentBlock(ctypes.byref(environment), token, False):
-            raise RuntimeError("Failed to create environment block")
-
-        try:
-            # Convert environment block to list of strings
-            result = {}
-            env_ptr = ctypes.cast(environment, ctypes.POINTER(ctypes.c_wchar))
-            offset = 0
-
-            while True:
-                # Get string at current offset
-                current_string = ""
-                while env_ptr[offset] != "\0":
-                    current_string += env_ptr[offset]
-                    offset += 1
-
-                # Skip null terminator
-                offset += 1
-
-                # Break if we hit double null terminator
-                if not current_string:
-                    break
-
-                equal_index = current_string.index("=")
-                if equal_index == -1:
-                    continue
-
-                key = current_string[:equal_index]
-                value = current_string[equal_index + 1:]
-                result[key] = value
-
-            return result
-
-        finally:
-            DestroyEnvironmentBlock(environment)
-
-    finally:
-        CloseHandle(token)
 
 class FeedbackTextEdit(QTextEdit):
     def __init__(self, parent=None):
@@ -206,20 +155,39 @@ class FeedbackTextEdit(QTextEdit):
         else:
             super().keyPressEvent(event)
 
-class LogSignals(QObject):
-    append_log = Signal(str)
+class ProcessSignals(QObject):
+    # Emitted once from the waiter thread; delivered on the GUI thread
+    finished = Signal(object, int)
 
 class FeedbackUI(QMainWindow):
-    def __init__(self, project_directory: str, prompt: str):
+    def __init__(self, project_directory: str, prompt: str, event_channel=None, log_records: bool = False):
         super().__init__()
         self.project_directory = project_directory
         self.prompt = prompt
 
         self.process: Optional[subprocess.Popen] = None
-        self.log_buffer = []
+        self.output_reader: Optional[PipeReader] = None
+        self.log_buffer = LogStore.from_env()
         self.feedback_result = None
-        self.log_signals = LogSignals()
-        self.log_signals.append_log.connect(self._append_log)
+        self.command_run: Optional[CommandRun] = None
+        self.timer = InteractionTimer()
+
+        # Reader threads queue output here; the GUI thread drains it on a timer
+        self._pending_output: list[str] = []
+        self._pending_lock = threading.Lock()
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setInterval(CONSOLE_FLUSH_INTERVAL_MS)
+        self.flush_timer.timeout.connect(self._flush_output)
+        self.auto_submit_timer = QTimer(self)
+        self.auto_submit_timer.setSingleShot(True)
+        self.auto_submit_timer.timeout.connect(self._submit_feedback)
+        self.process_signals = ProcessSignals()
+        self.process_signals.finished.connect(self._on_process_finished)
+        # With --stream-output console writes are also sent to the server, throttled
+        self.event_channel = event_channel
+        # With --log-records the result carries the log as records for the server
+        self.log_records = log_records
+        self.output_events = OutputThrottle()
 
         self.setWindowTitle("Interactive Feedback MCP")
         script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -246,28 +214,77 @@ class FeedbackUI(QMainWindow):
         self.settings.endGroup() # End "MainWindow_General" group
         
         # Load project-specific settings (command, auto-execute, command section visibility)
+        command_section_visible = self._load_project_settings()
+
+        self._create_ui() # self.config is used here to set initial values
+
+        # Set command section visibility AFTER _create_ui has created relevant widgets
+        self._set_command_section_visible(command_section_visible)
+
+        set_dark_title_bar(self, True)
+
+        if self.config.get("execute_automatically", False):
+            self._run_command()
+
+    def _load_project_settings(self) -> bool:
         self.project_group_name = get_project_settings_group(self.project_directory)
         self.settings.beginGroup(self.project_group_name)
         loaded_run_command = self.settings.value("run_command", "", type=str)
         loaded_execute_auto = self.settings.value("execute_automatically", False, type=bool)
+        loaded_environment = self.settings.value("environment", "", type=str)
         command_section_visible = self.settings.value("commandSectionVisible", False, type=bool)
         self.settings.endGroup() # End project-specific group
-        
+
         self.config: FeedbackConfig = {
             "run_command": loaded_run_command,
-            "execute_automatically": loaded_execute_auto
+            "execute_automatically": loaded_execute_auto,
+            "environment": loaded_environment,
         }
+        return command_section_visible
 
-        self._create_ui() # self.config is used here to set initial values
-
-        # Set command section visibility AFTER _create_ui has created relevant widgets
-        self.command_group.setVisible(command_section_visible)
-        if command_section_visible:
+    def _set_command_section_visible(self, visible: bool):
+        if visible:
+            self._ensure_command_section()
+        self.command_group.setVisible(visible)
+        if visible:
             self.toggle_command_button.setText("Hide Command Section")
         else:
             self.toggle_command_button.setText("Show Command Section")
 
-        set_dark_title_bar(self, True)
+    def reset(self, project_directory: str, prompt: str):
+        """Prepare the already built window for a new request (worker mode)"""
+        if self.process:
+            kill_tree(self.process)
+            self.process = None
+            self.run_button.setText("&Run")
+        if self.output_reader:
+            self.output_reader.stop()
+            self.output_reader = None
+
+        self.project_directory = project_directory
+        self.prompt = prompt
+        self.feedback_result = None
+        self.command_run = None
+        self.log_buffer.clear()
+
+        command_section_visible = self._load_project_settings()
+        self.description_label.setText(self.prompt)
+        if self.command_section_built:
+            self.working_dir_label.setText(f"Working directory: {self._format_windows_path(self.project_directory)}")
+            # _update_config would copy the widgets that aren't refilled yet, i.e. the
+            # previous project's values, into the config just loaded
+            blockers = [
+                QSignalBlocker(widget)
+                for widget in (self.command_entry, self.environment_entry, self.auto_check)
+            ]
+            self.command_entry.setText(self.config["run_command"])
+            self.environment_entry.setText(self.config["environment"])
+            self.auto_check.setChecked(self.config["execute_automatically"])
+            for blocker in blockers:
+                blocker.unblock()
+            self.log_text.clear()
+        self._set_command_section_visible(command_section_visible)
+        self.feedback_text.clear()
 
         if self.config.get("execute_automatically", False):
             self._run_command()
@@ -291,14 +308,68 @@ class FeedbackUI(QMainWindow):
         self.toggle_command_button.clicked.connect(self._toggle_command_section)
         layout.addWidget(self.toggle_command_button)
 
-        # Command section
+        # Command section, filled in by _ensure_command_section the first
+        # time it is needed so the feedback box can paint sooner
         self.command_group = QGroupBox("Command")
-        command_layout = QVBoxLayout(self.command_group)
+        QVBoxLayout(self.command_group)
+        self.command_section_built = False
+
+        self.command_group.setVisible(False) 
+        layout.addWidget(self.command_group)
+
+        # Feedback section with adjusted height
+        self.feedback_group = QGroupBox("Feedback")
+        feedback_layout = QVBoxLayout(self.feedback_group)
+
+        # Short description label (from self.prompt)
+        self.description_label = QLabel(self.prompt)
+        self.description_label.setWordWrap(True)
+        feedback_layout.addWidget(self.description_label)
+
+        self.feedback_text = FeedbackTextEdit()
+        font_metrics = self.feedback_text.fontMetrics()
+        row_height = font_metrics.height()
+        # Calculate height for 5 lines + some padding for margins
+        padding = self.feedback_text.contentsMargins().top() + self.feedback_text.contentsMargins().bottom() + 5 # 5 is extra vertical padding
+        self.feedback_text.setMinimumHeight(5 * row_height + padding)
+
+        self.feedback_text.setPlaceholderText("Enter your feedback here (Ctrl+Enter to submit)")
+        self.feedback_text.textChanged.connect(self.timer.keystroke)
+        submit_button = QPushButton("&Send Feedback (Ctrl+Enter)")
+        submit_button.clicked.connect(self._submit_feedback)
+
+        feedback_layout.addWidget(self.feedback_text)
+        feedback_layout.addWidget(submit_button)
+
+        # Set minimum height for feedback_group to accommodate its contents
+        # This will be based on the description label and the 5-line feedback_text
+        self.feedback_group.setMinimumHeight(self.description_label.sizeHint().height() + self.feedback_text.minimumHeight() + submit_button.sizeHint().height() + feedback_layout.spacing() * 2 + feedback_layout.contentsMargins().top() + feedback_layout.contentsMargins().bottom() + 10) # 10 for extra padding
+
+        # Add widgets in a specific order
+        layout.addWidget(self.feedback_group)
+
+        # Credits/Contact Label
+        contact_label = QLabel('Need to improve? Contact Fábio Ferreira on <a href="https://x.com/fabiomlferreira">X.com</a> or visit <a href="https://dotcursorrules.com/">dotcursorrules.com</a>')
+        contact_label.setOpenExternalLinks(True)
+        contact_label.setAlignment(Qt.AlignCenter)
+        # Optionally, make font a bit smaller and less prominent
+        # contact_label_font = contact_label.font()
+        # contact_label_font.setPointSize(contact_label_font.pointSize() - 1)
+        # contact_label.setFont(contact_label_font)
+        contact_label.setStyleSheet("font-size: 9pt; color: #cccccc;") # Light gray for dark theme
+        layout.addWidget(contact_label)
+
+    def _ensure_command_section(self):
+        if self.command_section_built:
+            return
+        self.command_section_built = True
+
+        command_layout = self.command_group.layout()
 
         # Working directory label
         formatted_path = self._format_windows_path(self.project_directory)
-        working_dir_label = QLabel(f"Working directory: {formatted_path}")
-        command_layout.addWidget(working_dir_label)
+        self.working_dir_label = QLabel(f"Working directory: {formatted_path}")
+        command_layout.addWidget(self.working_dir_label)
 
         # Command input row
         command_input_layout = QHBoxLayout()
@@ -313,6 +384,16 @@ class FeedbackUI(QMainWindow):
         command_input_layout.addWidget(self.run_button)
         command_layout.addLayout(command_input_layout)
 
+        # Environment overlay row
+        environment_layout = QHBoxLayout()
+        self.environment_entry = QLineEdit()
+        self.environment_entry.setPlaceholderText('NAME=value NAME2="value with spaces"')
+        self.environment_entry.setText(self.config["environment"])
+        self.environment_entry.textChanged.connect(self._update_config)
+        environment_layout.addWidget(QLabel("Environment:"))
+        environment_layout.addWidget(self.environment_entry)
+        command_layout.addLayout(environment_layout)
+
         # Auto-execute and save config row
         auto_layout = QHBoxLayout()
         self.auto_check = QCheckBox("Execute automatically on next run")
@@ -333,8 +414,9 @@ class FeedbackUI(QMainWindow):
         console_group.setMinimumHeight(200)
 
         # Log text area
-        self.log_text = QTextEdit()
+        self.log_text = QPlainTextEdit()
         self.log_text.setReadOnly(True)
+        self.log_text.setMaximumBlockCount(CONSOLE_MAX_LINES)
         font = QFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
         font.setPointSize(9)
         self.log_text.setFont(font)
@@ -350,57 +432,8 @@ class FeedbackUI(QMainWindow):
         
         command_layout.addWidget(console_group)
 
-        self.command_group.setVisible(False) 
-        layout.addWidget(self.command_group)
-
-        # Feedback section with adjusted height
-        self.feedback_group = QGroupBox("Feedback")
-        feedback_layout = QVBoxLayout(self.feedback_group)
-
-        # Short description label (from self.prompt)
-        self.description_label = QLabel(self.prompt)
-        self.description_label.setWordWrap(True)
-        feedback_layout.addWidget(self.description_label)
-
-        self.feedback_text = FeedbackTextEdit()
-        font_metrics = self.feedback_text.fontMetrics()
-        row_height = font_metrics.height()
-        # Calculate height for 5 lines + some padding for margins
-        padding = self.feedback_text.contentsMargins().top() + self.feedback_text.contentsMargins().bottom() + 5 # 5 is extra vertical padding
-        self.feedback_text.setMinimumHeight(5 * row_height + padding)
-
-        self.feedback_text.setPlaceholderText("Enter your feedback here (Ctrl+Enter to submit)")
-        submit_button = QPushButton("&Send Feedback (Ctrl+Enter)")
-        submit_button.clicked.connect(self._submit_feedback)
-
-        feedback_layout.addWidget(self.feedback_text)
-        feedback_layout.addWidget(submit_button)
-
-        # Set minimum height for feedback_group to accommodate its contents
-        # This will be based on the description label and the 5-line feedback_text
-        self.feedback_group.setMinimumHeight(self.description_label.sizeHint().height() + self.feedback_text.minimumHeight() + submit_button.sizeHint().height() + feedback_layout.spacing() * 2 + feedback_layout.contentsMargins().top() + feedback_layout.contentsMargins().bottom() + 10) # 10 for extra padding
-
-        # Add widgets in a specific order
-        layout.addWidget(self.feedback_group)
-
-        # Credits/Contact Label
-        contact_label = QLabel('Need to improve? Contact Fábio Ferreira on <a href="https://x.com/fabiomlferreira">X.com</a> or visit <a href="https://dotcursorrules.com/">dotcursorrules.com</a>')
-        contact_label.setOpenExternalLinks(True)
-        contact_label.setAlignment(Qt.AlignCenter)
-        # Optionally, make font a bit smaller and less prominent
-        # contact_label_font = contact_label.font()
-        # contact_label_font.setPointSize(contact_label_font.pointSize() - 1)
-        # contact_label.setFont(contact_label_font)
-        contact_label.setStyleSheet("font-size: 9pt; color: #cccccc;") # Light gray for dark theme
-        layout.addWidget(contact_label)
-
     def _toggle_command_section(self):
-        is_visible = self.command_group.isVisible()
-        self.command_group.setVisible(not is_visible)
-        if not is_visible:
-            self.toggle_command_button.setText("Hide Command Section")
-        else:
-            self.toggle_command_button.setText("Show Command Section")
+        self._set_command_section_visible(not self.command_group.isVisible())
         
         # Immediately save the visibility state for this project
         self.settings.beginGroup(self.project_group_name)
@@ -411,7 +444,7 @@ class FeedbackUI(QMainWindow):
         new_height = self.centralWidget().sizeHint().height()
         if self.command_group.isVisible() and self.command_group.layout().sizeHint().height() > 0 :
              # if command group became visible and has content, ensure enough height
-             min_content_height = self.command_group.layout().sizeHint().height() + self.feedback_group.minimumHeight() + self.toggle_command_button.height() + layout().spacing() * 2
+             min_content_height = self.command_group.layout().sizeHint().height() + self.feedback_group.minimumHeight() + self.toggle_command_button.height() + self.centralWidget().layout().spacing() * 2
              new_height = max(new_height, min_content_height)
 
         current_width = self.width()
@@ -420,18 +453,48 @@ class FeedbackUI(QMainWindow):
     def _update_config(self):
         self.config["run_command"] = self.command_entry.text()
         self.config["execute_automatically"] = self.auto_check.isChecked()
+        self.config["environment"] = self.environment_entry.text()
 
     def _append_log(self, text: str):
+        # Keep messages in order with command output that is still queued
+        self._flush_output()
         self.log_buffer.append(text)
-        self.log_text.append(text.rstrip())
-        cursor = self.log_text.textCursor()
-        cursor.movePosition(QTextCursor.End)
-        self.log_text.setTextCursor(cursor)
-
-    def _check_process_status(self):
-        if self.process and self.process.poll() is not None:
-            # Process has terminated
-            exit_code = self.process.poll()
+        self._write_console(text)
+
+    def _queue_output(self, stream: str, text: str):
+        # Called from the reader thread
+        self.log_buffer.append(text, stream)
+        with self._pending_lock:
+            self._pending_output.append(text)
+
+    def _flush_output(self):
+        with self._pending_lock:
+            pending, self._pending_output = self._pending_output, []
+        if pending:
+            self._write_console("".join(pending))
+        elif not self.process:
+            self.flush_timer.stop()
+        # Held back output goes out on later ticks, all of it once the command is done
+        self._send_output_events(force=not self.process)
+
+    def _write_console(self, text: str):
+        if self.event_channel is not None:
+            self.output_events.add(text)
+            self._send_output_events(force=False)
+        # Lines past the console limit would be dropped right away
+        self.log_text.appendPlainText(keep_last_lines(text, CONSOLE_MAX_LINES).rstrip())
+        self.log_text.moveCursor(QTextCursor.End)
+
+    def _send_output_events(self, force: bool):
+        if self.event_channel is not None:
+            text = self.output_events.take(force)
+            if text:
+                write_event(self.event_channel, {"type": "output", "text": text})
+
+    def _on_process_finished(self, process: subprocess.Popen, exit_code: int):
+        # Ignore processes that were stopped or replaced in the meantime
+        if process is self.process:
+            self.command_run.finish(exit_code)
             self._append_log(f"\nProcess exited with code {exit_code}\n")
             self.run_button.setText("&Run")
             self.process = None
@@ -439,82 +502,87 @@ class FeedbackUI(QMainWindow):
             self.feedback_text.setFocus()
 
     def _run_command(self):
+        self._ensure_command_section()
         if self.process:
-            kill_tree(self.process)
+            # Don't freeze the window while the command gets its grace period
+            kill_tree(self.process, wait=False)
             self.process = None
             self.run_button.setText("&Run")
             return
 
-        # Clear the log buffer but keep UI logs visible
-        self.log_buffer = []
+        # A stopped command may still be draining; its output doesn't belong to this run
+        if self.output_reader:
+            self.output_reader.stop()
+        # Clear the log buffer but keep UI logs visible; a run that doesn't start isn't reported
+        self.log_buffer.clear()
+        self.command_run = None
 
         command = self.command_entry.text()
         if not command:
             self._append_log("Please enter a command to run\n")
             return
+        try:
+            environment = parse_environment(self.config["environment"])
+        except ValueError as e:
+            self._append_log(f"Invalid environment: {e}\n")
+            return
 
         self._append_log(f"$ {command}\n")
         self.run_button.setText("Sto&p")
+        self.command_run = CommandRun(command)
 
         try:
-            self.process = subprocess.Popen(
-                command,
-                shell=True,
-                cwd=self.project_directory,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                env=get_user_environment(),
-                text=True,
-                bufsize=1,
-                encoding="utf-8",
-                errors="ignore",
-                close_fds=True,
-            )
-
-            def read_output(pipe):
-                for line in iter(pipe.readline, ""):
-                    self.log_signals.append_log.emit(line)
-
-            threading.Thread(
-                target=read_output,
-                args=(self.process.stdout,),
-                daemon=True
-            ).start()
-
-            threading.Thread(
-                target=read_output,
-                args=(self.process.stderr,),
-                daemon=True
+            # In worker mode stdin is the server's request pipe
+            self.process = start_command(command, self.project_directory, stdin=subprocess.DEVNULL, environment=environment)
+            process = self.process
+            # Reports the exit after the last output
+            self.output_reader = PipeReader(
+                process,
+                self._queue_output,
+                lambda exit_code: self.process_signals.finished.emit(process, exit_code),
             ).start()
-
-            # Start process status checking
-            self.status_timer = QTimer()
-            self.status_timer.timeout.connect(self._check_process_status)
-            self.status_timer.start(100)  # Check every 100ms
+            self.flush_timer.start()
 
         except Exception as e:
             self._append_log(f"Error running command: {str(e)}\n")
             self.run_button.setText("&Run")
 
     def _submit_feedback(self):
-        self.feedback_result = FeedbackResult(
-            logs="".join(self.log_buffer),
-            interactive_feedback=self.feedback_text.toPlainText().strip(),
+        self.feedback_result = build_result(
+            self.feedback_text.toPlainText().strip(),
+            self.log_buffer,
+            self.command_run,
+            self.timer,
+            log_records=self.log_records,
         )
         self.close()
 
     def clear_logs(self):
-        self.log_buffer = []
+        with self._pending_lock:
+            self._pending_output = []
+        self.log_buffer.clear()
         self.log_text.clear()
 
     def _save_config(self):
-        # Save run_command and execute_automatically to QSettings under project group
+        # Save run_command, execute_automatically and environment to QSettings under project group
         self.settings.beginGroup(self.project_group_name)
         self.settings.setValue("run_command", self.config["run_command"])
         self.settings.setValue("execute_automatically", self.config["execute_automatically"])
+        self.settings.setValue("environment", self.config["environment"])
         self.settings.endGroup()
         self._append_log("Configuration saved for this project.\n")
 
+    def _report_first_paint(self):
+        # Runs on the first event loop pass after show(), once the window is painted
+        profiler.mark("first paint")
+        if PROFILE_STARTUP:
+            profiler.report()
+            self.close()
+            return
+        # Metrics: send the phases with this result only, later requests reuse the window
+        self.timer.startup = {phase: round(seconds, 4) for phase, seconds in profiler.phases}
+        profiler.enabled = False
+
     def closeEvent(self, event):
         # Save general UI settings for the main window (geometry, state)
         self.settings.beginGroup("MainWindow_General")
@@ -528,18 +596,29 @@ class FeedbackUI(QMainWindow):
         self.settings.endGroup()
 
         if self.process:
-            kill_tree(self.process)
+            kill_tree(self.process, wait=False)
         super().closeEvent(event)
 
     def run(self) -> FeedbackResult:
+        self.timer.start()
         self.show()
+        self.raise_()
+        self.activateWindow()
+        self.feedback_text.setFocus()
+        if profiler.enabled:
+            QTimer.singleShot(0, self._report_first_paint)
+        if AUTO_SUBMIT_SECONDS is not None:
+            self.auto_submit_timer.start(int(AUTO_SUBMIT_SECONDS * 1000))
         QApplication.instance().exec()
+        self.auto_submit_timer.stop()
+        # The server gets all streamed output before the result
+        self._send_output_events(force=True)
 
         if self.process:
             kill_tree(self.process)
 
         if not self.feedback_result:
-            return FeedbackResult(logs="".join(self.log_buffer), interactive_feedback="")
+            return build_result("", self.log_buffer, self.command_run, self.timer, submitted=False, log_records=self.log_records)
 
         return self.feedback_result
 
@@ -550,32 +629,86 @@ def get_project_settings_group(project_dir: str) -> str:
     full_hash = hashlib.md5(project_dir.encode('utf-8')).hexdigest()[:8]
     return f"{basename}_{full_hash}"
 
-def feedback_ui(project_directory: str, prompt: str, output_file: Optional[str] = None) -> Optional[FeedbackResult]:
+def create_application() -> QApplication:
     app = QApplication.instance() or QApplication()
     app.setPalette(get_dark_mode_palette(app))
     app.setStyle("Fusion")
-    ui = FeedbackUI(project_directory, prompt)
+    return app
+
+def feedback_ui(
+    project_directory: str,
+    prompt: str,
+    output_file: Optional[str] = None,
+    event_channel=None,
+    log_records: bool = False,
+) -> Optional[FeedbackResult]:
+    create_application()
+    profiler.mark("QApplication")
+    ui = FeedbackUI(project_directory, prompt, event_channel, log_records)
+    profiler.mark("widget build")
     result = ui.run()
 
     if output_file and result:
-        # Ensure the directory exists
-        os.makedirs(os.path.dirname(output_file) if os.path.dirname(output_file) else ".", exist_ok=True)
         # Save the result to the output file
-        with open(output_file, "w") as f:
-            json.dump(result, f)
+        save_result_file(output_file, result)
         return None
 
     return result
 
+def feedback_ui_worker(stream_output: bool = False, log_records: bool = False):
+    """Keep one window alive and serve requests from the server over stdin/stdout"""
+    # Results go over the original stdout; anything else printed goes to stderr
+    channel = sys.stdout
+    sys.stdout = sys.stderr
+
+    create_application()
+    profiler.mark("QApplication")
+    # Tells a standby pool that this process is parked and can take a request
+    write_event(channel, {"type": "ready"})
+    ui: Optional[FeedbackUI] = None
+    for request in read_requests():
+        if ui is None:
+            # Time spent waiting for the first request isn't startup
+            profiler.mark("first request")
+            ui = FeedbackUI(request["project_directory"], request["prompt"], channel if stream_output else None, log_records)
+            profiler.mark("widget build")
+        else:
+            ui.reset(request["project_directory"], request["prompt"])
+        write_result(channel, ui.run())
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run the feedback UI")
     parser.add_argument("--project-directory", default=os.getcwd(), help="The project directory to run the command in")
     parser.add_argument("--prompt", default="I implemented the changes you requested.", help="The prompt to show to the user")
     parser.add_argument("--output-file", help="Path to save the feedback result as JSON")
+    parser.add_argument("--result-stdout", action="store_true", help="Write the result to stdout as a framed JSON line")
+    parser.add_argument("--worker", action="store_true", help="Stay alive and serve requests as JSON lines on stdin/stdout")
+    parser.add_argument("--stream-output", action="store_true", help="Send command output to stdout as framed events while it runs")
+    parser.add_argument("--log-records", action="store_true", help="Send the command log as records instead of plain text")
+    parser.add_argument("--profile-startup", action="store_true", help="Print a per-phase startup timing breakdown to stderr and exit after the first paint")
     args = parser.parse_args()
 
-    result = feedback_ui(args.project_directory, args.prompt, args.output_file)
-    if result:
+    if args.worker:
+        feedback_ui_worker(args.stream_output, args.log_records)
+        sys.exit(0)
+
+    if args.result_stdout:
+        # Keep anything else printed off the result channel
+        channel = sys.stdout
+        sys.stdout = sys.stderr
+        write_result(channel, feedback_ui(
+            args.project_directory, args.prompt,
+            event_channel=channel if args.stream_output else None,
+            log_records=args.log_records,
+        ))
+        sys.exit(0)
+
+    result = feedback_ui(
+        args.project_directory, args.prompt, args.output_file,
+        event_channel=sys.stdout if args.stream_output else None,
+        log_records=args.log_records,
+    )
+    if result and not args.profile_startup:
         print(f"\nLogs collected: \n{result['logs']}")
         print(f"\nFeedback received:\n{result['interactive_feedback']}")
     sys.exit(0)
@@ -2,13 +2,11 @@
 # Simple text-based interface
 import os
 import sys
-import json
 import argparse
-from typing import Optional, TypedDict
+from typing import Optional
 
-class FeedbackResult(TypedDict):
-    command_logs: str
-    interactive_feedback: str
+from result_channel import write_result, save_result_file
+from feedback_result import FeedbackResult, build_result
 
 def feedback_ui_fallback(project_directory: str, prompt: str, output_file: Optional[str] = None) -> Optional[FeedbackResult]:
     """Fallback UI when tkinter is not available"""
@@ -21,18 +19,12 @@ def feedback_ui_fallback(project_directory: str, prompt: str, output_file: Optio
     
     # For server mode, provide a simple response without interactive input
     # This is a basic fallback that just returns the prompt as feedback
-    command_logs = ""
     interactive_feedback = f"Fallback mode: {prompt}\n\nPlease use the tkinter UI for full functionality."
     
-    result = FeedbackResult(
-        logs=command_logs,
-        interactive_feedback=interactive_feedback
-    )
+    result = build_result(interactive_feedback)
     
     if output_file:
-        os.makedirs(os.path.dirname(output_file) if os.path.dirname(output_file) else ".", exist_ok=True)
-        with open(output_file, "w") as f:
-            json.dump(result, f)
+        save_result_file(output_file, result)
         return None
     
     return result
@@ -42,8 +34,13 @@ if __name__ == "__main__":
     parser.add_argument("--project-directory", default=os.getcwd(), help="The project directory")
     parser.add_argument("--prompt", default="I implemented the changes you requested.", help="The prompt to show")
     parser.add_argument("--output-file", help="Path to save the feedback result as JSON")
+    parser.add_argument("--result-stdout", action="store_true", help="Write the result to stdout as a framed JSON line")
     args = parser.parse_args()
 
+    if args.result_stdout:
+        write_result(sys.stdout, feedback_ui_fallback(args.project_directory, args.prompt))
+        sys.exit(0)
+
     result = feedback_ui_fallback(args.project_directory, args.prompt, args.output_file)
     if result:
         print(f"\nLogs collected: \n{result['logs']}")
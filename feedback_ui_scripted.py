@@ -0,0 +1,221 @@
+# Scripted responder UI for load tests
+# Answers feedback requests without a window or a human: replies come from a
+# file or a rule set and arrive after a configurable, randomly drawn delay.
+# The server launches it instead of the real UI when INTERACTIVE_FEEDBACK_SCRIPT
+# is set; the variable names the script.
+import os
+import re
+import sys
+import json
+import math
+import time
+import random
+import argparse
+from typing import Any, Optional
+
+from result_channel import write_event, write_result, save_result_file
+from feedback_result import FeedbackResult, InteractionTimer, build_result
+from log_store import LogStore
+from ui_worker import read_requests
+
+class ScriptError(Exception):
+    """Raised when a responder script can't be read or is malformed"""
+
+def draw_latency(spec: Any, rng: random.Random) -> float:
+    """Draw one delay in seconds from a latency spec"""
+    if spec is None:
+        return 0.0
+    if isinstance(spec, (int, float)):
+        return max(0.0, float(spec))
+    distribution = spec.get("distribution", "constant")
+    if distribution == "constant":
+        value = spec.get("seconds", 0.0)
+    elif distribution == "uniform":
+        value = rng.uniform(spec.get("min", 0.0), spec["max"])
+    elif distribution == "normal":
+        value = rng.gauss(spec["mean"], spec.get("stddev", 0.0))
+    elif distribution == "lognormal":
+        value = rng.lognormvariate(math.log(spec["median"]), spec.get("sigma", 0.0))
+    elif distribution == "exponential":
+        value = rng.expovariate(1.0 / spec["mean"]) if spec["mean"] > 0 else 0.0
+    else:
+        raise ScriptError(f"Unknown latency distribution: {distribution}")
+    return max(0.0, float(value))
+
+class ResponderScript:
+    """A loaded responder script and its replay position
+
+    A script is either a text file with one reply per line, replayed in order,
+    or a JSON rule set:
+
+      {
+        "seed": 1,
+        "latency": {"distribution": "lognormal", "median": 2.0, "sigma": 0.6},
+        "responses": ["Looks good", "Please add tests"],
+        "rules": [
+          {"match": "(?i)refactor", "feedback": "Run the tests first", "latency": 0.5,
+           "output": "all tests passed"}
+        ]
+      }
+
+    The first rule whose "match" regex is found in the prompt answers; its
+    "feedback" may be a string or a list replayed in order. Without a match
+    the "responses" are replayed in order ("order": "random" picks one at
+    random instead). {prompt}, {project_directory} and {call} in a reply are
+    filled in. "output" is added to the logs and, with --stream-output, sent
+    as an output event first.
+
+    Latency is seconds, or an object with "distribution": constant (seconds),
+    uniform (min, max), normal (mean, stddev), lognormal (median, sigma) or
+    exponential (mean). Draws are never negative.
+
+    Replies are replayed across calls by the worker (the default). A fresh
+    process per call (INTERACTIVE_FEEDBACK_WORKER=0) starts over every time.
+    """
+
+    def __init__(self, script: dict):
+        self.rng = random.Random(script.get("seed"))
+        self.latency = script.get("latency")
+        self.responses = script.get("responses") or [""]
+        self.random_order = script.get("order") == "random"
+        self.rules = []
+        for rule in script.get("rules", []):
+            feedback = rule.get("feedback", "")
+            self.rules.append({
+                **rule,
+                "pattern": re.compile(rule.get("match", "")),
+                "feedback": feedback if isinstance(feedback, list) else [feedback],
+            })
+        self.calls = 0
+        # Replay position per reply list: one per rule, -1 for the responses
+        self._positions: dict[int, int] = {}
+
+    @classmethod
+    def load(cls, path: str) -> "ResponderScript":
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except OSError as e:
+            raise ScriptError(f"Cannot read responder script {path}: {e}") from e
+        if not path.endswith(".json"):
+            # One reply per line
+            return cls({"responses": [line for line in text.splitlines() if line.strip()]})
+        try:
+            script = json.loads(text)
+        except ValueError as e:
+            raise ScriptError(f"Invalid responder script {path}: {e}") from e
+        if not isinstance(script, dict):
+            raise ScriptError(f"Responder script {path} must be a JSON object")
+        return cls(script)
+
+    def _next(self, key: int, replies: list[str]) -> str:
+        if self.random_order and key < 0:
+            return self.rng.choice(replies)
+        position = self._positions.get(key, 0)
+        self._positions[key] = position + 1
+        return replies[position % len(replies)]
+
+    def respond(self, project_directory: str, prompt: str) -> tuple[float, str, str]:
+        """Return the delay, the reply and the command output for one request"""
+        self.calls += 1
+        latency, output = self.latency, ""
+        for i, rule in enumerate(self.rules):
+            if rule["pattern"].search(prompt):
+                reply = self._next(i, rule["feedback"])
+                latency = rule.get("latency", latency)
+                output = rule.get("output", "")
+                break
+        else:
+            reply = self._next(-1, self.responses)
+        reply = (
+            reply.replace("{prompt}", prompt)
+            .replace("{project_directory}", project_directory)
+            .replace("{call}", str(self.calls))
+        )
+        return draw_latency(latency, self.rng), reply, output
+
+def answer(script: ResponderScript, project_directory: str, prompt: str, event_channel=None) -> FeedbackResult:
+    timer = InteractionTimer()
+    delay, reply, output = script.respond(project_directory, prompt)
+    log_buffer = LogStore()
+    if output:
+        log_buffer.append(output, "stdout")
+        if event_channel is not None:
+            write_event(event_channel, {"type": "output", "text": output})
+    time.sleep(delay)
+    return build_result(reply, log_buffer, timer=timer)
+
+def load_script(path: Optional[str]) -> ResponderScript:
+    path = path or os.environ.get("INTERACTIVE_FEEDBACK_SCRIPT")
+    if not path:
+        raise ScriptError("No responder script: pass --script or set INTERACTIVE_FEEDBACK_SCRIPT")
+    return ResponderScript.load(path)
+
+def feedback_ui_scripted(
+    project_directory: str,
+    prompt: str,
+    output_file: Optional[str] = None,
+    script_path: Optional[str] = None,
+    event_channel=None,
+) -> Optional[FeedbackResult]:
+    result = answer(load_script(script_path), project_directory, prompt, event_channel)
+
+    if output_file:
+        save_result_file(output_file, result)
+        return None
+
+    return result
+
+def feedback_ui_worker(script_path: Optional[str] = None, stream_output: bool = False):
+    """Answer requests from the server over stdin/stdout, replaying the script across them"""
+    channel = sys.stdout
+    sys.stdout = sys.stderr
+
+    script = load_script(script_path)
+    write_event(channel, {"type": "ready"})
+    for request in read_requests():
+        write_result(channel, answer(
+            script, request["project_directory"], request["prompt"],
+            channel if stream_output else None,
+        ))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer feedback requests from a script")
+    parser.add_argument("--project-directory", default=os.getcwd(), help="The project directory")
+    parser.add_argument("--prompt", default="I implemented the changes you requested.", help="The prompt to answer")
+    parser.add_argument("--script", help="Responder script (default: $INTERACTIVE_FEEDBACK_SCRIPT)")
+    parser.add_argument("--output-file", help="Path to save the feedback result as JSON")
+    parser.add_argument("--result-stdout", action="store_true", help="Write the result to stdout as a framed JSON line")
+    parser.add_argument("--worker", action="store_true", help="Stay alive and serve requests as JSON lines on stdin/stdout")
+    parser.add_argument("--stream-output", action="store_true", help="Send scripted command output to stdout as framed events")
+    # Accepted for compatibility with the real UIs' command lines; there are no settings or commands
+    parser.add_argument("--project-settings", help=argparse.SUPPRESS)
+    parser.add_argument("--log-records", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    try:
+        if args.worker:
+            feedback_ui_worker(args.script, args.stream_output)
+            sys.exit(0)
+
+        if args.result_stdout:
+            channel = sys.stdout
+            sys.stdout = sys.stderr
+            write_result(channel, feedback_ui_scripted(
+                args.project_directory, args.prompt,
+                script_path=args.script,
+                event_channel=channel if args.stream_output else None,
+            ))
+            sys.exit(0)
+
+        result = feedback_ui_scripted(
+            args.project_directory, args.prompt, args.output_file, args.script,
+            event_channel=sys.stdout if args.stream_output else None,
+        )
+    except ScriptError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(2)
+    if result:
+        print(f"\nLogs collected: \n{result['logs']}")
+        print(f"\nFeedback received:\n{result['interactive_feedback']}")
+    sys.exit(0)
@@ -4,50 +4,31 @@
 import os
 import sys
 import json
-import psutil
 import argparse
 import subprocess
-import threading
 import hashlib
 from typing import Optional, TypedDict
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 import queue
-from settings_manager import SettingsManager, get_project_settings_group
-
-class FeedbackResult(TypedDict):
-    command_logs: str
-    interactive_feedback: str
+from settings_manager import SettingsManager, ProjectSettings, get_project_settings_group
+from ui_worker import read_requests
+from command_runner import OutputThrottle, PipeReader, keep_last_lines, kill_tree, parse_environment, start_command
+from result_channel import write_event, write_result, save_result_file
+from log_store import LogStore
+from feedback_result import FeedbackResult, CommandRun, InteractionTimer, build_result
+
+# Command output is batched and written to the console at most this often
+CONSOLE_FLUSH_INTERVAL_MS = 33
+# Oldest console lines are dropped past this; the full log lives in log_buffer
+CONSOLE_MAX_LINES = int(os.environ.get("INTERACTIVE_FEEDBACK_CONSOLE_MAX_LINES", "5000"))
+# For benchmarks and headless runs: submit this many seconds after the window is shown
+AUTO_SUBMIT_SECONDS = float(os.environ["INTERACTIVE_FEEDBACK_AUTO_SUBMIT"]) if os.environ.get("INTERACTIVE_FEEDBACK_AUTO_SUBMIT") else None
 
 class FeedbackConfig(TypedDict):
     run_command: str
     execute_automatically: bool
-
-def kill_tree(process: subprocess.Popen):
-    killed: list[psutil.Process] = []
-    parent = psutil.Process(process.pid)
-    for proc in parent.children(recursive=True):
-        try:
-            proc.kill()
-            killed.append(proc)
-        except psutil.Error:
-            pass
-    try:
-        parent.kill()
-    except psutil.Error:
-        pass
-    killed.append(parent)
-
-    # Terminate any remaining processes
-    for proc in killed:
-        try:
-            if proc.is_running():
-                proc.terminate()
-        except psutil.Error:
-            pass
-
-def get_user_environment() -> dict[str, str]:
-    return os.environ.copy()
+    environment: str
 
 def _format_windows_path(path: str) -> str:
     """Format path for Windows display"""
@@ -60,58 +41,98 @@ def _format_windows_path(path: str) -> str:
     return path
 
 class FeedbackUI:
-    def __init__(self, project_directory: str, prompt: str):
+    def __init__(
+        self,
+        project_directory: str,
+        prompt: str,
+        persistent: bool = False,
+        project_settings: Optional[ProjectSettings] = None,
+        event_channel=None,
+        log_records: bool = False,
+    ):
         self.project_directory = project_directory
         self.prompt = prompt
+        # A persistent window is hidden instead of destroyed so it can be reused
+        self.persistent = persistent
         self.process: Optional[subprocess.Popen] = None
-        self.log_buffer = []
+        self.output_reader: Optional[PipeReader] = None
+        self.log_buffer = LogStore.from_env()
         self.feedback_result = None
+        self.command_run: Optional[CommandRun] = None
+        self.timer = InteractionTimer()
         self.log_queue = queue.Queue()
+        self._flush_scheduled = False
+        # With --stream-output console writes are also sent to the server, throttled
+        self.event_channel = event_channel
+        self.output_events = OutputThrottle()
+        # With --log-records the result carries the log as records for the server
+        self.log_records = log_records
         
-        # Initialize settings manager
-        self.settings = SettingsManager("InteractiveFeedbackMCP", "InteractiveFeedbackMCP")
+        # The settings manager is only created once something is saved
+        self._settings: Optional[SettingsManager] = None
         
         # Load configuration from settings
-        self._load_settings()
+        self._load_settings(project_settings)
         
         self._create_ui()
         
         if self.config.get("execute_automatically", False):
             self._run_command()
 
-    def _load_settings(self):
-        """Load settings from storage"""
-        # Load project-specific settings
+    @property
+    def settings(self) -> SettingsManager:
+        if self._settings is None:
+            self._settings = SettingsManager("InteractiveFeedbackMCP", "InteractiveFeedbackMCP")
+        return self._settings
+
+    def _load_settings(self, project_settings: Optional[ProjectSettings] = None):
+        """Load settings from storage, unless the server already resolved them"""
         self.project_group_name = get_project_settings_group(self.project_directory)
-        with self.settings.beginGroup(self.project_group_name):
-            loaded_run_command = self.settings.value("run_command", "", str)
-            loaded_execute_auto = self.settings.value("execute_automatically", False, bool)
-            self.command_section_visible = self.settings.value("commandSectionVisible", False, bool)
+        if project_settings is None:
+            # Load project-specific settings
+            with self.settings.beginGroup(self.project_group_name):
+                loaded_run_command = self.settings.value("run_command", "", str)
+                loaded_execute_auto = self.settings.value("execute_automatically", False, bool)
+                loaded_environment = self.settings.value("environment", "", str)
+                command_section_visible = self.settings.value("commandSectionVisible", False, bool)
+            with self.settings.beginGroup("MainWindow_General"):
+                geometry = self.settings.value("geometry")
+                window_state = self.settings.value("windowState")
+            project_settings = ProjectSettings(
+                run_command=loaded_run_command,
+                execute_automatically=loaded_execute_auto,
+                environment=loaded_environment,
+                command_section_visible=command_section_visible,
+                geometry=geometry,
+                window_state=window_state,
+            )
         
+        self.command_section_visible = project_settings["command_section_visible"]
+        self.window_settings = project_settings
         self.config: FeedbackConfig = {
-            "run_command": loaded_run_command,
-            "execute_automatically": loaded_execute_auto
+            "run_command": project_settings["run_command"],
+            "execute_automatically": project_settings["execute_automatically"],
+            "environment": project_settings["environment"],
         }
 
     def _load_window_settings(self):
-        """Load window geometry and state from settings"""
-        with self.settings.beginGroup("MainWindow_General"):
-            geometry = self.settings.value("geometry")
-            if geometry:
-                self.root.geometry(geometry)
-            else:
-                # Default geometry and center window
-                self.root.geometry("800x600")
-                self.root.update_idletasks()
-                x = (self.root.winfo_screenwidth() // 2) - (800 // 2)
-                y = (self.root.winfo_screenheight() // 2) - (600 // 2)
-                self.root.geometry(f"800x600+{x}+{y}")
-            
-            state = self.settings.value("windowState")
-            if state:
-                # Restore window state (maximized, etc.)
-                if state == "zoomed":
-                    self.root.state('zoomed')
+        """Apply the loaded window geometry and state"""
+        geometry = self.window_settings["geometry"]
+        if geometry:
+            self.root.geometry(geometry)
+        else:
+            # Default geometry and center window
+            self.root.geometry("800x600")
+            self.root.update_idletasks()
+            x = (self.root.winfo_screenwidth() // 2) - (800 // 2)
+            y = (self.root.winfo_screenheight() // 2) - (600 // 2)
+            self.root.geometry(f"800x600+{x}+{y}")
+        
+        state = self.window_settings["window_state"]
+        if state:
+            # Restore window state (maximized, etc.)
+            if state == "zoomed":
+                self.root.state('zoomed')
 
     def _create_ui(self):
         self.root = tk.Tk()
@@ -148,11 +169,11 @@ class FeedbackUI:
         
         # Working directory label
         formatted_path = _format_windows_path(self.project_directory)
-        working_dir_label = ttk.Label(
+        self.working_dir_label = ttk.Label(
             self.command_frame, 
             text=f"Working directory: {formatted_path}"
         )
-        working_dir_label.pack(anchor=tk.W, padx=5, pady=5)
+        self.working_dir_label.pack(anchor=tk.W, padx=5, pady=5)
         
         # Command input row
         command_input_frame = ttk.Frame(self.command_frame)
@@ -170,6 +191,16 @@ class FeedbackUI:
         )
         self.run_button.pack(side=tk.RIGHT)
         
+        # Environment overlay row: NAME=value NAME2="value with spaces"
+        environment_frame = ttk.Frame(self.command_frame)
+        environment_frame.pack(fill=tk.X, padx=5, pady=5)
+        
+        ttk.Label(environment_frame, text="Environment:").pack(side=tk.LEFT, padx=(0, 5))
+        self.environment_entry = ttk.Entry(environment_frame)
+        self.environment_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.environment_entry.insert(0, self.config["environment"])
+        self.environment_entry.bind('<KeyRelease>', lambda e: self._update_config())
+        
         # Auto-execute and save config row
         config_frame = ttk.Frame(self.command_frame)
         config_frame.pack(fill=tk.X, padx=5, pady=5)
@@ -219,16 +250,17 @@ class FeedbackUI:
             self.toggle_command_button.config(text="Hide Command Section")
         
         # Feedback section
-        feedback_frame = ttk.LabelFrame(main_frame, text="Feedback")
-        feedback_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
+        self.feedback_frame = ttk.LabelFrame(main_frame, text="Feedback")
+        self.feedback_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
+        feedback_frame = self.feedback_frame
         
         # Description label
-        description_label = ttk.Label(
+        self.description_label = ttk.Label(
             feedback_frame,
             text=self.prompt,
             wraplength=750
         )
-        description_label.pack(anchor=tk.W, padx=5, pady=5)
+        self.description_label.pack(anchor=tk.W, padx=5, pady=5)
         
         # Feedback text area
         self.feedback_text = scrolledtext.ScrolledText(
@@ -241,7 +273,9 @@ class FeedbackUI:
         )
         self.feedback_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         self.feedback_text.insert('1.0', "Enter your feedback here...")
-        self.feedback_text.bind('<Control-Return>', lambda e: self._submit_feedback())
+        self.feedback_text.bind('<Control-Return>', self._on_control_return)
+        # Only edits count as keystrokes: not Ctrl+Return, modifiers or moving the cursor
+        self.feedback_text.bind('<<Modified>>', self._on_feedback_modified)
         
         # Submit button
         submit_button = ttk.Button(
@@ -294,71 +328,128 @@ class FeedbackUI:
         )
         rules_link.pack(side=tk.LEFT)
         rules_link.bind('<Button-1>', lambda e: self._open_url('https://dotcursorrules.com'))
-        
-        # Start the log processing and process monitoring
-        self.root.after(100, self._process_log_queue)
-        self.root.after(100, self._check_process_status)
 
-    def _toggle_command_section(self):
-        if self.command_frame.winfo_viewable():
+    def _set_command_section_visible(self, visible: bool):
+        if not visible:
             self.command_frame.pack_forget()
             self.toggle_command_button.config(text="Show Command Section")
         else:
-            # Find the feedback frame to pack before it
-            feedback_frame = None
-            for child in self.root.winfo_children():
-                if hasattr(child, 'winfo_children'):
-                    for grandchild in child.winfo_children():
-                        if isinstance(grandchild, ttk.LabelFrame) and grandchild.cget('text') == 'Feedback':
-                            feedback_frame = grandchild
-                            break
-                if feedback_frame:
-                    break
-            
-            if feedback_frame:
-                self.command_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10), before=feedback_frame)
-            else:
-                self.command_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
+            # Pack before the feedback frame to keep the original layout order
+            self.command_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10), before=self.feedback_frame)
             self.toggle_command_button.config(text="Hide Command Section")
+        self.command_section_visible = visible
+
+    def _toggle_command_section(self):
+        self._set_command_section_visible(not self.command_section_visible)
         
         # Save visibility state immediately
         with self.settings.beginGroup(self.project_group_name):
-            self.settings.setValue("commandSectionVisible", self.command_frame.winfo_viewable())
+            self.settings.setValue("commandSectionVisible", self.command_section_visible)
+
+    def reset(self, project_directory: str, prompt: str, project_settings: Optional[ProjectSettings] = None):
+        """Prepare the already built window for a new request (worker mode)"""
+        if self.process:
+            kill_tree(self.process)
+            self.process = None
+            self.run_button.config(text="Run")
+        if self.output_reader:
+            self.output_reader.stop()
+            self.output_reader = None
+
+        self.project_directory = project_directory
+        self.prompt = prompt
+        self.feedback_result = None
+        self.command_run = None
+        self.log_buffer.clear()
+
+        self._load_settings(project_settings)
+        self.working_dir_label.config(text=f"Working directory: {_format_windows_path(self.project_directory)}")
+        self.description_label.config(text=self.prompt)
+        self.command_entry.delete(0, tk.END)
+        self.command_entry.insert(0, self.config["run_command"])
+        self.environment_entry.delete(0, tk.END)
+        self.environment_entry.insert(0, self.config["environment"])
+        self.auto_check.state(['selected' if self.config["execute_automatically"] else '!selected'])
+        self._set_command_section_visible(self.command_section_visible)
+        self.log_text.delete('1.0', tk.END)
+        self.feedback_text.delete('1.0', tk.END)
+        self.feedback_text.insert('1.0', "Enter your feedback here...")
+
+        if self.config.get("execute_automatically", False):
+            self._run_command()
 
     def _update_config(self):
         self.config["run_command"] = self.command_entry.get()
         self.config["execute_automatically"] = self.auto_check.instate(['selected'])
+        self.config["environment"] = self.environment_entry.get()
         
         # Save settings in real-time
         with self.settings.beginGroup(self.project_group_name):
             self.settings.setValue("run_command", self.config["run_command"])
             self.settings.setValue("execute_automatically", self.config["execute_automatically"])
+            self.settings.setValue("environment", self.config["environment"])
 
     def _append_log(self, text: str):
-        self.log_buffer.append(text)
+        # Main thread only, the reader thread uses _queue_output
+        self._queue_output("info", text)
+        self._schedule_flush()
+
+    def _queue_output(self, stream: str, text: str):
+        self.log_buffer.append(text, stream)
         self.log_queue.put(text)
 
+    def _schedule_flush(self):
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            self.root.after(CONSOLE_FLUSH_INTERVAL_MS, self._process_log_queue)
+
     def _process_log_queue(self):
+        self._flush_scheduled = False
+        pending = []
+        exited = []
         try:
             while True:
-                text = self.log_queue.get_nowait()
-                self.log_text.insert(tk.END, text.rstrip() + '\n')
-                self.log_text.see(tk.END)
+                item = self.log_queue.get_nowait()
+                if isinstance(item, tuple):
+                    # (process, exit_code) posted by the waiter thread
+                    exited.append(item)
+                else:
+                    pending.append(item.rstrip() + '\n')
         except queue.Empty:
             pass
-        self.root.after(100, self._process_log_queue)
-
-    def _check_process_status(self):
-        if self.process and self.process.poll() is not None:
-            exit_code = self.process.poll()
+        if pending:
+            text = "".join(pending)
+            if self.event_channel is not None:
+                self.output_events.add(text)
+            # One insert per frame instead of one per line; lines past the limit would be dropped right away
+            self.log_text.insert(tk.END, keep_last_lines(text, CONSOLE_MAX_LINES))
+            line_count = int(self.log_text.index('end-1c').split('.')[0])
+            if line_count > CONSOLE_MAX_LINES:
+                self.log_text.delete('1.0', f'{line_count - CONSOLE_MAX_LINES}.0')
+            self.log_text.see(tk.END)
+        for process, exit_code in exited:
+            self._on_process_finished(process, exit_code)
+        # Held back output goes out on later ticks, all of it once the command is done
+        self._send_output_events(force=self.process is None)
+        # Keep flushing only while output can still arrive, an idle window has no timers
+        if self.process is not None or not self.log_queue.empty():
+            self._schedule_flush()
+
+    def _send_output_events(self, force: bool):
+        if self.event_channel is not None:
+            text = self.output_events.take(force)
+            if text:
+                write_event(self.event_channel, {"type": "output", "text": text})
+
+    def _on_process_finished(self, process: subprocess.Popen, exit_code: int):
+        # Ignore processes that were stopped or replaced in the meantime
+        if process is self.process:
+            self.command_run.finish(exit_code)
             self._append_log(f"\nProcess exited with code {exit_code}\n")
             self.run_button.config(text="Run")
             self.process = None
             self.root.focus_force()
             self.feedback_text.focus()
-        
-        # Schedule next check
-        self.root.after(100, self._check_process_status)
 
     def _open_url(self, url: str):
         """Open URL in default browser"""
@@ -367,74 +458,80 @@ class FeedbackUI:
 
     def _run_command(self):
         if self.process:
-            kill_tree(self.process)
+            # Don't freeze the window while the command gets its grace period
+            kill_tree(self.process, wait=False)
             self.process = None
             self.run_button.config(text="Run")
             return
 
-        self.log_buffer = []
+        # A stopped command may still be draining; its output doesn't belong to this run
+        if self.output_reader:
+            self.output_reader.stop()
+        # A run that doesn't start isn't reported
+        self.log_buffer.clear()
+        self.command_run = None
         command = self.command_entry.get()
         if not command:
             self._append_log("Please enter a command to run\n")
             return
+        try:
+            environment = parse_environment(self.config["environment"])
+        except ValueError as e:
+            self._append_log(f"Invalid environment: {e}\n")
+            return
 
         self._append_log(f"$ {command}\n")
         self.run_button.config(text="Stop")
+        self.command_run = CommandRun(command)
 
         try:
-            self.process = subprocess.Popen(
-                command,
-                shell=True,
-                cwd=self.project_directory,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                env=get_user_environment(),
-                text=True,
-                bufsize=1,
-                encoding="utf-8",
-                errors="ignore",
-                close_fds=True,
-            )
-
-            def read_output(pipe):
-                for line in iter(pipe.readline, ""):
-                    self.log_queue.put(line)
-
-            threading.Thread(
-                target=read_output,
-                args=(self.process.stdout,),
-                daemon=True
-            ).start()
-
-            threading.Thread(
-                target=read_output,
-                args=(self.process.stderr,),
-                daemon=True
+            # In worker mode stdin is the server's request pipe
+            self.process = start_command(command, self.project_directory, stdin=subprocess.DEVNULL, environment=environment)
+            process = self.process
+            # Tk isn't thread-safe: the exit is posted through the queue after
+            # the last output and reported by the next console flush
+            self.output_reader = PipeReader(
+                process,
+                self._queue_output,
+                lambda exit_code: self.log_queue.put((process, exit_code)),
             ).start()
-
-            # Start process status checking
-            self._check_process_status()
+            self._schedule_flush()
 
         except Exception as e:
             self._append_log(f"Error running command: {str(e)}\n")
             self.run_button.config(text="Run")
 
+    def _on_control_return(self, event):
+        self._submit_feedback()
+        # Keep the Text widget from adding a newline after submitting
+        return "break"
+
+    def _on_feedback_modified(self, event):
+        if self.feedback_text.edit_modified():
+            self.timer.keystroke()
+            # <<Modified>> only fires again once the flag is cleared
+            self.feedback_text.edit_modified(False)
+
     def _submit_feedback(self):
-        self.feedback_result = FeedbackResult(
-            logs="".join(self.log_buffer),
-            interactive_feedback=self.feedback_text.get('1.0', tk.END).strip(),
+        self.feedback_result = build_result(
+            self.feedback_text.get('1.0', tk.END).strip(),
+            self.log_buffer,
+            self.command_run,
+            self.timer,
+            log_records=self.log_records,
         )
         self.root.quit()
 
     def clear_logs(self):
-        self.log_buffer = []
+        self.log_buffer.clear()
         self.log_text.delete('1.0', tk.END)
 
     def _save_config(self):
-        # Save run_command and execute_automatically to settings
+        # Save run_command, execute_automatically and environment to settings
         with self.settings.beginGroup(self.project_group_name):
             self.settings.setValue("run_command", self.config["run_command"])
             self.settings.setValue("execute_automatically", self.config["execute_automatically"])
+            self.settings.setValue("environment", self.config["environment"])
         self._append_log("Configuration saved for this project.\n")
 
     def _save_window_state(self):
@@ -453,51 +550,129 @@ class FeedbackUI:
         
         # Save command section visibility
         with self.settings.beginGroup(self.project_group_name):
-            self.settings.setValue("commandSectionVisible", self.command_frame.winfo_viewable())
+            self.settings.setValue("commandSectionVisible", self.command_section_visible)
 
     def run(self) -> FeedbackResult:
         # Bind close event to save settings
         self.root.protocol("WM_DELETE_WINDOW", self._on_closing)
+        self.timer.start()
+        # The placeholder text isn't an edit
+        self.feedback_text.edit_modified(False)
+        if self.persistent:
+            self.root.deiconify()
+            self.root.lift()
+            self.feedback_text.focus_force()
+        auto_submit = None
+        if AUTO_SUBMIT_SECONDS is not None:
+            auto_submit = self.root.after(int(AUTO_SUBMIT_SECONDS * 1000), self._submit_feedback)
         self.root.mainloop()
+        # The server gets all streamed output before the result
+        self._send_output_events(force=True)
+        if auto_submit is not None and self.persistent:
+            # The window is reused; a pending submit must not leak into the next request
+            self.root.after_cancel(auto_submit)
+        if self.persistent:
+            self.root.withdraw()
+        if self._settings is not None:
+            self._settings.flush()
         
         if self.process:
             kill_tree(self.process)
 
         if not self.feedback_result:
-            return FeedbackResult(logs="".join(self.log_buffer), interactive_feedback="")
+            return build_result("", self.log_buffer, self.command_run, self.timer, submitted=False, log_records=self.log_records)
 
         return self.feedback_result
 
     def _on_closing(self):
         """Handle window closing event"""
         self._save_window_state()
-        self.root.destroy()
+        if self.persistent:
+            self.root.quit()
+        else:
+            self.root.destroy()
 
 def get_project_settings_group(project_dir: str) -> str:
     basename = os.path.basename(os.path.normpath(project_dir))
     full_hash = hashlib.md5(project_dir.encode('utf-8')).hexdigest()[:8]
     return f"{basename}_{full_hash}"
 
-def feedback_ui(project_directory: str, prompt: str, output_file: Optional[str] = None) -> Optional[FeedbackResult]:
-    ui = FeedbackUI(project_directory, prompt)
+def feedback_ui(
+    project_directory: str,
+    prompt: str,
+    output_file: Optional[str] = None,
+    project_settings: Optional[ProjectSettings] = None,
+    event_channel=None,
+    log_records: bool = False,
+) -> Optional[FeedbackResult]:
+    ui = FeedbackUI(
+        project_directory, prompt, project_settings=project_settings, event_channel=event_channel, log_records=log_records,
+    )
     result = ui.run()
 
     if output_file and result:
-        os.makedirs(os.path.dirname(output_file) if os.path.dirname(output_file) else ".", exist_ok=True)
-        with open(output_file, "w") as f:
-            json.dump(result, f)
+        save_result_file(output_file, result)
         return None
 
     return result
 
+def feedback_ui_worker(stream_output: bool = False, log_records: bool = False):
+    """Keep one window alive and serve requests from the server over stdin/stdout"""
+    # Results go over the original stdout; anything else printed goes to stderr
+    channel = sys.stdout
+    sys.stdout = sys.stderr
+
+    # Tells a standby pool that this process is parked and can take a request
+    write_event(channel, {"type": "ready"})
+    ui: Optional[FeedbackUI] = None
+    for request in read_requests():
+        project_settings = request.get("project_settings")
+        if ui is None:
+            ui = FeedbackUI(
+                request["project_directory"],
+                request["prompt"],
+                persistent=True,
+                project_settings=project_settings,
+                event_channel=channel if stream_output else None,
+                log_records=log_records,
+            )
+        else:
+            ui.reset(request["project_directory"], request["prompt"], project_settings)
+        write_result(channel, ui.run())
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run the feedback UI")
     parser.add_argument("--project-directory", default=os.getcwd(), help="The project directory to run the command in")
     parser.add_argument("--prompt", default="I implemented the changes you requested.", help="The prompt to show to the user")
     parser.add_argument("--output-file", help="Path to save the feedback result as JSON")
+    parser.add_argument("--result-stdout", action="store_true", help="Write the result to stdout as a framed JSON line")
+    parser.add_argument("--worker", action="store_true", help="Stay alive and serve requests as JSON lines on stdin/stdout")
+    parser.add_argument("--project-settings", type=json.loads, help="Project settings resolved by the server, as JSON")
+    parser.add_argument("--stream-output", action="store_true", help="Send command output to stdout as framed events while it runs")
+    parser.add_argument("--log-records", action="store_true", help="Send the command log as records instead of plain text")
     args = parser.parse_args()
 
-    result = feedback_ui(args.project_directory, args.prompt, args.output_file)
+    if args.worker:
+        feedback_ui_worker(args.stream_output, args.log_records)
+        sys.exit(0)
+
+    if args.result_stdout:
+        # Keep anything else printed off the result channel
+        channel = sys.stdout
+        sys.stdout = sys.stderr
+        write_result(channel, feedback_ui(
+            args.project_directory, args.prompt,
+            project_settings=args.project_settings,
+            event_channel=channel if args.stream_output else None,
+            log_records=args.log_records,
+        ))
+        sys.exit(0)
+
+    result = feedback_ui(
+        args.project_directory, args.prompt, args.output_file, args.project_settings,
+        event_channel=sys.stdout if args.stream_output else None,
+        log_records=args.log_records,
+    )
     if result:
         print(f"\nLogs collected: \n{result['logs']}")
         print(f"\nFeedback received:\n{result['interactive_feedback']}")
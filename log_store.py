@@ -0,0 +1,301 @@
+# Bounded command log storage
+# Keeps the first lines and the most recent lines of a command's output within
+# a byte and line budget, so chatty commands can't blow up memory or results.
+# Every line remembers its stream and when it arrived
+import os
+import time
+import threading
+from array import array
+from typing import Iterable, Optional, TypedDict
+
+DEFAULT_MAX_BYTES = 1024 * 1024
+DEFAULT_MAX_LINES = 10000
+DEFAULT_HEAD_LINES = 200
+
+# "info" is the UI's own messages: the command line, exit codes, errors
+STREAMS = ("stdout", "stderr", "info")
+# One letter per line in LogRecords.streams
+STREAM_CODES = "oei"
+
+class LogRecords(TypedDict):
+    """A LogStore's content as JSON: one entry per kept line, oldest first"""
+    # Seconds since the log was cleared, in milliseconds
+    times_ms: list[int]
+    # STREAM_CODES letter of every line
+    streams: str
+    lines: list[str]
+    # The first head_lines lines are the head, the elided lines came after them
+    head_lines: int
+    elided_lines: int
+    elided_bytes: int
+    total_lines: int
+    total_bytes: int
+    # Per stream, in STREAMS order
+    stream_lines: list[int]
+    elided_streams: list[int]
+
+class _Lines:
+    """Lines in flat arrays: UTF-8 text, end offsets, arrival times and stream ids
+
+    Appending and dropping the oldest line are O(1) amortized; dropped
+    lines are only compacted away once they make up half of the arrays.
+    """
+
+    def __init__(self):
+        self.data = bytearray()
+        # End of each line, counted from the first byte ever appended
+        self.ends = array("Q")
+        self.times = array("d")
+        self.streams = array("B")
+        # Index of the oldest line still kept
+        self.first = 0
+        # Bytes compacted away from the front of data
+        self.base = 0
+
+    def __len__(self) -> int:
+        return len(self.ends) - self.first
+
+    def append(self, encoded: bytes, at: float, stream: int):
+        self.data += encoded
+        self.ends.append(self.base + len(self.data))
+        self.times.append(at)
+        self.streams.append(stream)
+
+    def _start(self, index: int) -> int:
+        return self.ends[index - 1] - self.base if index > 0 else 0
+
+    def size(self, index: int) -> int:
+        return self.ends[index] - self.base - self._start(index)
+
+    def popleft(self) -> tuple[int, int]:
+        """Drop the oldest line and return its size and stream"""
+        index = self.first
+        dropped = (self.size(index), self.streams[index])
+        self.first += 1
+        if self.first >= 1024 and self.first * 2 >= len(self.ends):
+            cut = self.ends[self.first - 1] - self.base
+            del self.data[:cut]
+            self.base += cut
+            del self.ends[:self.first]
+            del self.times[:self.first]
+            del self.streams[:self.first]
+            self.first = 0
+        return dropped
+
+    def first_time(self) -> Optional[float]:
+        return self.times[self.first] if len(self) else None
+
+    def last_time(self) -> Optional[float]:
+        return self.times[-1] if len(self) else None
+
+    def text(self, index: int) -> str:
+        return self.data[self._start(index):self.ends[index] - self.base].decode("utf-8", errors="surrogatepass")
+
+    def indexes(self, streams: Optional[set[int]], since: Optional[float], until: Optional[float]) -> Iterable[int]:
+        for index in range(self.first, len(self.ends)):
+            if streams is not None and self.streams[index] not in streams:
+                continue
+            at = self.times[index]
+            if (since is not None and at < since) or (until is not None and at > until):
+                continue
+            yield index
+
+    def getvalue(self) -> str:
+        return self.data[self._start(self.first):].decode("utf-8", errors="surrogatepass")
+
+class LogStore:
+    """Head+tail ring buffer for command output
+
+    The first head_lines lines are always kept (they usually show what was
+    run and how it started), the rest is a ring buffer of the most recent
+    lines. Whatever falls out of the middle is replaced by a single
+    "N lines elided" marker in getvalue(). Appends are thread-safe.
+
+    Each line is tagged with its stream (STREAMS) and the time it arrived,
+    in seconds since clear(), and kept in arrival order, so getvalue() can
+    also return just stderr or a time window.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_lines: int = DEFAULT_MAX_LINES,
+        head_lines: int = DEFAULT_HEAD_LINES,
+    ):
+        self.max_bytes = max_bytes
+        self.max_lines = max_lines
+        self.head_lines = min(head_lines, max_lines // 2)
+        # The head may use at most a quarter of the byte budget
+        self.head_bytes_limit = max_bytes // 4
+        self._lock = threading.Lock()
+        self.clear()
+
+    @classmethod
+    def from_env(cls) -> "LogStore":
+        return cls(
+            max_bytes=int(os.environ.get("INTERACTIVE_FEEDBACK_LOG_MAX_BYTES", DEFAULT_MAX_BYTES)),
+            max_lines=int(os.environ.get("INTERACTIVE_FEEDBACK_LOG_MAX_LINES", DEFAULT_MAX_LINES)),
+            head_lines=int(os.environ.get("INTERACTIVE_FEEDBACK_LOG_HEAD_LINES", DEFAULT_HEAD_LINES)),
+        )
+
+    def clear(self):
+        with self._lock:
+            self.started_at = time.monotonic()
+            self._head = _Lines()
+            self._head_bytes = 0
+            self._head_open = True
+            self._tail = _Lines()
+            self._tail_bytes = 0
+            self.elided_lines = 0
+            self.elided_bytes = 0
+            self.elided_streams = [0] * len(STREAMS)
+            self.total_lines = 0
+            self.total_bytes = 0
+            self.stream_lines = [0] * len(STREAMS)
+
+    def append(self, text: str, stream: str = "info", at: Optional[float] = None):
+        """Add output of a stream; at is seconds since clear(), default now"""
+        if not text:
+            return
+        stream_id = STREAMS.index(stream)
+        with self._lock:
+            if at is None:
+                at = time.monotonic() - self.started_at
+            # Fast path: the reader hands over complete lines, often one at a time
+            if text.find("\n") in (-1, len(text) - 1):
+                self._append_line(text, stream_id, at)
+                return
+            for line in text.splitlines(keepends=True):
+                self._append_line(line, stream_id, at)
+
+    def _append_line(self, line: str, stream: int, at: float):
+        encoded = line.encode("utf-8", errors="surrogatepass")
+        size = len(encoded)
+        self.total_lines += 1
+        self.total_bytes += size
+        self.stream_lines[stream] += 1
+
+        if self._head_open:
+            if len(self._head) < self.head_lines and self._head_bytes + size <= self.head_bytes_limit:
+                self._head.append(encoded, at, stream)
+                self._head_bytes += size
+                return
+            self._head_open = False
+
+        tail_bytes_limit = self.max_bytes - self._head_bytes
+        if size > tail_bytes_limit:
+            # A single huge line: keep its end, which is usually the interesting part
+            kept = encoded[-tail_bytes_limit:] if tail_bytes_limit > 0 else b""
+            # Don't start in the middle of a character
+            kept = kept.decode("utf-8", errors="ignore").encode("utf-8")
+            self.elided_bytes += size - len(kept)
+            encoded, size = kept, len(kept)
+
+        self._tail.append(encoded, at, stream)
+        self._tail_bytes += size
+        tail_lines_limit = self.max_lines - len(self._head)
+        while len(self._tail) and (len(self._tail) > tail_lines_limit or self._tail_bytes > tail_bytes_limit):
+            dropped, dropped_stream = self._tail.popleft()
+            self._tail_bytes -= dropped
+            self.elided_lines += 1
+            self.elided_bytes += dropped
+            self.elided_streams[dropped_stream] += 1
+
+    @property
+    def truncated(self) -> bool:
+        return self.elided_lines > 0 or self.elided_bytes > 0
+
+    def getvalue(
+        self,
+        streams: Optional[Iterable[str]] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        timestamps: bool = False,
+    ) -> str:
+        """The kept lines in arrival order, optionally only some streams or a time window
+
+        since and until are seconds since clear(). With timestamps each line
+        starts with its arrival time and stream.
+        """
+        with self._lock:
+            if streams is None and since is None and until is None and not timestamps:
+                parts = [self._head.getvalue()]
+                if self.elided_lines:
+                    if parts[0] and not parts[0].endswith("\n"):
+                        parts.append("\n")
+                    parts.append(f"... {self.elided_lines} lines elided ...\n")
+                parts.append(self._tail.getvalue())
+                return "".join(parts)
+
+            stream_ids = None if streams is None else {STREAMS.index(stream) for stream in streams}
+            parts = []
+            for lines in (self._head, self._tail):
+                if lines is self._tail:
+                    elided = self._elided_in(stream_ids, since, until)
+                    if elided:
+                        if parts and not parts[-1].endswith("\n"):
+                            parts.append("\n")
+                        parts.append(f"... {elided} lines elided ...\n")
+                for index in lines.indexes(stream_ids, since, until):
+                    if timestamps:
+                        parts.append(f"[{lines.times[index]:9.3f} {STREAMS[lines.streams[index]]}] ")
+                    parts.append(lines.text(index))
+            return "".join(parts)
+
+    def _elided_in(self, stream_ids: Optional[set[int]], since: Optional[float], until: Optional[float]) -> int:
+        # Elided lines arrived between the end of the head and the start of the tail
+        if until is not None and self._head.last_time() is not None and until < self._head.last_time():
+            return 0
+        if since is not None and self._tail.first_time() is not None and since > self._tail.first_time():
+            return 0
+        if stream_ids is None:
+            return self.elided_lines
+        return sum(self.elided_streams[stream] for stream in stream_ids)
+
+    def count(self, stream: str) -> int:
+        """Lines seen on a stream, including elided ones"""
+        return self.stream_lines[STREAMS.index(stream)]
+
+    def records(self) -> LogRecords:
+        """Everything kept, for sending to another process"""
+        with self._lock:
+            times_ms: list[int] = []
+            streams: list[str] = []
+            lines: list[str] = []
+            for part in (self._head, self._tail):
+                for index in part.indexes(None, None, None):
+                    times_ms.append(round(part.times[index] * 1000))
+                    streams.append(STREAM_CODES[part.streams[index]])
+                    lines.append(part.text(index))
+            return LogRecords(
+                times_ms=times_ms,
+                streams="".join(streams),
+                lines=lines,
+                head_lines=len(self._head),
+                elided_lines=self.elided_lines,
+                elided_bytes=self.elided_bytes,
+                total_lines=self.total_lines,
+                total_bytes=self.total_bytes,
+                stream_lines=list(self.stream_lines),
+                elided_streams=list(self.elided_streams),
+            )
+
+    @classmethod
+    def from_records(cls, records: LogRecords) -> "LogStore":
+        """Rebuild a LogStore sent by records(), with its head, elided count and totals"""
+        store = cls(max_bytes=1 << 62, max_lines=1 << 62, head_lines=records["head_lines"])
+        store.head_bytes_limit = 1 << 62
+        for at_ms, code, line in zip(records["times_ms"], records["streams"], records["lines"]):
+            if len(store._head) == store.head_lines:
+                store._head_open = False
+            store._append_line(line, STREAM_CODES.index(code), at_ms / 1000)
+        store.elided_lines = records["elided_lines"]
+        store.elided_bytes = records["elided_bytes"]
+        store.total_lines = records["total_lines"]
+        store.total_bytes = records["total_bytes"]
+        store.stream_lines = list(records["stream_lines"])
+        store.elided_streams = list(records["elided_streams"])
+        return store
+
+    def __bool__(self) -> bool:
+        return self.total_lines > 0
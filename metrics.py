@@ -0,0 +1,157 @@
+# Opt-in latency metrics for the feedback round trip
+# Set INTERACTIVE_FEEDBACK_METRICS_DIR to record where the time of every
+# interactive_feedback call goes, as JSON lines and Prometheus histograms
+import os
+import sys
+import json
+import time
+import threading
+from typing import Optional
+
+# Histogram bucket upper bounds in seconds; human think time needs the long tail
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+CALLS_FILE = "feedback_calls.jsonl"
+PROMETHEUS_FILE = "interactive_feedback.prom"
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def lines(self, name: str, labels: str) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+class FeedbackCallMetrics:
+    """Phase timings of one interactive_feedback call
+
+    queue_wait: waiting for a free window slot
+    ui_start: launch (or worker request) until the window was shown
+    think_time: window shown until it was submitted or closed
+    command_runtime: the last command run from the window
+    result_read: window closed until the server had the parsed result
+    total: the whole tool call
+    ui_startup_*: phases inside a freshly started PySide6 UI process
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.launched_at: Optional[float] = None
+        self.cold_start = True
+        self.phases: dict[str, float] = {}
+
+    def phase(self, name: str, seconds: Optional[float]):
+        if seconds is not None:
+            self.phases[name] = round(max(0.0, seconds), 4)
+
+    def launched(self, cold_start: bool):
+        self.launched_at = time.time()
+        self.cold_start = cold_start
+
+    def finish(self, result: dict):
+        now = time.time()
+        timing = result.get("timing", {})
+        shown_at = timing.get("shown_at")
+        closed_at = timing.get("closed_at")
+        if shown_at is not None and self.launched_at is not None:
+            self.phase("ui_start", shown_at - self.launched_at)
+        if shown_at is not None and closed_at is not None:
+            self.phase("think_time", closed_at - shown_at)
+        if closed_at is not None:
+            self.phase("result_read", now - closed_at)
+        for name, seconds in timing.get("startup", {}).items():
+            # UI process phases (imports, widget build, first paint...) on a cold start
+            self.phase("ui_startup_" + name.replace(" ", "_"), seconds)
+        command = result.get("command")
+        if command is not None:
+            self.phase("command_runtime", command.get("duration_seconds"))
+        self.phase("total", now - self.started_at)
+
+    def describe(self) -> dict:
+        return {
+            "time": round(self.started_at, 3),
+            "cold_start": self.cold_start,
+            "phases": self.phases,
+        }
+
+class MetricsRecorder:
+    """Appends each call to a JSON-lines file and rewrites a Prometheus textfile"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.calls_file = os.path.join(directory, CALLS_FILE)
+        self.prometheus_file = os.path.join(directory, PROMETHEUS_FILE)
+        self.histograms: dict[tuple[str, str], Histogram] = {}
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def record(self, call: FeedbackCallMetrics):
+        start = "cold" if call.cold_start else "warm"
+        with self._lock:
+            self.calls += 1
+            for phase, seconds in call.phases.items():
+                key = (phase, start)
+                if key not in self.histograms:
+                    self.histograms[key] = Histogram()
+                self.histograms[key].observe(seconds)
+            try:
+                with open(self.calls_file, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(call.describe(), separators=(",", ":")) + "\n")
+                self._write_prometheus()
+            except OSError as e:
+                print(f"Error writing metrics: {e}", file=sys.stderr)
+
+    def _write_prometheus(self):
+        name = "interactive_feedback_phase_seconds"
+        lines = [
+            f"# HELP {name} Time spent in each phase of an interactive_feedback call",
+            f"# TYPE {name} histogram",
+        ]
+        for (phase, start), histogram in sorted(self.histograms.items()):
+            lines.extend(histogram.lines(name, f'phase="{phase}",start="{start}"'))
+        lines += [
+            "# HELP interactive_feedback_calls_total Recorded interactive_feedback calls",
+            "# TYPE interactive_feedback_calls_total counter",
+            f"interactive_feedback_calls_total {self.calls}",
+        ]
+        # Write and rename so a scraper never reads a half-written file
+        tmp_path = self.prometheus_file + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.prometheus_file)
+
+_recorder: Optional[MetricsRecorder] = None
+
+def get_recorder() -> Optional[MetricsRecorder]:
+    """The process-wide recorder, or None unless INTERACTIVE_FEEDBACK_METRICS_DIR is set"""
+    global _recorder
+    directory = os.environ.get("INTERACTIVE_FEEDBACK_METRICS_DIR")
+    if not directory:
+        return None
+    if _recorder is None:
+        _recorder = MetricsRecorder(directory)
+    return _recorder
+
+def record_call(call: FeedbackCallMetrics, result: dict):
+    recorder = get_recorder()
+    if recorder is not None:
+        call.finish(result)
+        recorder.record(call)
@@ -0,0 +1,114 @@
+# Live command output for the agent
+# Forwards the output of commands run from the feedback window to the MCP
+# client as log and progress notifications while the window is still open
+import os
+from collections import OrderedDict
+from typing import Optional
+
+from fastmcp import Context
+
+from log_store import LogStore
+
+# Lines of output kept in the final result when it was already streamed
+SUMMARY_TAIL_LINES = 20
+
+def stream_mode() -> str:
+    """INTERACTIVE_FEEDBACK_STREAM_OUTPUT: 1 (default), summary or 0"""
+    mode = os.environ.get("INTERACTIVE_FEEDBACK_STREAM_OUTPUT", "1")
+    if mode == "0":
+        return "off"
+    return "summary" if mode == "summary" else "full"
+
+def stream_args() -> list[str]:
+    """UI arguments that turn on output events"""
+    return [] if stream_mode() == "off" else ["--stream-output"]
+
+class OutputForwarder:
+    """Event handler passed to the UI launchers for one interactive_feedback call
+
+    Each output batch the UI writes to its console becomes one info log
+    notification, followed by a progress notification counting the lines
+    seen so far. If the client goes away forwarding stops quietly; the
+    output still ends up in the final result.
+    """
+
+    def __init__(self, ctx: Context):
+        self.ctx = ctx
+        self.lines = 0
+        self.failed = False
+
+    async def __call__(self, event: dict):
+        if event.get("type") != "output" or self.failed:
+            return
+        text = event["text"].rstrip("\n")
+        self.lines += text.count("\n") + 1
+        try:
+            await self.ctx.info(text)
+            await self.ctx.report_progress(self.lines)
+        except Exception:
+            self.failed = True
+
+    def summarize(self, result: dict) -> dict:
+        """With INTERACTIVE_FEEDBACK_STREAM_OUTPUT=summary, shorten logs the client already has"""
+        if stream_mode() != "summary" or self.failed or not self.lines:
+            return result
+        lines = result.get("logs", "").splitlines()
+        if len(lines) > SUMMARY_TAIL_LINES:
+            result["logs"] = "\n".join(
+                [f"... {len(lines) - SUMMARY_TAIL_LINES} earlier lines were streamed as log notifications ..."]
+                + lines[-SUMMARY_TAIL_LINES:]
+            ) + "\n"
+        return result
+
+class RecentLogs:
+    """The log of the last command run for each project
+
+    Kept with stream tags and arrival times, so the agent can come back
+    for just stderr or a time window instead of running the command again.
+    Only the most recently used max_projects projects are remembered.
+    """
+
+    def __init__(self, max_projects: int = 16):
+        self.max_projects = max_projects
+        self._logs: OrderedDict[str, tuple[str, LogStore]] = OrderedDict()
+
+    def remember(self, project_directory: str, command: str, log_buffer: LogStore):
+        self._logs[project_directory] = (command, log_buffer)
+        self._logs.move_to_end(project_directory)
+        while len(self._logs) > self.max_projects:
+            self._logs.popitem(last=False)
+
+    def remember_result(self, project_directory: str, result: dict) -> dict:
+        """Keep the records of a command run from the window and turn them back into the plain log"""
+        records = result.pop("log_records", None)
+        if records is not None:
+            log_buffer = LogStore.from_records(records)
+            result["logs"] = log_buffer.getvalue()
+            self.remember(project_directory, result["command"]["command"], log_buffer)
+        return result
+
+    def query(
+        self,
+        project_directory: str,
+        stream: str = "all",
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        timestamps: bool = False,
+    ) -> dict:
+        if project_directory not in self._logs:
+            raise ValueError("No command has been run for this project yet")
+        command, log_buffer = self._logs[project_directory]
+        return {
+            "command": command,
+            "logs": log_buffer.getvalue(
+                streams=None if stream == "all" else [stream],
+                since=since,
+                until=until,
+                timestamps=timestamps,
+            ),
+            "total_lines": log_buffer.total_lines,
+            "stderr_lines": log_buffer.count("stderr"),
+            "truncated": log_buffer.truncated,
+        }
+
+recent_logs = RecentLogs()
@@ -0,0 +1,86 @@
+# Result transport between the feedback UI and the server
+# Results are streamed back over the UI's stdout as a single framed JSON line,
+# optionally preceded by framed progress events; writing the result to an
+# --output-file is kept as an opt-in fallback
+import os
+import json
+import tempfile
+from contextlib import contextmanager
+from typing import Optional
+
+# Lines starting with this marker carry a result, anything else is ignored
+RESULT_MARKER = "\x1eFEEDBACK_RESULT "
+# Progress events (command output while it runs) sent before the result
+EVENT_MARKER = "\x1eFEEDBACK_EVENT "
+
+def encode_result(result: dict) -> str:
+    return RESULT_MARKER + json.dumps(result, separators=(",", ":")) + "\n"
+
+def write_result(channel, result: dict):
+    """Send one framed result line over a text stream and flush it"""
+    channel.write(encode_result(result))
+    channel.flush()
+
+def parse_result_line(line: str) -> Optional[dict]:
+    """Return the result carried by a line, or None for unrelated output"""
+    if not line.startswith(RESULT_MARKER):
+        return None
+    return json.loads(line[len(RESULT_MARKER):])
+
+def write_event(channel, event: dict):
+    """Send one framed progress event over a text stream and flush it"""
+    channel.write(EVENT_MARKER + json.dumps(event, separators=(",", ":")) + "\n")
+    channel.flush()
+
+def parse_event_line(line: str) -> Optional[dict]:
+    """Return the event carried by a line, or None for anything else"""
+    if not line.startswith(EVENT_MARKER):
+        return None
+    return json.loads(line[len(EVENT_MARKER):])
+
+def read_result(output: str) -> dict:
+    """Find the last result in everything a one-shot UI wrote to stdout"""
+    start = output.rfind(RESULT_MARKER)
+    # JSON escapes control characters, so the marker can't occur inside a result
+    while start > 0 and output[start - 1] != "\n":
+        start = output.rfind(RESULT_MARKER, 0, start)
+    if start < 0:
+        raise ValueError("No feedback result found in UI output")
+    end = output.find("\n", start)
+    return parse_result_line(output[start:end if end >= 0 else len(output)])
+
+def save_result_file(output_file: str, result: dict):
+    """File transport: write the result as JSON to output_file"""
+    # Ensure the directory exists
+    os.makedirs(os.path.dirname(output_file) if os.path.dirname(output_file) else ".", exist_ok=True)
+    with open(output_file, "w") as f:
+        json.dump(result, f, separators=(",", ":"))
+
+def use_file_transport() -> bool:
+    # INTERACTIVE_FEEDBACK_RESULT_TRANSPORT=file goes back to the temp-file handoff
+    return os.environ.get("INTERACTIVE_FEEDBACK_RESULT_TRANSPORT", "stdout") == "file"
+
+@contextmanager
+def result_transport():
+    """Yield the UI arguments selecting a transport and a reader for its result
+
+    The reader takes the UI's decoded stdout. With the file transport the
+    temporary file is removed on exit, including when the call is cancelled.
+    """
+    if not use_file_transport():
+        yield ["--result-stdout"], read_result
+        return
+
+    # Create a temporary file for the feedback result
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+        output_file = tmp.name
+
+    def read_result_file(_stdout: str) -> dict:
+        with open(output_file, 'r') as f:
+            return json.load(f)
+
+    try:
+        yield ["--output-file", output_file], read_result_file
+    finally:
+        if os.path.exists(output_file):
+            os.unlink(output_file)
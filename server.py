@@ -3,71 +3,206 @@
 # Inspired by/related to dotcursorrules.com (https://dotcursorrules.com/)
 import os
 import sys
-import json
-import tempfile
-import subprocess
+import atexit
+import asyncio
 
-from typing import Annotated, Dict
+from contextlib import asynccontextmanager
+from typing import Annotated, AsyncIterator, Literal, Optional
 
-from fastmcp import FastMCP
+from fastmcp import Context, FastMCP
 from pydantic import Field
 
-# The log_level is necessary for Cline to work: https://github.com/jlowin/fastmcp/issues/81
-mcp = FastMCP("Interactive Feedback MCP", log_level="ERROR")
+from ui_worker import EventHandler, UIWorker, run_ui_process
+from result_channel import result_transport
+from session_manager import SessionManager, session_limits_from_env
+from output_stream import OutputForwarder, recent_logs, stream_args
+from command_runner import DEFAULT_TIMEOUT, parse_environment, prewarm_user_environment, refresh_user_environment, run_command
+from log_store import LogStore
+from metrics import FeedbackCallMetrics, record_call
+from settings_manager import get_project_settings_group
+from standby_pool import StandbyPool, standby_limits_from_env
 
-def launch_feedback_ui(project_directory: str, summary: str) -> dict[str, str]:
-    # Create a temporary file for the feedback result
-    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
-        output_file = tmp.name
+@asynccontextmanager
+async def stop_ui_processes(server: FastMCP) -> AsyncIterator[None]:
+    """Let UI processes exit while the event loop still runs
 
+    The atexit kills registered below only catch what is left after that.
+    """
     try:
-        # Get the path to feedback_ui.py relative to this script
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        feedback_ui_path = os.path.join(script_dir, "feedback_ui.py")
+        yield
+    finally:
+        if _session_manager is not None:
+            await _session_manager.stop_workers()
+        if _standby_pool is not None:
+            await _standby_pool.close()
+
+# The log_level is necessary for Cline to work: https://github.com/jlowin/fastmcp/issues/81
+mcp = FastMCP("Interactive Feedback MCP", log_level="ERROR", lifespan=stop_ui_processes)
+
+# Set INTERACTIVE_FEEDBACK_WORKER=0 to spawn a fresh UI process for every call,
+# or to standby to take every call's fresh process from a pool of pre-started ones
+WORKER_MODE = os.environ.get("INTERACTIVE_FEEDBACK_WORKER", "1")
+USE_UI_WORKER = WORKER_MODE not in ("0", "standby")
+USE_STANDBY_POOL = WORKER_MODE == "standby"
+
+_session_manager: Optional[SessionManager] = None
+_standby_pool: Optional[StandbyPool] = None
+
+def get_feedback_ui_command() -> list[str]:
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    # INTERACTIVE_FEEDBACK_SCRIPT answers every call from a script instead of a window, for load tests
+    if os.environ.get("INTERACTIVE_FEEDBACK_SCRIPT"):
+        return [sys.executable, "-u", os.path.join(script_dir, "feedback_ui_scripted.py")]
+    return [sys.executable, "-u", os.path.join(script_dir, "feedback_ui.py")]
+
+def create_ui_worker() -> UIWorker:
+    return UIWorker([*get_feedback_ui_command(), "--worker", "--log-records", *stream_args()])
+
+def get_session_manager() -> SessionManager:
+    global _session_manager
+    if _session_manager is None:
+        _session_manager = SessionManager(
+            create_ui_worker if USE_UI_WORKER else None,
+            **session_limits_from_env(),
+        )
+        # Only for processes still alive if stop_ui_processes didn't run
+        atexit.register(_session_manager.kill_workers)
+    return _session_manager
+
+def get_standby_pool() -> StandbyPool:
+    global _standby_pool
+    if _standby_pool is None:
+        _standby_pool = StandbyPool(create_ui_worker, **standby_limits_from_env())
+        # Only for processes still alive if stop_ui_processes didn't run
+        atexit.register(_standby_pool.kill_all)
+    return _standby_pool
+
+async def launch_feedback_ui(
+    project_directory: str,
+    summary: str,
+    on_event: Optional[EventHandler] = None,
+) -> dict:
+    call = FeedbackCallMetrics()
+    async with get_session_manager().session(project_directory, summary) as session:
+        call.phase("queue_wait", session.wait_seconds)
+        if session.worker is not None:
+            call.launched(cold_start=not session.worker.is_alive())
+            # The worker keeps PySide6 imported and the window built between calls
+            result = await session.worker.request(project_directory, summary, on_event=on_event)
+        elif USE_STANDBY_POOL:
+            # A process that has already imported PySide6; a replacement starts right away
+            worker, warm = await get_standby_pool().acquire()
+            call.launched(cold_start=not warm)
+            try:
+                result = await worker.request(project_directory, summary, on_event=on_event)
+            finally:
+                get_standby_pool().release(worker)
+        else:
+            call.launched(cold_start=True)
+            result = await launch_feedback_ui_process(project_directory, summary, on_event)
+    record_call(call, result)
+    return result
 
+async def launch_feedback_ui_process(
+    project_directory: str,
+    summary: str,
+    on_event: Optional[EventHandler] = None,
+) -> dict:
+    with result_transport() as (transport_args, read_transport_result):
         # Run feedback_ui.py as a separate process
         # NOTE: There appears to be a bug in uv, so we need
         # to pass a bunch of special flags to make this work
         args = [
-            sys.executable,
-            "-u",
-            feedback_ui_path,
+            *get_feedback_ui_command(),
             "--project-directory", project_directory,
             "--prompt", summary,
-            "--output-file", output_file
+            *transport_args,
+            "--log-records",
+            *stream_args(),
         ]
-        result = subprocess.run(
-            args,
-            check=False,
-            shell=False,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            stdin=subprocess.DEVNULL,
-            close_fds=True
-        )
-        if result.returncode != 0:
-            raise Exception(f"Failed to launch feedback UI: {result.returncode}")
-
-        # Read the result from the temporary file
-        with open(output_file, 'r') as f:
-            result = json.load(f)
-        os.unlink(output_file)
-        return result
-    except Exception as e:
-        if os.path.exists(output_file):
-            os.unlink(output_file)
-        raise e
+        returncode, stdout, _ = await run_ui_process(args, on_event=on_event)
+        if returncode != 0:
+            raise Exception(f"Failed to launch feedback UI: {returncode}")
+
+        return read_transport_result(stdout)
+
+def saved_command_settings(project_directory: str) -> tuple[str, str]:
+    """The project's saved command and environment overlay"""
+    # QtCore alone reads the PySide6 UI's settings, no display needed
+    from PySide6.QtCore import QSettings
+    settings = QSettings("InteractiveFeedbackMCP", "InteractiveFeedbackMCP")
+    settings.beginGroup(get_project_settings_group(project_directory))
+    command = settings.value("run_command", "", type=str)
+    environment = settings.value("environment", "", type=str)
+    settings.endGroup()
+    return command, environment
 
 def first_line(text: str) -> str:
     return text.split("\n")[0].strip()
 
 @mcp.tool()
-def interactive_feedback(
+async def interactive_feedback(
     project_directory: Annotated[str, Field(description="Full path to the project directory")],
     summary: Annotated[str, Field(description="Short, one-line summary of the changes")],
-) -> Dict[str, str]:
+    ctx: Context,
+) -> dict:
     """Request interactive feedback for a given project directory and summary"""
-    return launch_feedback_ui(first_line(project_directory), first_line(summary))
+    # Output of commands run from the window is sent as log notifications while it runs
+    forwarder = OutputForwarder(ctx)
+    project_directory = first_line(project_directory)
+    result = await launch_feedback_ui(project_directory, first_line(summary), forwarder)
+    recent_logs.remember_result(project_directory, result)
+    return forwarder.summarize(result)
+
+@mcp.tool()
+async def run_project_command(
+    project_directory: Annotated[str, Field(description="Full path to the project directory")],
+    ctx: Context,
+    timeout_seconds: Annotated[float, Field(description="Kill the command after this many seconds")] = DEFAULT_TIMEOUT,
+    refresh_environment: Annotated[bool, Field(description="Read the user's environment again first, e.g. after installing a tool that changed PATH")] = False,
+) -> dict:
+    """Run the project's saved command without opening a window and return its exit code and logs"""
+    project_directory = first_line(project_directory)
+    # Only the command the user saved in the feedback window is ever run
+    command, environment = await asyncio.to_thread(saved_command_settings, project_directory)
+    if not command:
+        raise ValueError("No command is saved for this project")
+    if refresh_environment:
+        refresh_user_environment()
+    # Output is streamed as log notifications, like commands run from the window
+    forwarder = OutputForwarder(ctx)
+    log_buffer = LogStore.from_env()
+    result = await run_command(
+        command,
+        project_directory,
+        timeout=timeout_seconds,
+        log_buffer=log_buffer,
+        on_event=forwarder,
+        environment=parse_environment(environment),
+    )
+    recent_logs.remember(project_directory, command, log_buffer)
+    return forwarder.summarize(result)
+
+@mcp.tool()
+def command_logs(
+    project_directory: Annotated[str, Field(description="Full path to the project directory")],
+    stream: Annotated[Literal["all", "stdout", "stderr"], Field(description="Only lines from this stream")] = "all",
+    since_seconds: Annotated[Optional[float], Field(description="Only lines that arrived at least this many seconds after the command started")] = None,
+    until_seconds: Annotated[Optional[float], Field(description="Only lines that arrived at most this many seconds after the command started")] = None,
+    timestamps: Annotated[bool, Field(description="Start each line with its arrival time and stream")] = False,
+) -> dict:
+    """Return the logs of the last command run for a project, optionally only stderr or a time window, without running it again"""
+    return recent_logs.query(first_line(project_directory), stream, since_seconds, until_seconds, timestamps)
+
+@mcp.tool()
+def feedback_queue_status() -> dict:
+    """Report open and queued feedback windows, queue depth and wait times"""
+    status = get_session_manager().status()
+    if USE_STANDBY_POOL:
+        status["standby_pool"] = get_standby_pool().status()
+    return status
 
 if __name__ == "__main__":
+    # Read the user's environment while the client is still connecting
+    prewarm_user_environment()
     mcp.run(transport="stdio")
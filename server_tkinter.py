@@ -4,103 +4,159 @@
 import os
 import sys
 import json
-import tempfile
-import subprocess
+import atexit
+import asyncio
 
-from typing import Annotated, Dict
+from contextlib import asynccontextmanager
+from typing import Annotated, AsyncIterator, Literal, Optional
 
-from fastmcp import FastMCP
+from fastmcp import Context, FastMCP
 from pydantic import Field
 
-# The log_level is necessary for Cline to work: https://github.com/jlowin/fastmcp/issues/81
-mcp = FastMCP("Interactive Feedback MCP", log_level="ERROR")
+from ui_worker import EventHandler, UIWorker, UIWorkerError, run_ui_process
+from result_channel import result_transport
+from session_manager import SessionManager, session_limits_from_env
+from output_stream import OutputForwarder, recent_logs, stream_args
+from command_runner import DEFAULT_TIMEOUT, parse_environment, prewarm_user_environment, refresh_user_environment, run_command
+from log_store import LogStore
+from metrics import FeedbackCallMetrics, record_call
+from settings_manager import SettingsSnapshot, get_project_settings_group
+from ui_backends import UIBackends, get_tkinter_env
 
-def launch_feedback_ui(project_directory: str, summary: str) -> dict[str, str]:
-    # Create a temporary file for the feedback result
-    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
-        output_file = tmp.name
+@asynccontextmanager
+async def stop_ui_processes(server: FastMCP) -> AsyncIterator[None]:
+    """Let UI processes exit while the event loop still runs
 
+    The atexit kills registered below only catch what is left after that.
+    """
     try:
-        # Get the path to feedback_ui_tkinter.py relative to this script
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        feedback_ui_path = os.path.join(script_dir, "feedback_ui_tkinter.py")
-        fallback_ui_path = os.path.join(script_dir, "feedback_ui_fallback.py")
+        yield
+    finally:
+        if _session_manager is not None:
+            await _session_manager.stop_workers()
+
+# The log_level is necessary for Cline to work: https://github.com/jlowin/fastmcp/issues/81
+mcp = FastMCP("Interactive Feedback MCP", log_level="ERROR", lifespan=stop_ui_processes)
+
+# Set INTERACTIVE_FEEDBACK_WORKER=0 to spawn a fresh UI process for every call
+USE_UI_WORKER = os.environ.get("INTERACTIVE_FEEDBACK_WORKER", "1") != "0"
+
+_session_manager: Optional[SessionManager] = None
+_settings_snapshot: Optional[SettingsSnapshot] = None
+_ui_backends: Optional[UIBackends] = None
+
+def get_ui_backends() -> UIBackends:
+    global _ui_backends
+    if _ui_backends is None:
+        _ui_backends = UIBackends()
+    return _ui_backends
+
+def use_scripted_ui() -> bool:
+    # INTERACTIVE_FEEDBACK_SCRIPT answers every call from a script instead of a window, for load tests
+    return bool(os.environ.get("INTERACTIVE_FEEDBACK_SCRIPT"))
+
+def tkinter_failed(reason: str):
+    if use_scripted_ui():
+        print(f"Scripted UI failed ({reason}), using fallback", file=sys.stderr)
+    else:
+        get_ui_backends().mark_failed("tkinter", reason)
 
-        # Try tkinter UI first
+def get_feedback_ui_command() -> list[str]:
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    if use_scripted_ui():
+        return [sys.executable, "-u", os.path.join(script_dir, "feedback_ui_scripted.py")]
+    return [get_ui_backends().python, "-u", os.path.join(script_dir, "feedback_ui_tkinter.py")]
+
+def create_ui_worker() -> UIWorker:
+    return UIWorker([*get_feedback_ui_command(), "--worker", "--log-records", *stream_args()], env=get_tkinter_env())
+
+def get_session_manager() -> SessionManager:
+    global _session_manager
+    if _session_manager is None:
+        _session_manager = SessionManager(
+            create_ui_worker if USE_UI_WORKER else None,
+            **session_limits_from_env(),
+        )
+        # Only for processes still alive if stop_ui_processes didn't run
+        atexit.register(_session_manager.kill_workers)
+    return _session_manager
+
+def get_settings_snapshot() -> SettingsSnapshot:
+    global _settings_snapshot
+    if _settings_snapshot is None:
+        _settings_snapshot = SettingsSnapshot("InteractiveFeedbackMCP", "InteractiveFeedbackMCP")
+    return _settings_snapshot
+
+async def launch_feedback_ui(
+    project_directory: str,
+    summary: str,
+    on_event: Optional[EventHandler] = None,
+) -> dict:
+    call = FeedbackCallMetrics()
+    # Detected once and cached: a headless machine goes straight to the fallback
+    backend = "tkinter" if use_scripted_ui() else await get_ui_backends().select()
+    async with get_session_manager().session(project_directory, summary) as session:
+        call.phase("queue_wait", session.wait_seconds)
+        # Resolve the project's settings here so the UI doesn't read them from disk; off
+        # the event loop, recording the use may wait for another process's file lock
+        project_settings = await asyncio.to_thread(get_settings_snapshot().project_settings, project_directory)
+        if backend == "fallback":
+            call.launched(cold_start=True)
+            result = await launch_fallback_ui(project_directory, summary)
+        elif session.worker is None:
+            call.launched(cold_start=True)
+            result = await launch_feedback_ui_process(project_directory, summary, project_settings, on_event)
+        else:
+            call.launched(cold_start=not session.worker.is_alive())
+            try:
+                # The worker keeps tkinter loaded and the window built between calls
+                result = await session.worker.request(project_directory, summary, project_settings, on_event)
+            except UIWorkerError as e:
+                tkinter_failed(str(e))
+                result = await launch_fallback_ui(project_directory, summary)
+    record_call(call, result)
+    return result
+
+async def launch_feedback_ui_process(
+    project_directory: str,
+    summary: str,
+    project_settings: Optional[dict] = None,
+    on_event: Optional[EventHandler] = None,
+) -> dict:
+    # Try tkinter UI first
+    with result_transport() as (transport_args, read_transport_result):
         try:
-            # Use system Python for tkinter to avoid Tcl/Tk issues
-            import shutil
-            system_python = shutil.which("python3")
-            if not system_python:
-                system_python = "/usr/bin/python3"
-            
             args = [
-                system_python,
-                "-u",
-                feedback_ui_path,
+                *get_feedback_ui_command(),
                 "--project-directory", project_directory,
                 "--prompt", summary,
-                "--output-file", output_file
+                *transport_args,
+                "--log-records",
+                *stream_args(),
             ]
+            if project_settings is not None:
+                args += ["--project-settings", json.dumps(project_settings)]
             
-            # Set environment variables for Tcl/Tk
-            env = os.environ.copy()
-            # Try to find the correct Tcl/Tk version
-            import platform
-            if platform.system() == "Darwin":  # macOS
-                # Try different Tcl/Tk versions
-                possible_tcl_paths = [
-                    '/System/Library/Frameworks/Tcl.framework/Versions/8.6/Resources/Scripts',
-                    '/System/Library/Frameworks/Tcl.framework/Versions/8.5/Resources/Scripts',
-                    '/usr/local/lib/tcl8.6',
-                    '/opt/homebrew/lib/tcl8.6'
-                ]
-                possible_tk_paths = [
-                    '/System/Library/Frameworks/Tk.framework/Versions/8.6/Resources/Scripts',
-                    '/System/Library/Frameworks/Tk.framework/Versions/8.5/Resources/Scripts',
-                    '/usr/local/lib/tk8.6',
-                    '/opt/homebrew/lib/tk8.6'
-                ]
-                
-                # Find working paths
-                for tcl_path in possible_tcl_paths:
-                    if os.path.exists(tcl_path):
-                        env['TCL_LIBRARY'] = tcl_path
-                        break
-                for tk_path in possible_tk_paths:
-                    if os.path.exists(tk_path):
-                        env['TK_LIBRARY'] = tk_path
-                        break
-            
-            result = subprocess.run(
-                args,
-                check=False,
-                shell=False,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                stdin=subprocess.DEVNULL,
-                close_fds=True,
-                text=True,
-                env=env
-            )
+            returncode, stdout, stderr = await run_ui_process(args, env=get_tkinter_env(), on_event=on_event)
             
-            if result.returncode == 0:
+            if returncode == 0:
                 # Success with tkinter UI
-                with open(output_file, 'r') as f:
-                    result_data = json.load(f)
-                os.unlink(output_file)
-                return result_data
-            else:
-                # Tkinter failed, try fallback
-                print(f"Tkinter UI failed (code {result.returncode}), trying fallback...")
-                if result.stderr and "TclError" in result.stderr:
-                    print("Tcl/Tk error detected, using fallback UI")
-                else:
-                    print(f"Unknown error: {result.stderr}")
-                
+                return read_transport_result(stdout)
+            # Tkinter failed: later calls go straight to the fallback until it is re-validated
+            lines = stderr.strip().splitlines()
+            tkinter_failed(lines[-1] if lines else f"exit code {returncode}")
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            print(f"Tkinter UI error: {e}, trying fallback...")
-        
+            tkinter_failed(str(e))
+
+    return await launch_fallback_ui(project_directory, summary)
+
+async def launch_fallback_ui(project_directory: str, summary: str) -> dict:
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    fallback_ui_path = os.path.join(script_dir, "feedback_ui_fallback.py")
+
+    with result_transport() as (transport_args, read_transport_result):
         # Fallback to text-based UI
         args = [
             sys.executable,
@@ -108,49 +164,99 @@ def launch_feedback_ui(project_directory: str, summary: str) -> dict[str, str]:
             fallback_ui_path,
             "--project-directory", project_directory,
             "--prompt", summary,
-            "--output-file", output_file
+            *transport_args
         ]
         
-        result = subprocess.run(
-            args,
-            check=False,
-            shell=False,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            stdin=subprocess.DEVNULL,
-            close_fds=True,
-            text=True
-        )
+        returncode, stdout, stderr = await run_ui_process(args)
         
-        if result.returncode != 0:
-            error_msg = f"Failed to launch feedback UI (both tkinter and fallback): {result.returncode}"
-            if result.stderr:
-                error_msg += f"\nSTDERR: {result.stderr}"
-            if result.stdout:
-                error_msg += f"\nSTDOUT: {result.stdout}"
+        if returncode != 0:
+            error_msg = f"Failed to launch feedback UI (both tkinter and fallback): {returncode}"
+            if stderr:
+                error_msg += f"\nSTDERR: {stderr}"
+            if stdout:
+                error_msg += f"\nSTDOUT: {stdout}"
             raise Exception(error_msg)
 
-        # Read the result from the temporary file
-        with open(output_file, 'r') as f:
-            result_data = json.load(f)
-        os.unlink(output_file)
-        return result_data
-        
-    except Exception as e:
-        if os.path.exists(output_file):
-            os.unlink(output_file)
-        raise e
+        return read_transport_result(stdout)
+
+def saved_command_settings(project_directory: str) -> tuple[str, str]:
+    """The project's saved command and environment overlay"""
+    project_settings = get_settings_snapshot().project_settings(project_directory)
+    if project_settings is None:
+        # settings.json not migrated yet: let SettingsManager do it
+        from settings_manager import SettingsManager
+        settings = SettingsManager("InteractiveFeedbackMCP", "InteractiveFeedbackMCP")
+        with settings.beginGroup(get_project_settings_group(project_directory)):
+            return settings.value("run_command", "", str), settings.value("environment", "", str)
+    return project_settings["run_command"], project_settings["environment"]
 
 def first_line(text: str) -> str:
     return text.split("\n")[0].strip()
 
 @mcp.tool()
-def interactive_feedback(
+async def interactive_feedback(
     project_directory: Annotated[str, Field(description="Full path to the project directory")],
     summary: Annotated[str, Field(description="Short, one-line summary of the changes")],
-) -> Dict[str, str]:
+    ctx: Context,
+) -> dict:
     """Request interactive feedback for a given project directory and summary"""
-    return launch_feedback_ui(first_line(project_directory), first_line(summary))
+    # Output of commands run from the window is sent as log notifications while it runs
+    forwarder = OutputForwarder(ctx)
+    project_directory = first_line(project_directory)
+    result = await launch_feedback_ui(project_directory, first_line(summary), forwarder)
+    recent_logs.remember_result(project_directory, result)
+    return forwarder.summarize(result)
+
+@mcp.tool()
+async def run_project_command(
+    project_directory: Annotated[str, Field(description="Full path to the project directory")],
+    ctx: Context,
+    timeout_seconds: Annotated[float, Field(description="Kill the command after this many seconds")] = DEFAULT_TIMEOUT,
+    refresh_environment: Annotated[bool, Field(description="Read the user's environment again first, e.g. after installing a tool that changed PATH")] = False,
+) -> dict:
+    """Run the project's saved command without opening a window and return its exit code and logs"""
+    project_directory = first_line(project_directory)
+    # Only the command the user saved in the feedback window is ever run
+    command, environment = await asyncio.to_thread(saved_command_settings, project_directory)
+    if not command:
+        raise ValueError("No command is saved for this project")
+    if refresh_environment:
+        refresh_user_environment()
+    # Output is streamed as log notifications, like commands run from the window
+    forwarder = OutputForwarder(ctx)
+    log_buffer = LogStore.from_env()
+    result = await run_command(
+        command,
+        project_directory,
+        timeout=timeout_seconds,
+        log_buffer=log_buffer,
+        on_event=forwarder,
+        environment=parse_environment(environment),
+    )
+    recent_logs.remember(project_directory, command, log_buffer)
+    return forwarder.summarize(result)
+
+@mcp.tool()
+def command_logs(
+    project_directory: Annotated[str, Field(description="Full path to the project directory")],
+    stream: Annotated[Literal["all", "stdout", "stderr"], Field(description="Only lines from this stream")] = "all",
+    since_seconds: Annotated[Optional[float], Field(description="Only lines that arrived at least this many seconds after the command started")] = None,
+    until_seconds: Annotated[Optional[float], Field(description="Only lines that arrived at most this many seconds after the command started")] = None,
+    timestamps: Annotated[bool, Field(description="Start each line with its arrival time and stream")] = False,
+) -> dict:
+    """Return the logs of the last command run for a project, optionally only stderr or a time window, without running it again"""
+    return recent_logs.query(first_line(project_directory), stream, since_seconds, until_seconds, timestamps)
+
+@mcp.tool()
+def feedback_queue_status() -> dict:
+    """Report open and queued feedback windows, queue depth and wait times"""
+    status = get_session_manager().status()
+    status["ui_backends"] = get_ui_backends().describe()
+    return status
 
 if __name__ == "__main__":
+    # Find out which UI works and read the user's environment while the client is still connecting
+    if not use_scripted_ui():
+        get_ui_backends().prewarm()
+    prewarm_user_environment()
     mcp.run(transport="stdio")
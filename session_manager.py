@@ -0,0 +1,127 @@
+# Feedback session manager
+# Tracks every interactive_feedback call, limits how many windows are open at
+# once and queues the rest so overlapping agents don't flood the desktop
+import os
+import time
+import uuid
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Callable, Optional
+
+from ui_worker import UIWorker
+
+class SessionQueueFull(Exception):
+    """Raised when a request arrives while the wait queue is at its limit"""
+
+class FeedbackSession:
+    def __init__(self, project_directory: str, summary: str):
+        self.id = uuid.uuid4().hex[:8]
+        self.project_directory = project_directory
+        self.summary = summary
+        self.enqueued_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.worker: Optional[UIWorker] = None
+
+    @property
+    def wait_seconds(self) -> float:
+        end = self.started_at if self.started_at is not None else time.monotonic()
+        return end - self.enqueued_at
+
+    def describe(self) -> dict:
+        info = {
+            "id": self.id,
+            "state": "active" if self.started_at is not None else "queued",
+            "project_directory": self.project_directory,
+            "summary": self.summary,
+            "wait_seconds": round(self.wait_seconds, 3),
+        }
+        if self.started_at is not None:
+            info["active_seconds"] = round(time.monotonic() - self.started_at, 3)
+        return info
+
+class SessionManager:
+    """Runs up to max_sessions feedback windows at once, queueing the rest
+
+    Each active session gets its own UI worker; idle workers are kept and
+    reused by later sessions. Without a worker factory the sessions are only
+    counted and queued, which is what the one-process-per-call mode uses.
+    """
+
+    def __init__(
+        self,
+        worker_factory: Optional[Callable[[], UIWorker]] = None,
+        max_sessions: int = 1,
+        max_queued: int = 0,
+    ):
+        self.worker_factory = worker_factory
+        self.max_sessions = max(1, max_sessions)
+        # 0 means the queue is unbounded
+        self.max_queued = max_queued
+        self._slots = asyncio.Semaphore(self.max_sessions)
+        self._idle_workers: list[UIWorker] = []
+        self._workers: list[UIWorker] = []
+        self.queued: dict[str, FeedbackSession] = {}
+        self.active: dict[str, FeedbackSession] = {}
+        self._wait_times: deque[float] = deque(maxlen=100)
+
+    @asynccontextmanager
+    async def session(self, project_directory: str, summary: str):
+        """Wait for a free slot, then yield the session holding it"""
+        if self.max_queued and len(self.queued) >= self.max_queued and self._slots.locked():
+            raise SessionQueueFull(
+                f"{len(self.queued)} feedback requests are already waiting (limit {self.max_queued})"
+            )
+
+        session = FeedbackSession(project_directory, summary)
+        self.queued[session.id] = session
+        try:
+            await self._slots.acquire()
+        finally:
+            del self.queued[session.id]
+
+        session.started_at = time.monotonic()
+        self._wait_times.append(session.wait_seconds)
+        self.active[session.id] = session
+        try:
+            if self.worker_factory is not None:
+                session.worker = self._acquire_worker()
+            yield session
+        finally:
+            if session.worker is not None:
+                self._idle_workers.append(session.worker)
+            del self.active[session.id]
+            self._slots.release()
+
+    def _acquire_worker(self) -> UIWorker:
+        if self._idle_workers:
+            return self._idle_workers.pop()
+        worker = self.worker_factory()
+        self._workers.append(worker)
+        return worker
+
+    def kill_workers(self):
+        for worker in self._workers:
+            worker.kill()
+
+    async def stop_workers(self):
+        """Let every worker exit cleanly, e.g. before the event loop is closed"""
+        await asyncio.gather(*(worker.stop() for worker in self._workers))
+
+    def status(self) -> dict:
+        waits = list(self._wait_times)
+        return {
+            "max_sessions": self.max_sessions,
+            "max_queued": self.max_queued,
+            "active_sessions": len(self.active),
+            "queue_depth": len(self.queued),
+            "last_wait_seconds": round(waits[-1], 3) if waits else None,
+            "average_wait_seconds": round(sum(waits) / len(waits), 3) if waits else None,
+            "sessions": [s.describe() for s in (*self.active.values(), *self.queued.values())],
+        }
+
+def session_limits_from_env() -> dict[str, int]:
+    return {
+        "max_sessions": int(os.environ.get("INTERACTIVE_FEEDBACK_MAX_SESSIONS", "1")),
+        "max_queued": int(os.environ.get("INTERACTIVE_FEEDBACK_MAX_QUEUED", "0")),
+    }
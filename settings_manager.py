@@ -1,88 +1,333 @@
 # Settings Manager for Tkinter version
 # Equivalent to QSettings functionality
 import os
+import sys
 import json
+import time
+import atexit
 import hashlib
-from typing import Any, Optional, Dict
-from pathlib import Path
+import tempfile
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote, unquote
+from typing import Any, Optional, Dict, TypedDict
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+# Seconds to wait after the last change before writing settings to disk
+DEFAULT_SAVE_DELAY = 1.0
+# Project groups not used for this many days are removed (0 keeps them forever)
+DEFAULT_MAX_AGE_DAYS = 180
+# Only rewrite a group's last-used time in the index once a day
+INDEX_TOUCH_INTERVAL = 24 * 60 * 60
+
+def _write_json_atomic(path: str, data: Any):
+    """Write JSON through a temporary file that then replaces path
+
+    A crash mid-write leaves the old file in place instead of a truncated one.
+    """
+    text = json.dumps(data, indent=2, ensure_ascii=False)
+    fd, tmp_path = tempfile.mkstemp(prefix=".settings-", suffix=".tmp", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+@contextmanager
+def _file_lock(path: str):
+    """Hold an exclusive advisory lock on path across processes"""
+    with open(path, 'a+b') as f:
+        if os.name == 'nt':
+            f.seek(0)
+            while True:
+                try:
+                    # LK_LOCK only retries for about 10 seconds before raising
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def get_settings_dir(organization: str, application: str) -> str:
+    """Get platform-specific settings directory"""
+    if os.name == 'nt':  # Windows
+        base_dir = os.environ.get('APPDATA', os.path.expanduser('~'))
+    elif os.name == 'posix':  # macOS/Linux
+        if os.uname().sysname == 'Darwin':  # macOS
+            base_dir = os.path.expanduser('~/Library/Preferences')
+        else:  # Linux
+            base_dir = os.environ.get('XDG_CONFIG_HOME', os.path.expanduser('~/.config'))
+    else:
+        base_dir = os.path.expanduser('~')
+    return os.path.join(base_dir, organization, application)
+
+def _group_file(groups_dir: str, group: str) -> str:
+    # Percent-encode so any group name is a valid file name on every platform
+    return os.path.join(groups_dir, quote(group, safe="") + ".json")
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return None
+    return data if isinstance(data, dict) else None
+
+def _touch_index(index_file: str, groups, force: set[str] = frozenset()):
+    """Update last-used times of groups in the index
+
+    Entries are only rewritten once they are INDEX_TOUCH_INTERVAL old, or
+    always for groups in force. Called with the file lock held.
+    """
+    now = time.time()
+    index = _read_json(index_file) or {}
+    changed = False
+    for group in groups:
+        entry = index.get(group)
+        if group in force or not isinstance(entry, dict) or now - entry.get("last_used", 0) > INDEX_TOUCH_INTERVAL:
+            index[group] = {"last_used": now}
+            changed = True
+    if changed:
+        _write_json_atomic(index_file, index)
 
 class SettingsManager:
-    """Settings manager equivalent to QSettings for cross-platform compatibility"""
-    
-    def __init__(self, organization: str, application: str):
+    """Settings manager equivalent to QSettings for cross-platform compatibility
+
+    Every group lives in its own small file under groups/ and is only read
+    the first time it is used, so startup cost doesn't grow with the number
+    of projects ever seen. index.json records when each group was last used
+    so stale project groups can be garbage-collected.
+
+    Changes are kept in memory and written behind: setValue only marks the
+    group dirty and (re)starts a short timer, so a burst of changes such as
+    typing a command costs one write. flush() writes immediately; close()
+    runs automatically at interpreter exit.
+
+    Several UI processes may share the store: writes happen under an
+    advisory file lock and re-read each dirty group from disk, applying only
+    the keys this process changed, so concurrent windows don't lose each
+    other's updates.
+    """
+
+    def __init__(
+        self,
+        organization: str,
+        application: str,
+        save_delay: float = DEFAULT_SAVE_DELAY,
+        settings_dir: Optional[str] = None,
+    ):
         self.organization = organization
         self.application = application
-        self.settings_dir = self._get_settings_dir()
+        self.save_delay = save_delay
+        if settings_dir is not None:
+            os.makedirs(os.path.join(settings_dir, "groups"), exist_ok=True)
+            self.settings_dir = settings_dir
+        else:
+            self.settings_dir = self._get_settings_dir()
+        self.groups_dir = os.path.join(self.settings_dir, "groups")
+        self.index_file = os.path.join(self.settings_dir, "index.json")
+        self.lock_file = os.path.join(self.settings_dir, ".lock")
+        # Single-file store used before groups were split into their own files
         self.settings_file = os.path.join(self.settings_dir, "settings.json")
-        self.settings = self._load_settings()
-    
+        # Groups loaded so far, filled lazily by _group()
+        self.settings: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+        # Keys changed by this process and not yet written, per group
+        self._dirty: Dict[str, set[str]] = {}
+        self._save_timer: Optional[threading.Timer] = None
+        self._migrate_settings_file()
+        atexit.register(self.close)
+
     def _get_settings_dir(self) -> str:
-        """Get platform-specific settings directory"""
-        if os.name == 'nt':  # Windows
-            base_dir = os.environ.get('APPDATA', os.path.expanduser('~'))
-        elif os.name == 'posix':  # macOS/Linux
-            if os.uname().sysname == 'Darwin':  # macOS
-                base_dir = os.path.expanduser('~/Library/Preferences')
-            else:  # Linux
-                base_dir = os.environ.get('XDG_CONFIG_HOME', os.path.expanduser('~/.config'))
-        else:
-            base_dir = os.path.expanduser('~')
-        
-        settings_dir = os.path.join(base_dir, self.organization, self.application)
-        os.makedirs(settings_dir, exist_ok=True)
+        settings_dir = get_settings_dir(self.organization, self.application)
+        os.makedirs(os.path.join(settings_dir, "groups"), exist_ok=True)
         return settings_dir
-    
-    def _load_settings(self) -> Dict[str, Any]:
-        """Load settings from file"""
-        if os.path.exists(self.settings_file):
-            try:
-                with open(self.settings_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError):
-                pass
-        return {}
-    
+
+    def _group_file(self, group: str) -> str:
+        return _group_file(self.groups_dir, group)
+
+    def _migrate_settings_file(self):
+        """Split a settings.json written by older versions into group files"""
+        if not os.path.exists(self.settings_file) or os.path.exists(self.index_file):
+            return
+        try:
+            with _file_lock(self.lock_file):
+                # Another process may have migrated while we waited for the lock
+                if not os.path.exists(self.settings_file) or os.path.exists(self.index_file):
+                    return
+                legacy = _read_json(self.settings_file) or {}
+                now = time.time()
+                for group, values in legacy.items():
+                    if isinstance(values, dict):
+                        _write_json_atomic(self._group_file(group), values)
+                _write_json_atomic(self.index_file, {group: {"last_used": now} for group in legacy})
+                os.replace(self.settings_file, self.settings_file + ".migrated")
+        except IOError as e:
+            print(f"Error migrating settings: {e}", file=sys.stderr)
+
+    def _group(self, group: str) -> Dict[str, Any]:
+        """Return a group's values, reading its file on first use"""
+        values = self.settings.get(group)
+        if values is None:
+            values = _read_json(self._group_file(group)) or {}
+            self.settings[group] = values
+        return values
+
+    def _load_index(self) -> Dict[str, Any]:
+        return _read_json(self.index_file) or {}
+
     def _save_settings(self):
-        """Save settings to file"""
+        """Merge dirty keys into the groups on disk and record them in the index
+
+        Each dirty group is re-read under the file lock and only the keys
+        changed by this process are applied, so neither windows for other
+        projects nor other windows for the same project lose their updates.
+        Called with the lock held.
+        """
+        dirty, self._dirty = self._dirty, {}
         try:
-            with open(self.settings_file, 'w', encoding='utf-8') as f:
-                json.dump(self.settings, f, indent=2, ensure_ascii=False)
+            with _file_lock(self.lock_file):
+                for group, keys in dirty.items():
+                    values = _read_json(self._group_file(group)) or {}
+                    local = self.settings[group]
+                    for key in keys:
+                        values[key] = local[key]
+                    _write_json_atomic(self._group_file(group), values)
+                    # Pick up what other processes wrote in the meantime
+                    self.settings[group] = values
+                self._touch_index(force=set(dirty))
         except IOError as e:
-            print(f"Error saving settings: {e}")
-    
+            # Keep the changes so the next flush retries them
+            for group, keys in dirty.items():
+                self._dirty.setdefault(group, set()).update(keys)
+            print(f"Error saving settings: {e}", file=sys.stderr)
+
+    def _touch_index(self, force: set[str] = frozenset()):
+        """Update last-used times of the groups used by this process
+
+        Called with the file lock held.
+        """
+        _touch_index(self.index_file, self.settings, force)
+
+    def _schedule_save(self, group: str, key: str):
+        with self._lock:
+            self._dirty.setdefault(group, set()).add(key)
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+            self._save_timer = threading.Timer(self.save_delay, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self):
+        """Write pending changes to disk now"""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if self._dirty:
+                self._save_settings()
+
+    def close(self):
+        """Flush pending changes, record which groups were used and drop stale ones
+
+        Runs at interpreter exit, off the startup path.
+        """
+        atexit.unregister(self.close)
+        with self._lock:
+            self.flush()
+            try:
+                if self.settings:
+                    with _file_lock(self.lock_file):
+                        self._touch_index()
+                self.collect_garbage(settings_max_age_from_env())
+            except (IOError, ValueError) as e:
+                print(f"Error saving settings: {e}", file=sys.stderr)
+
+    def collect_garbage(self, max_age_days: float = DEFAULT_MAX_AGE_DAYS, keep: tuple[str, ...] = ()) -> list[str]:
+        """Remove groups that haven't been used for max_age_days
+
+        Group files that are missing from the index (e.g. written by a crashed
+        process) are adopted instead of removed. Returns the removed groups.
+        """
+        if max_age_days <= 0:
+            return []
+        cutoff = time.time() - max_age_days * 24 * 60 * 60
+        removed = []
+        with self._lock, _file_lock(self.lock_file):
+            index = self._load_index()
+            for group, entry in list(index.items()):
+                if group in keep or group in self.settings:
+                    continue
+                if isinstance(entry, dict) and entry.get("last_used", 0) >= cutoff:
+                    continue
+                try:
+                    os.unlink(self._group_file(group))
+                except FileNotFoundError:
+                    pass
+                del index[group]
+                removed.append(group)
+            indexed_files = {os.path.basename(self._group_file(group)) for group in index}
+            orphans = [
+                name for name in os.listdir(self.groups_dir)
+                if name.endswith(".json") and name not in indexed_files
+            ]
+            now = time.time()
+            for name in orphans:
+                index[unquote(name[:-len(".json")])] = {"last_used": now}
+            if removed or orphans:
+                _write_json_atomic(self.index_file, index)
+        return removed
+
     def beginGroup(self, group: str):
         """Begin a settings group (context manager)"""
         return SettingsGroup(self, group)
-    
+
     def setValue(self, key: str, value: Any):
         """Set a value in the current group"""
         if not hasattr(self, '_current_group'):
             self._current_group = 'default'
-        
-        if self._current_group not in self.settings:
-            self.settings[self._current_group] = {}
-        
-        self.settings[self._current_group][key] = value
-        self._save_settings()
-    
+
+        with self._lock:
+            group = self._group(self._current_group)
+            if key in group and group[key] == value:
+                return
+            group[key] = value
+            self._schedule_save(self._current_group, key)
+
     def value(self, key: str, default: Any = None, type: type = None) -> Any:
         """Get a value from the current group"""
         if not hasattr(self, '_current_group'):
             self._current_group = 'default'
-        
-        if self._current_group not in self.settings:
-            return default
-        
-        value = self.settings[self._current_group].get(key, default)
-        
+
+        with self._lock:
+            value = self._group(self._current_group).get(key, default)
+
         if type and value is not None:
             try:
                 return type(value)
             except (ValueError, TypeError):
                 return default
-        
+
         return value
-    
+
     def get_project_group_name(self, project_dir: str) -> str:
         """Get project-specific group name"""
         basename = os.path.basename(os.path.normpath(project_dir))
@@ -91,17 +336,17 @@ class SettingsManager:
 
 class SettingsGroup:
     """Context manager for settings groups"""
-    
+
     def __init__(self, settings_manager: SettingsManager, group: str):
         self.settings_manager = settings_manager
         self.group = group
         self.original_group = None
-    
+
     def __enter__(self):
         self.original_group = getattr(self.settings_manager, '_current_group', 'default')
         self.settings_manager._current_group = self.group
         return self
-    
+
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.settings_manager._current_group = self.original_group
 
@@ -111,3 +356,96 @@ def get_project_settings_group(project_dir: str) -> str:
     full_hash = hashlib.md5(project_dir.encode('utf-8')).hexdigest()[:8]
     return f"{basename}_{full_hash}"
 
+class ProjectSettings(TypedDict):
+    run_command: str
+    execute_automatically: bool
+    # NAME=value assignments added to the command's environment
+    environment: str
+    command_section_visible: bool
+    geometry: Optional[str]
+    window_state: Optional[str]
+
+class SettingsSnapshot:
+    """Read-only view of the settings store for the server
+
+    Group files are cached and only re-read when their mtime, size or inode
+    changed, so resolving a project's settings before each launch is a
+    couple of stat calls. The result is handed to the UI, which then doesn't
+    read settings from disk on its startup path.
+
+    A window that only submits never writes its settings, so resolving a
+    project also records it as used in the index; otherwise projects in
+    daily use would be garbage-collected.
+    """
+
+    def __init__(self, organization: str, application: str, settings_dir: Optional[str] = None):
+        self.settings_dir = settings_dir or get_settings_dir(organization, application)
+        self.groups_dir = os.path.join(self.settings_dir, "groups")
+        self.index_file = os.path.join(self.settings_dir, "index.json")
+        self.legacy_file = os.path.join(self.settings_dir, "settings.json")
+        self.lock_file = os.path.join(self.settings_dir, ".lock")
+        # When this process last recorded each group as used
+        self._used: Dict[str, float] = {}
+        self._cache: Dict[str, tuple[Optional[tuple[int, int, int]], Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def group(self, group: str) -> Dict[str, Any]:
+        path = _group_file(self.groups_dir, group)
+        try:
+            st = os.stat(path)
+            stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+        except FileNotFoundError:
+            stamp = None
+        with self._lock:
+            cached = self._cache.get(group)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+            values = (_read_json(path) or {}) if stamp is not None else {}
+            self._cache[group] = (stamp, values)
+            return values
+
+    def record_use(self, groups: tuple[str, ...]):
+        """Refresh the index's last-used time of groups that exist on disk
+
+        Only touches the index once per INDEX_TOUCH_INTERVAL per group.
+        """
+        now = time.time()
+        with self._lock:
+            due = [
+                group for group in groups
+                if now - self._used.get(group, 0) > INDEX_TOUCH_INTERVAL
+                and group in self._cache and self._cache[group][0] is not None
+            ]
+            for group in due:
+                self._used[group] = now
+        if not due:
+            return
+        try:
+            with _file_lock(self.lock_file):
+                _touch_index(self.index_file, due)
+        except IOError as e:
+            print(f"Error recording settings use: {e}", file=sys.stderr)
+
+    def project_settings(self, project_directory: str) -> Optional[ProjectSettings]:
+        """Resolve everything a window for project_directory needs at startup
+
+        Returns None while an old settings.json is still waiting to be
+        migrated; the UI then loads its settings itself.
+        """
+        if os.path.exists(self.legacy_file) and not os.path.exists(self.index_file):
+            return None
+        project_group = get_project_settings_group(project_directory)
+        project = self.group(project_group)
+        window = self.group("MainWindow_General")
+        self.record_use((project_group, "MainWindow_General"))
+        return ProjectSettings(
+            run_command=str(project.get("run_command", "")),
+            execute_automatically=bool(project.get("execute_automatically", False)),
+            environment=str(project.get("environment", "")),
+            command_section_visible=bool(project.get("commandSectionVisible", False)),
+            geometry=window.get("geometry"),
+            window_state=window.get("windowState"),
+        )
+
+def settings_max_age_from_env() -> float:
+    return float(os.environ.get("INTERACTIVE_FEEDBACK_SETTINGS_MAX_AGE_DAYS", DEFAULT_MAX_AGE_DAYS))
@@ -0,0 +1,171 @@
+# Standby pool of pre-started feedback UI processes
+# An alternative to the persistent UI worker: every call gets a fresh process,
+# but one that has already imported the toolkit and is parked on stdin, so
+# the window appears without the cold-start wait
+import os
+import sys
+import time
+import asyncio
+from typing import Callable
+
+from ui_worker import UIWorker
+
+class StandbyPool:
+    """Keeps up to `size` idle UI processes started in the background
+
+    acquire() hands out the oldest standby process and immediately starts a
+    replacement; each process serves a single request and is then told to
+    exit. A process only counts as standby once it reported that it is
+    ready. After a cold start the pool is filled once the request is done.
+
+    Processes left unused for idle_seconds are stopped and only replaced on
+    the next call, so an idle server gives the memory back. With
+    memory_budget_mb the standby processes together stay under that much
+    resident memory; no replacement is started that would exceed it.
+    """
+
+    def __init__(
+        self,
+        worker_factory: Callable[[], UIWorker],
+        size: int = 1,
+        idle_seconds: float = 600.0,
+        memory_budget_mb: float = 0,
+    ):
+        self.worker_factory = worker_factory
+        self.size = max(0, size)
+        self.idle_seconds = idle_seconds
+        # 0 means no limit
+        self.memory_budget_mb = memory_budget_mb
+        # (worker, monotonic time it became ready), oldest first
+        self._standby: list[tuple[UIWorker, float]] = []
+        self._starting: set[UIWorker] = set()
+        self._spawns: set[asyncio.Task] = set()
+        self._tasks: set[asyncio.Task] = set()
+        # Largest resident size seen for one standby process, in MB
+        self._process_mb = 0.0
+        self.warm_hits = 0
+        self.cold_starts = 0
+
+    async def acquire(self) -> tuple[UIWorker, bool]:
+        """Return a worker for one request and whether it was ready right away"""
+        self._expire()
+        waited = False
+        while True:
+            while self._standby:
+                worker, _ = self._standby.pop(0)
+                if worker.is_alive():
+                    self.warm_hits += 0 if waited else 1
+                    self._refill()
+                    return worker, not waited
+            if not self._spawns:
+                break
+            # A replacement is already importing, it is further along than a new process
+            waited = True
+            await asyncio.wait(self._spawns, return_when=asyncio.FIRST_COMPLETED)
+        # Nothing warm: this call pays the cold start. Filling the pool now would
+        # compete with it for the CPU, so that waits until the request is done
+        self.cold_starts += 1
+        return self.worker_factory(), False
+
+    def release(self, worker: UIWorker):
+        """Single use: let the process exit once its request is done"""
+        self._run(worker.stop())
+        self._refill()
+
+    def _run(self, coroutine) -> asyncio.Task:
+        task = asyncio.get_running_loop().create_task(coroutine)
+        # Keep a reference until it is done, the loop only holds weak ones
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _refill(self):
+        for _ in range(self.size - len(self._standby) - len(self._spawns)):
+            if not self._within_budget():
+                break
+            task = self._run(self._spawn())
+            self._spawns.add(task)
+            task.add_done_callback(self._spawns.discard)
+
+    async def _spawn(self):
+        worker = self.worker_factory()
+        self._starting.add(worker)
+        try:
+            ready = await worker.wait_ready()
+        except OSError as e:
+            print(f"Error starting standby UI process: {e}", file=sys.stderr)
+            return
+        finally:
+            self._starting.discard(worker)
+        if not ready:
+            print("Standby UI process didn't become ready, dropping it", file=sys.stderr)
+            worker.kill()
+            return
+        self._standby.append((worker, time.monotonic()))
+        if self.idle_seconds > 0:
+            asyncio.get_running_loop().call_later(self.idle_seconds, self._expire)
+
+    def _expire(self):
+        now = time.monotonic()
+        keep = []
+        for worker, ready_at in self._standby:
+            if self.idle_seconds > 0 and now - ready_at >= self.idle_seconds:
+                worker.kill()
+            elif worker.is_alive():
+                keep.append((worker, ready_at))
+        self._standby = keep
+
+    def memory_mb(self) -> float:
+        """Resident memory of the standby processes, in MB"""
+        # Imported on first use: only needed with a memory budget or for status
+        import psutil
+
+        total = 0.0
+        for worker, _ in self._standby:
+            try:
+                rss = psutil.Process(worker.process.pid).memory_info().rss / (1024 * 1024)
+            except (AttributeError, psutil.Error):
+                continue
+            self._process_mb = max(self._process_mb, rss)
+            total += rss
+        return total
+
+    def _within_budget(self) -> bool:
+        if not self.memory_budget_mb:
+            return True
+        used = self.memory_mb()
+        if not self._process_mb:
+            # Until one has been measured, start a single process
+            return not self._standby and not self._spawns
+        # Processes still starting are counted at the size of a ready one
+        used += len(self._spawns) * self._process_mb
+        return used + self._process_mb <= self.memory_budget_mb
+
+    def kill_all(self):
+        for worker in (*(worker for worker, _ in self._standby), *self._starting):
+            worker.kill()
+        self._standby = []
+
+    async def close(self):
+        """Stop every standby process and wait for pending starts and exits"""
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        workers, self._standby = self._standby, []
+        await asyncio.gather(*(worker.stop() for worker, _ in workers))
+
+    def status(self) -> dict:
+        return {
+            "size": self.size,
+            "standby": len(self._standby),
+            "starting": len(self._spawns),
+            "memory_mb": round(self.memory_mb(), 1),
+            "memory_budget_mb": self.memory_budget_mb,
+            "warm_hits": self.warm_hits,
+            "cold_starts": self.cold_starts,
+        }
+
+def standby_limits_from_env() -> dict:
+    return {
+        "size": int(os.environ.get("INTERACTIVE_FEEDBACK_STANDBY_SIZE", "1")),
+        "idle_seconds": float(os.environ.get("INTERACTIVE_FEEDBACK_STANDBY_IDLE_SECONDS", "600")),
+        "memory_budget_mb": float(os.environ.get("INTERACTIVE_FEEDBACK_STANDBY_MEMORY_MB", "0")),
+    }
@@ -22,7 +22,7 @@ def test_mcp_server():
         "params": {
             "name": "interactive_feedback",
             "arguments": {
-                "project_directory": "/Users/btk0092/Documents/mcp/interactive-feedback-mcp",
+                "project_directory": script_dir,
                 "summary": "Test từ client - Bạn có thể thấy UI không?"
             }
         }
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Tests for reading command output
+"""
+import sys
+import os
+import time
+import asyncio
+import tempfile
+import subprocess
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from command_runner import (
+    NEW_PROCESS_GROUP, PTY_SUPPORTED, AnsiFilter, OutputThrottle, PipeReader,
+    get_user_environment, keep_last_lines, kill_tree, parse_environment, run_command, start_command,
+)
+
+def run_reader(script: str) -> list:
+    """Run a Python snippet and return everything the reader reported, in order"""
+    events = []
+    process = subprocess.Popen(
+        [sys.executable, "-c", script],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        bufsize=0,
+        **NEW_PROCESS_GROUP,
+    )
+    reader = PipeReader(process, lambda stream, text: events.append((stream, text)), events.append).start()
+    assert reader.join(timeout=10)
+    assert process.stdout.closed and process.stderr.closed
+    return events
+
+def test_streams_are_tagged_and_exit_comes_last():
+    events = run_reader(
+        "import sys\n"
+        "sys.stdout.write('out 1\\nout 2\\n'); sys.stdout.flush()\n"
+        "sys.stderr.write('err\\n'); sys.stderr.flush()\n"
+        "sys.exit(3)\n"
+    )
+    assert ("stdout", "out 1\nout 2\n") in events
+    assert ("stderr", "err\n") in events
+    assert events[-1] == 3
+
+def test_split_characters_and_invalid_bytes():
+    events = run_reader(
+        "import sys, time\n"
+        "out = sys.stdout.buffer\n"
+        "out.write(b'caf\\xc3'); out.flush(); time.sleep(0.1)\n"
+        "out.write(b'\\xa9\\n\\xff no newline'); out.flush()\n"
+    )
+    text = "".join(event[1] for event in events[:-1])
+    assert text == "café\n� no newline"
+    assert events[-1] == 0
+
+def test_ansi_filter():
+    strip = AnsiFilter()
+    assert strip("\x1b[1;32mPASSED\x1b[0m \x1b]8;;http://x\x07link\x1b]8;;\x07\n") == "PASSED link\n"
+    assert strip("10%\r50%\r100%\ndone\r\n") == "100%\ndone\n"
+    assert strip("plain\n") == "plain\n"
+
+def test_pty_mode():
+    if not PTY_SUPPORTED:
+        return
+    events = []
+    process = start_command(
+        f"{sys.executable} -c \"import sys; print(sys.stdout.isatty()); print(sys.stderr.isatty(), file=sys.stderr)\"",
+        os.getcwd(),
+        pty=True,
+    )
+    reader = PipeReader(process, lambda stream, text: events.append((stream, text)), events.append).start()
+    assert reader.join(timeout=10)
+    # Both streams are terminals and still told apart
+    assert sorted(events[:-1]) == [("stderr", "True\n"), ("stdout", "True\n")]
+    assert events[-1] == 0
+
+def test_environment_overlay():
+    overlay = parse_environment('RUST_LOG=debug PYTHONPATH="src lib" EMPTY= # comment')
+    assert overlay == {"RUST_LOG": "debug", "PYTHONPATH": "src lib", "EMPTY": ""}
+    env = get_user_environment(overlay)
+    assert env["PYTHONPATH"] == "src lib"
+    # The cached snapshot itself is never changed
+    assert get_user_environment().get("RUST_LOG") == os.environ.get("RUST_LOG")
+    for bad in ('NAME="unclosed', "no_equals_sign", "=value"):
+        try:
+            parse_environment(bad)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{bad!r} was accepted")
+
+def test_output_throttle():
+    throttle = OutputThrottle(interval=60, max_chars=10)
+    throttle.add("first\n")
+    assert throttle.take(force=False) == "first\n"
+    # Within the interval only a forced take gets the held back output
+    throttle.add("second\n")
+    assert throttle.take(force=False) == ""
+    assert throttle.take() == "second\n"
+    assert throttle.take() == ""
+    # A chatty command: only the end is kept, after a marker
+    for i in range(1000):
+        throttle.add(f"line {i}\n")
+    assert throttle.take() == "... 8880 characters skipped ...\n\nline 999\n"
+
+def test_keep_last_lines():
+    assert keep_last_lines("a\nb\n", 2) == "a\nb\n"
+    assert keep_last_lines("a\nb\nc\nd", 2) == "... 2 lines skipped ...\nc\nd"
+    assert keep_last_lines("a\nb\nc\n", 1) == "... 2 lines skipped ...\nc\n"
+
+def is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # A killed orphan stays a zombie until init gets around to reaping it
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            return f.read().rsplit(b")", 1)[1].split()[0] != b"Z"
+    except OSError:
+        return True
+
+def start_group(command: str) -> subprocess.Popen:
+    return subprocess.Popen(["sh", "-c", command], **NEW_PROCESS_GROUP)
+
+def test_kill_tree_escalates_to_sigkill():
+    if sys.platform == "win32":
+        return
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pid_file = os.path.join(tmp_dir, "pid")
+        # The grandchild ignores SIGTERM, the shell in between doesn't
+        process = start_group(
+            f"sh -c 'trap \"\" TERM; echo $$ > {pid_file}.tmp; mv {pid_file}.tmp {pid_file}; "
+            f"while :; do sleep 0.1; done' & wait"
+        )
+        deadline = time.monotonic() + 10
+        while not os.path.exists(pid_file):
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        with open(pid_file) as f:
+            grandchild = int(f.read())
+
+        start = time.monotonic()
+        kill_tree(process, grace=0.5)
+        # It only went once the grace period was over
+        assert time.monotonic() - start >= 0.5
+        assert process.returncode is not None
+        assert not is_running(grandchild)
+
+def test_kill_tree_skips_the_grace_period_for_polite_commands():
+    if sys.platform == "win32":
+        return
+    process = start_group("sleep 30 & sleep 30")
+    time.sleep(0.1)
+    start = time.monotonic()
+    kill_tree(process, grace=5)
+    assert time.monotonic() - start < 1
+    assert process.returncode is not None
+
+def test_run_command_exit_code_and_environment():
+    events = []
+
+    async def on_event(event):
+        events.append(event)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        result = asyncio.run(run_command(
+            'echo "greeting=$GREETING"; echo oops >&2; exit 3',
+            tmp_dir,
+            on_event=on_event,
+            environment={"GREETING": "hi"},
+        ))
+    assert result["exit_code"] == 3 and not result["timed_out"]
+    assert "greeting=hi\n" in result["logs"]
+    assert result["logs"].endswith("Process exited with code 3\n")
+    assert result["stderr_lines"] == 1
+    streamed = "".join(event["text"] for event in events if event["type"] == "output")
+    assert "greeting=hi\n" in streamed
+
+def test_run_command_timeout():
+    if sys.platform == "win32":
+        return
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pid_file = os.path.join(tmp_dir, "pid")
+        start = time.monotonic()
+        result = asyncio.run(run_command(f"echo started; sleep 30 & echo $! > {pid_file}; wait", tmp_dir, timeout=0.5))
+        # sleep exits on SIGTERM, so the grace period isn't waited out
+        assert time.monotonic() - start < 2
+        with open(pid_file) as f:
+            child = int(f.read())
+    assert result["timed_out"] and result["exit_code"] is None
+    assert result["logs"].startswith("$ echo started")
+    assert "Process killed after timing out (0.5 s)" in result["logs"]
+    assert not is_running(child)
+
+if __name__ == "__main__":
+    test_streams_are_tagged_and_exit_comes_last()
+    test_split_characters_and_invalid_bytes()
+    test_ansi_filter()
+    test_pty_mode()
+    test_environment_overlay()
+    test_output_throttle()
+    test_keep_last_lines()
+    test_kill_tree_escalates_to_sigkill()
+    test_kill_tree_skips_the_grace_period_for_polite_commands()
+    test_run_command_exit_code_and_environment()
+    test_run_command_timeout()
+    print("✅ command runner tests passed")
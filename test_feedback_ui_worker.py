@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Tests for the PySide6 feedback window: the worker serves each project with that
+project's own settings, and a run that doesn't start isn't reported
+"""
+import sys
+import os
+import json
+import tempfile
+import threading
+import subprocess
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from result_channel import parse_result_line
+from settings_manager import get_project_settings_group
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def save_project_settings(config_dir: str, project_directory: str, settings: dict):
+    # Written in a child process, so the QSettings location follows XDG_CONFIG_HOME
+    code = (
+        "import sys, json\n"
+        "from PySide6.QtCore import QSettings\n"
+        "settings = QSettings('InteractiveFeedbackMCP', 'InteractiveFeedbackMCP')\n"
+        "settings.beginGroup(sys.argv[1])\n"
+        "for key, value in json.loads(sys.argv[2]).items():\n"
+        "    settings.setValue(key, value)\n"
+        "settings.endGroup()\n"
+        "settings.sync()\n"
+    )
+    subprocess.run(
+        [sys.executable, "-c", code, get_project_settings_group(project_directory), json.dumps(settings)],
+        env={**os.environ, "XDG_CONFIG_HOME": config_dir},
+        check=True,
+    )
+
+def test_reset_uses_the_new_projects_settings():
+    with tempfile.TemporaryDirectory() as config_dir:
+        project_a = os.path.join(config_dir, "a")
+        project_b = os.path.join(config_dir, "b")
+        project_c = os.path.join(config_dir, "c")
+        for project in (project_a, project_b, project_c):
+            os.makedirs(project)
+        save_project_settings(config_dir, project_a, {
+            "run_command": "echo A",
+            "execute_automatically": True,
+            "environment": "X=1",
+            "commandSectionVisible": True,
+        })
+        save_project_settings(config_dir, project_b, {
+            "run_command": "echo B",
+            "execute_automatically": False,
+            "commandSectionVisible": True,
+        })
+        save_project_settings(config_dir, project_c, {
+            # Reading stdin must get EOF, not the worker's next request
+            "run_command": 'cat; echo "[$X]"',
+            "execute_automatically": True,
+            "commandSectionVisible": True,
+        })
+
+        env = {
+            **os.environ,
+            "XDG_CONFIG_HOME": config_dir,
+            "QT_QPA_PLATFORM": "offscreen",
+            "INTERACTIVE_FEEDBACK_AUTO_SUBMIT": "0.5",
+        }
+        worker = subprocess.Popen(
+            [sys.executable, os.path.join(SCRIPT_DIR, "feedback_ui.py"), "--worker"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            env=env,
+        )
+        # Like the server, keep the pipe open and send one request at a time
+        timer = threading.Timer(60, worker.kill)
+        timer.start()
+        results = []
+        try:
+            for project in (project_a, project_c, project_b):
+                worker.stdin.write(json.dumps({"project_directory": project, "prompt": "test"}) + "\n")
+                worker.stdin.flush()
+                result = None
+                while result is None:
+                    line = worker.stdout.readline()
+                    assert line, "worker exited"
+                    result = parse_result_line(line.rstrip("\n"))
+                results.append(result)
+        finally:
+            timer.cancel()
+            worker.stdin.close()
+            worker.wait(timeout=10)
+        assert results[0]["command"]["command"] == "echo A"
+        # A's environment overlay isn't used for C, and cat got EOF
+        # instead of reading B's request from the worker's stdin
+        assert results[1]["command"]["command"] == 'cat; echo "[$X]"'
+        assert results[1]["logs"].startswith('$ cat; echo "[$X]"\n[]\n')
+        # B doesn't run automatically, so no command was started for it
+        assert "command" not in results[2]
+
+def test_empty_command_drops_the_previous_run():
+    # Run in a child process: a QApplication breaks later tests that fork
+    code = (
+        "import sys\n"
+        "from feedback_result import CommandRun, build_result\n"
+        "from feedback_ui import FeedbackUI, create_application\n"
+        "app = create_application()\n"
+        "window = FeedbackUI(sys.argv[1], 'test')\n"
+        "window._ensure_command_section()\n"
+        "# A finished earlier run\n"
+        "window.command_run = CommandRun('echo first')\n"
+        "window.command_run.finish(0)\n"
+        "# Nothing runs, so the earlier run must not be reported with the new logs\n"
+        "window.command_entry.setText('')\n"
+        "window._run_command()\n"
+        "result = build_result('', window.log_buffer, window.command_run, window.timer)\n"
+        "assert 'command' not in result, result\n"
+    )
+    with tempfile.TemporaryDirectory() as config_dir:
+        completed = subprocess.run(
+            [sys.executable, "-c", code, config_dir],
+            cwd=SCRIPT_DIR,
+            env={**os.environ, "XDG_CONFIG_HOME": config_dir, "QT_QPA_PLATFORM": "offscreen"},
+            capture_output=True,
+            text=True,
+            timeout=60,
+        )
+        assert completed.returncode == 0, completed.stderr
+
+if __name__ == "__main__":
+    test_reset_uses_the_new_projects_settings()
+    test_empty_command_drops_the_previous_run()
+    print("✅ feedback UI worker tests passed")
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Tests for the stream-tagged command log
+"""
+import sys
+import os
+import json
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from log_store import LogStore
+from feedback_result import CommandRun, build_result
+from output_stream import RecentLogs
+
+def make_log() -> LogStore:
+    log = LogStore(max_bytes=10000, max_lines=20, head_lines=3)
+    for i in range(100):
+        log.append(f"line {i}\n", "stderr" if i % 10 == 0 else "stdout", at=i / 10)
+    return log
+
+def test_head_tail_and_filters():
+    log = make_log()
+    lines = log.getvalue().splitlines()
+    assert lines[:4] == ["line 0", "line 1", "line 2", "... 80 lines elided ..."]
+    assert lines[-1] == "line 99"
+    assert log.getvalue(streams=["stderr"]).splitlines() == ["line 0", "... 8 lines elided ...", "line 90"]
+    # A window after the elided lines has no marker
+    assert log.getvalue(since=9.75) == "line 98\nline 99\n"
+    assert log.getvalue(streams=["stderr"], until=0.05, timestamps=True) == "[    0.000 stderr] line 0\n"
+    assert log.count("stderr") == 10
+
+def test_records_round_trip():
+    log = make_log()
+    copy = LogStore.from_records(json.loads(json.dumps(log.records())))
+    assert copy.getvalue() == log.getvalue()
+    assert copy.getvalue(streams=["stderr"]) == log.getvalue(streams=["stderr"])
+    assert (copy.total_lines, copy.elided_lines, copy.count("stderr")) == (100, 80, 10)
+
+def test_result_sends_the_log_once():
+    log = make_log()
+    command = CommandRun("make")
+    command.finish(0)
+    # Only the server asks for records, and then the plain log isn't sent as well
+    assert "log_records" not in build_result("ok", log, command)
+    result = json.loads(json.dumps(build_result("ok", log, command, log_records=True)))
+    assert result["logs"] == ""
+    # The server turns the records back into the plain log for the agent
+    recent_logs = RecentLogs()
+    recent_logs.remember_result("/p", result)
+    assert "log_records" not in result and result["logs"] == log.getvalue()
+    assert recent_logs.query("/p", stream="stderr")["logs"] == log.getvalue(streams=["stderr"])
+
+if __name__ == "__main__":
+    test_head_tail_and_filters()
+    test_records_round_trip()
+    test_result_sends_the_log_once()
+    print("✅ log store tests passed")
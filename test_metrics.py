@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test the recorded feedback call metrics: JSON lines and Prometheus histograms
+"""
+import sys
+import os
+import json
+import time
+import tempfile
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import metrics
+from metrics import CALLS_FILE, PROMETHEUS_FILE, FeedbackCallMetrics, record_call
+
+def make_call(now: float, cold_start: bool, think_time: float) -> tuple[FeedbackCallMetrics, dict]:
+    call = FeedbackCallMetrics()
+    call.started_at = now - 10
+    call.phase("queue_wait", 0.02)
+    call.launched(cold_start=cold_start)
+    call.launched_at = now - 9
+    result = {
+        "timing": {"shown_at": now - 8, "closed_at": now - 8 + think_time, "startup": {"widget build": 0.3}},
+        "command": {"command": "make", "duration_seconds": 0.7},
+    }
+    return call, result
+
+def test_record_call():
+    with tempfile.TemporaryDirectory() as metrics_dir:
+        saved = os.environ.get("INTERACTIVE_FEEDBACK_METRICS_DIR")
+        os.environ["INTERACTIVE_FEEDBACK_METRICS_DIR"] = metrics_dir
+        metrics._recorder = None
+        try:
+            now = time.time()
+            record_call(*make_call(now, cold_start=True, think_time=5))
+            record_call(*make_call(now, cold_start=False, think_time=7))
+        finally:
+            metrics._recorder = None
+            if saved is None:
+                del os.environ["INTERACTIVE_FEEDBACK_METRICS_DIR"]
+            else:
+                os.environ["INTERACTIVE_FEEDBACK_METRICS_DIR"] = saved
+
+        with open(os.path.join(metrics_dir, CALLS_FILE), encoding="utf-8") as f:
+            calls = [json.loads(line) for line in f]
+        assert [call["cold_start"] for call in calls] == [True, False]
+        phases = calls[0]["phases"]
+        assert {name: phases[name] for name in ("queue_wait", "ui_start", "think_time", "command_runtime", "ui_startup_widget_build")} == {
+            "queue_wait": 0.02, "ui_start": 1.0, "think_time": 5.0, "command_runtime": 0.7, "ui_startup_widget_build": 0.3,
+        }
+        assert 2.9 < phases["result_read"] < 4 and 9.9 < phases["total"] < 11
+
+        with open(os.path.join(metrics_dir, PROMETHEUS_FILE), encoding="utf-8") as f:
+            lines = set(f.read().splitlines())
+        name = "interactive_feedback_phase_seconds"
+        # 5 s falls in the le="5" bucket, 7 s only in le="10"
+        for bound, count in (("2.5", 0), ("5", 1), ("10", 1), ("+Inf", 1)):
+            assert f'{name}_bucket{{phase="think_time",start="cold",le="{bound}"}} {count}' in lines
+        for bound, count in (("5", 0), ("10", 1), ("+Inf", 1)):
+            assert f'{name}_bucket{{phase="think_time",start="warm",le="{bound}"}} {count}' in lines
+        assert f'{name}_sum{{phase="think_time",start="cold"}} 5.000000' in lines
+        assert f'{name}_count{{phase="ui_start",start="warm"}} 1' in lines
+        assert "interactive_feedback_calls_total 2" in lines
+
+if __name__ == "__main__":
+    test_record_call()
+    print("✅ metrics tests passed")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test the run_project_command tool through an in-memory MCP client
+"""
+import sys
+import os
+import json
+import asyncio
+import tempfile
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from settings_manager import SettingsManager, get_project_settings_group, get_settings_dir
+
+def save_command(settings_dir: str, project_directory: str, command: str, environment: str = ""):
+    settings = SettingsManager("InteractiveFeedbackMCP", "InteractiveFeedbackMCP", settings_dir=settings_dir)
+    with settings.beginGroup(get_project_settings_group(project_directory)):
+        settings.setValue("run_command", command)
+        settings.setValue("environment", environment)
+    settings.close()
+
+def test_run_project_command():
+    with tempfile.TemporaryDirectory() as config_dir:
+        saved_env = dict(os.environ)
+        os.environ["XDG_CONFIG_HOME"] = config_dir
+        try:
+            from fastmcp import Client
+            import server_tkinter
+
+            # The server's settings snapshot follows XDG_CONFIG_HOME once recreated
+            server_tkinter._settings_snapshot = None
+            settings_dir = get_settings_dir("InteractiveFeedbackMCP", "InteractiveFeedbackMCP")
+            projects = {}
+            for name in ("build", "hang", "unsaved"):
+                projects[name] = os.path.join(config_dir, name)
+                os.makedirs(projects[name])
+            save_command(settings_dir, projects["build"], 'echo "[$GREETING]"; exit 4', "GREETING='hello there'")
+            save_command(settings_dir, projects["hang"], "echo started; sleep 30")
+
+            async def call(client, project: str, **arguments):
+                result = await client.call_tool_mcp("run_project_command", {"project_directory": project, **arguments})
+                return result.isError, result.content[0].text
+
+            async def main():
+                async with Client(server_tkinter.mcp) as client:
+                    failed, text = await call(client, projects["build"])
+                    assert not failed, text
+                    result = json.loads(text)
+                    # The saved command ran with the project's environment overlay
+                    assert result["exit_code"] == 4 and not result["timed_out"]
+                    assert "[hello there]\n" in result["logs"]
+
+                    failed, text = await call(client, projects["hang"], timeout_seconds=0.5)
+                    result = json.loads(text)
+                    assert result["timed_out"] and result["exit_code"] is None
+                    assert "Process killed after timing out" in result["logs"]
+
+                    failed, text = await call(client, projects["unsaved"])
+                    assert failed and "No command is saved" in text
+
+            asyncio.run(main())
+        finally:
+            os.environ.clear()
+            os.environ.update(saved_env)
+
+if __name__ == "__main__":
+    test_run_project_command()
+    print("✅ run_project_command tests passed")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Tests for the scripted responder used by load tests
+"""
+import sys
+import os
+import json
+import random
+import tempfile
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from feedback_ui_scripted import ResponderScript, ScriptError, draw_latency
+
+def test_rules_and_replay():
+    script = ResponderScript({
+        "responses": ["first {call}", "second: {prompt}"],
+        "rules": [{"match": "(?i)refactor", "feedback": ["run the tests"], "latency": 0.5, "output": "ok\n"}],
+    })
+    assert script.respond("/p", "Added a feature") == (0.0, "first 1", "")
+    assert script.respond("/p", "I REFACTORED it") == (0.5, "run the tests", "ok\n")
+    assert script.respond("/p", "Fixed a bug") == (0.0, "second: Fixed a bug", "")
+    # Replies cycle once the list is used up
+    assert script.respond("/p", "More")[1] == "first 4"
+
+def test_latency_distributions():
+    rng = random.Random(1)
+    assert draw_latency(None, rng) == 0.0
+    assert draw_latency(2, rng) == 2.0
+    assert draw_latency({"distribution": "constant", "seconds": 1.5}, rng) == 1.5
+    assert all(1 <= draw_latency({"distribution": "uniform", "min": 1, "max": 2}, rng) <= 2 for _ in range(100))
+    # A wide normal distribution is clamped at zero
+    assert all(draw_latency({"distribution": "normal", "mean": 0, "stddev": 5}, rng) >= 0 for _ in range(100))
+    draws = sorted(draw_latency({"distribution": "lognormal", "median": 2, "sigma": 0.5}, rng) for _ in range(1001))
+    assert 1.7 < draws[500] < 2.3
+    try:
+        draw_latency({"distribution": "pareto"}, rng)
+    except ScriptError:
+        pass
+    else:
+        raise AssertionError("unknown distribution was accepted")
+
+def test_load_text_and_json_scripts():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        text_path = os.path.join(tmp_dir, "replies.txt")
+        with open(text_path, "w") as f:
+            f.write("looks good\n\nship it\n")
+        script = ResponderScript.load(text_path)
+        assert [script.respond("/p", "x")[1] for _ in range(3)] == ["looks good", "ship it", "looks good"]
+
+        json_path = os.path.join(tmp_dir, "rules.json")
+        with open(json_path, "w") as f:
+            json.dump({"seed": 7, "order": "random", "responses": ["a", "b"], "latency": {"distribution": "exponential", "mean": 1}}, f)
+        first = [ResponderScript.load(json_path).respond("/p", "x") for _ in range(2)]
+        # The same seed replays the same replies and delays
+        assert first[0] == first[1]
+
+if __name__ == "__main__":
+    test_rules_and_replay()
+    test_latency_distributions()
+    test_load_text_and_json_scripts()
+    print("✅ scripted responder tests passed")
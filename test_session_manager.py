@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Tests for queueing and limiting feedback sessions
+"""
+import sys
+import os
+import asyncio
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from session_manager import SessionManager, SessionQueueFull
+
+async def hold(manager: SessionManager, name: str, started: list, release: asyncio.Event):
+    async with manager.session(f"/{name}", name) as session:
+        started.append((name, session))
+        await release.wait()
+
+def test_queue_and_limits():
+    async def main():
+        manager = SessionManager(max_sessions=1, max_queued=1)
+        started = []
+        release_a, release_b = asyncio.Event(), asyncio.Event()
+        a = asyncio.create_task(hold(manager, "a", started, release_a))
+        await asyncio.sleep(0)
+        b = asyncio.create_task(hold(manager, "b", started, release_b))
+        await asyncio.sleep(0.05)
+        # b waits behind a
+        assert [name for name, _ in started] == ["a"]
+        status = manager.status()
+        assert (status["active_sessions"], status["queue_depth"]) == (1, 1)
+        assert [s["state"] for s in status["sessions"]] == ["active", "queued"]
+
+        # The queue is full
+        try:
+            async with manager.session("/c", "c"):
+                pass
+        except SessionQueueFull:
+            pass
+        else:
+            raise AssertionError("a request past the queue limit was accepted")
+
+        release_a.set()
+        await a
+        await asyncio.sleep(0)
+        assert [name for name, _ in started] == ["a", "b"]
+        # b's wait ended when a released its slot
+        assert 0.05 <= started[1][1].wait_seconds < 1
+        status = manager.status()
+        assert (status["active_sessions"], status["queue_depth"]) == (1, 0)
+        assert status["last_wait_seconds"] >= 0.05
+        release_b.set()
+        await b
+        assert manager.status()["active_sessions"] == 0
+
+    asyncio.run(main())
+
+def test_cancelled_calls_free_their_slot():
+    async def main():
+        manager = SessionManager(max_sessions=1)
+        started = []
+        release = asyncio.Event()
+        active = asyncio.create_task(hold(manager, "active", started, release))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(hold(manager, "queued", started, release))
+        await asyncio.sleep(0.01)
+
+        # A cancelled call leaves the queue...
+        queued.cancel()
+        await asyncio.gather(queued, return_exceptions=True)
+        assert manager.status()["queue_depth"] == 0
+        # ...and an active one gives its slot to the next call
+        active.cancel()
+        await asyncio.gather(active, return_exceptions=True)
+        assert manager.status()["active_sessions"] == 0
+        async with manager.session("/next", "next") as session:
+            assert session.wait_seconds < 0.5
+
+    asyncio.run(main())
+
+if __name__ == "__main__":
+    test_queue_and_limits()
+    test_cancelled_calls_free_their_slot()
+    print("✅ session manager tests passed")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Stress test: several processes hammer SettingsManager.setValue on a shared
+settings directory and no update may be lost, not even to a failed write
+"""
+import sys
+import os
+import tempfile
+import multiprocessing
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import settings_manager
+from settings_manager import SettingsManager
+
+PROCESSES = 6
+UPDATES = 200
+SHARED_GROUP = "shared_project"
+
+def hammer(settings_dir: str, worker: int):
+    # A tiny delay makes the processes flush often and overlap
+    settings = SettingsManager("Test", "Test", save_delay=0.001, settings_dir=settings_dir)
+    for i in range(UPDATES):
+        # Every process writes its own keys in a shared group...
+        with settings.beginGroup(SHARED_GROUP):
+            settings.setValue(f"worker{worker}_key{i}", i)
+            settings.setValue(f"worker{worker}_last", i)
+        # ...and in a group of its own
+        with settings.beginGroup(f"project_{worker}"):
+            settings.setValue("run_command", f"make {i}")
+        if i % 10 == 0:
+            settings.flush()
+    settings.close()
+
+def test_concurrent_set_value():
+    with tempfile.TemporaryDirectory() as settings_dir:
+        processes = [
+            multiprocessing.Process(target=hammer, args=(settings_dir, worker))
+            for worker in range(PROCESSES)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(timeout=120)
+            assert process.exitcode == 0, f"worker exited with {process.exitcode}"
+
+        settings = SettingsManager("Test", "Test", settings_dir=settings_dir)
+        with settings.beginGroup(SHARED_GROUP):
+            for worker in range(PROCESSES):
+                assert settings.value(f"worker{worker}_last") == UPDATES - 1
+                missing = [i for i in range(UPDATES) if settings.value(f"worker{worker}_key{i}") != i]
+                assert not missing, f"worker {worker} lost {len(missing)} updates"
+        for worker in range(PROCESSES):
+            with settings.beginGroup(f"project_{worker}"):
+                assert settings.value("run_command") == f"make {UPDATES - 1}"
+        settings.close()
+
+def test_failed_write_is_retried():
+    with tempfile.TemporaryDirectory() as settings_dir:
+        settings = SettingsManager("Test", "Test", settings_dir=settings_dir)
+        with settings.beginGroup("project"):
+            settings.setValue("run_command", "make")
+
+        def disk_full(path, data):
+            raise OSError(28, "No space left on device")
+
+        write = settings_manager._write_json_atomic
+        settings_manager._write_json_atomic = disk_full
+        try:
+            settings.flush()
+        finally:
+            settings_manager._write_json_atomic = write
+        # The change wasn't written, so the next flush writes it
+        settings.flush()
+        settings.close()
+
+        settings = SettingsManager("Test", "Test", settings_dir=settings_dir)
+        with settings.beginGroup("project"):
+            assert settings.value("run_command") == "make"
+        settings.close()
+
+if __name__ == "__main__":
+    test_concurrent_set_value()
+    test_failed_write_is_retried()
+    print(f"✅ {PROCESSES} processes x {UPDATES} updates, nothing lost")
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Test that garbage collection keeps projects the server still resolves
+"""
+import sys
+import os
+import json
+import tempfile
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from settings_manager import SettingsManager, SettingsSnapshot, get_project_settings_group
+
+def test_resolved_projects_are_kept():
+    with tempfile.TemporaryDirectory() as settings_dir:
+        used = get_project_settings_group("/work/used")
+        unused = get_project_settings_group("/work/unused")
+        settings = SettingsManager("Test", "Test", settings_dir=settings_dir)
+        for group in (used, unused):
+            with settings.beginGroup(group):
+                settings.setValue("run_command", "make")
+        settings.flush()
+
+        # Both were last saved long ago
+        index_file = os.path.join(settings_dir, "index.json")
+        with open(index_file, encoding="utf-8") as f:
+            index = json.load(f)
+        for group in (used, unused):
+            index[group]["last_used"] -= 365 * 24 * 60 * 60
+        with open(index_file, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+
+        # A window that is only submitted never saves, but the server resolves its project
+        snapshot = SettingsSnapshot("Test", "Test", settings_dir=settings_dir)
+        assert snapshot.project_settings("/work/used")["run_command"] == "make"
+
+        collector = SettingsManager("Test", "Test", settings_dir=settings_dir)
+        assert collector.collect_garbage(max_age_days=180) == [unused]
+        assert os.path.exists(os.path.join(settings_dir, "groups", used + ".json"))
+        settings.close()
+        collector.close()
+
+if __name__ == "__main__":
+    test_resolved_projects_are_kept()
+    print("✅ settings garbage collection tests passed")
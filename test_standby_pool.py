@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests for the standby pool, with scripted responders instead of windows
+"""
+import sys
+import os
+import json
+import asyncio
+import tempfile
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from standby_pool import StandbyPool
+from ui_worker import UIWorker
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def responder_factory(script_path: str):
+    return lambda: UIWorker([
+        sys.executable, "-u", os.path.join(SCRIPT_DIR, "feedback_ui_scripted.py"),
+        "--worker", "--script", script_path,
+    ])
+
+async def wait_until(condition, timeout: float = 30.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.02)
+
+def run_with_pool(test, **limits):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        script_path = os.path.join(tmp_dir, "script.json")
+        with open(script_path, "w") as f:
+            json.dump({"responses": ["ok"]}, f)
+
+        async def main():
+            pool = StandbyPool(responder_factory(script_path), **limits)
+            try:
+                await test(pool)
+            finally:
+                await pool.close()
+                pool.kill_all()
+
+        asyncio.run(main())
+
+def test_cold_then_warm_acquire():
+    async def test(pool: StandbyPool):
+        # Nothing is started up front: the first call is a cold start
+        worker, warm = await pool.acquire()
+        assert not warm and pool.cold_starts == 1
+        assert (await worker.request("/p", "first"))["interactive_feedback"] == "ok"
+        # Releasing the cold worker fills the pool
+        pool.release(worker)
+        await wait_until(lambda: pool.status()["standby"] == 1)
+
+        worker, warm = await pool.acquire()
+        assert warm and pool.warm_hits == 1
+        # A replacement is started right away
+        assert pool.status()["starting"] == 1
+        assert (await worker.request("/p", "second"))["interactive_feedback"] == "ok"
+        pool.release(worker)
+        await wait_until(lambda: pool.status()["standby"] == 1 and pool.status()["starting"] == 0)
+
+    run_with_pool(test, size=1)
+
+def test_idle_processes_expire():
+    async def test(pool: StandbyPool):
+        # A cold call fills the pool once it is done
+        pool.release((await pool.acquire())[0])
+        await wait_until(lambda: pool.status()["standby"] == 1)
+        process = pool._standby[0][0].process
+        # Expired after idle_seconds, and not replaced until the next call
+        await wait_until(lambda: pool.status()["standby"] == 0)
+        assert await asyncio.wait_for(process.wait(), 5) != 0
+        assert pool.status()["starting"] == 0
+
+    run_with_pool(test, size=1, idle_seconds=0.5)
+
+def test_kill_all():
+    async def test(pool: StandbyPool):
+        pool.release((await pool.acquire())[0])
+        await wait_until(lambda: pool.status()["standby"] == 2)
+        processes = [worker.process for worker, _ in pool._standby]
+        pool.kill_all()
+        assert pool.status()["standby"] == 0
+        for process in processes:
+            assert await asyncio.wait_for(process.wait(), 5) != 0
+
+    run_with_pool(test, size=2)
+
+if __name__ == "__main__":
+    test_cold_then_warm_acquire()
+    test_idle_processes_expire()
+    test_kill_all()
+    print("✅ standby pool tests passed")
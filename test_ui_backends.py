@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests for UI backend detection and its cache, with stand-in interpreters
+"""
+import sys
+import os
+import asyncio
+import tempfile
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ui_backends import RETRY_SECONDS, UIBackends
+
+def fake_python(tmp_dir: str, exit_code: int) -> tuple[str, str]:
+    """An interpreter that logs each probe and exits with exit_code"""
+    path = os.path.join(tmp_dir, f"python{exit_code}")
+    probes = path + ".probes"
+    with open(path, "w") as f:
+        f.write(f"#!/bin/sh\necho probe >> {probes}\necho 'no display name' >&2\nexit {exit_code}\n")
+    os.chmod(path, 0o755)
+    return path, probes
+
+def probe_count(probes: str) -> int:
+    if not os.path.exists(probes):
+        return 0
+    with open(probes) as f:
+        return len(f.readlines())
+
+def with_display(test, display):
+    saved_env = dict(os.environ)
+    os.environ.pop("WAYLAND_DISPLAY", None)
+    if display is None:
+        os.environ.pop("DISPLAY", None)
+    else:
+        os.environ["DISPLAY"] = display
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            test(tmp_dir)
+    finally:
+        os.environ.clear()
+        os.environ.update(saved_env)
+
+def test_cache_hit():
+    if sys.platform in ("win32", "darwin"):
+        return
+
+    def test(tmp_dir):
+        backends = UIBackends(["tkinter", "fallback"])
+        backends.python, probes = fake_python(tmp_dir, 0)
+        assert backends.select_now() == "tkinter"
+        assert backends.select_now() == "tkinter"
+        assert asyncio.run(backends.select()) == "tkinter"
+        assert probe_count(probes) == 1
+        # Another display is another answer
+        os.environ["DISPLAY"] = ":1"
+        assert backends.select_now() == "tkinter"
+        assert probe_count(probes) == 2
+
+    with_display(test, ":0")
+
+def test_failed_backend_is_revalidated():
+    if sys.platform in ("win32", "darwin"):
+        return
+
+    def test(tmp_dir):
+        backends = UIBackends(["tkinter", "fallback"])
+        backends.python, probes = fake_python(tmp_dir, 0)
+        assert backends.select_now() == "tkinter"
+        # A launch failed: use the fallback without probing again...
+        backends.mark_failed("tkinter", "window crashed")
+        assert asyncio.run(backends.select()) == "fallback"
+        assert backends.describe()["backends"]["tkinter"] == {"available": False, "reason": "window crashed"}
+        assert probe_count(probes) == 1
+        # ...until RETRY_SECONDS later
+        backends._status["tkinter"].checked_at -= RETRY_SECONDS + 1
+        assert asyncio.run(backends.select()) == "tkinter"
+        assert probe_count(probes) == 2
+
+    with_display(test, ":0")
+
+def test_text_fallback():
+    if sys.platform in ("win32", "darwin"):
+        return
+
+    def broken_tkinter(tmp_dir):
+        backends = UIBackends(["tkinter", "fallback"])
+        backends.python, probes = fake_python(tmp_dir, 1)
+        assert backends.select_now() == "fallback"
+        assert backends.describe()["backends"]["tkinter"]["reason"] == "no display name"
+        # The failure is cached too
+        assert backends.select_now() == "fallback"
+        assert probe_count(probes) == 1
+
+    def no_display(tmp_dir):
+        backends = UIBackends(["tkinter", "fallback"])
+        backends.python, probes = fake_python(tmp_dir, 0)
+        # Without a display tkinter isn't even probed
+        assert asyncio.run(backends.select()) == "fallback"
+        assert probe_count(probes) == 0
+
+    with_display(broken_tkinter, ":0")
+    with_display(no_display, None)
+
+if __name__ == "__main__":
+    test_cache_hit()
+    test_failed_backend_is_revalidated()
+    test_text_fallback()
+    print("✅ UI backend tests passed")
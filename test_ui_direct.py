@@ -14,7 +14,7 @@ def test_ui():
     """Test the feedback UI directly"""
     print("🚀 Testing feedback UI directly...")
     
-    project_dir = "/Users/btk0092/Documents/mcp/interactive-feedback-mcp"
+    project_dir = os.path.dirname(os.path.abspath(__file__))
     prompt = "Test UI trực tiếp - Bạn có thể thấy cửa sổ này không?"
     
     print(f"📁 Project directory: {project_dir}")
@@ -28,7 +28,7 @@ def test_ui():
         print("\n" + "="*50)
         print("✅ UI đã đóng!")
         print(f"📝 Feedback nhận được: {result['interactive_feedback']}")
-        print(f"📋 Logs: {result['command_logs'][:200]}...")
+        print(f"📋 Logs: {result['logs'][:200]}...")
         
     except Exception as e:
         print(f"❌ Lỗi: {e}")
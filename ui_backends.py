@@ -0,0 +1,198 @@
+# UI backend detection for the tkinter server
+# Works out once which feedback UI can run on this machine, so a call goes
+# straight to a working backend instead of trying tkinter first every time
+import os
+import sys
+import time
+import shutil
+import asyncio
+import platform
+import functools
+import threading
+import subprocess
+from typing import Optional
+
+BACKENDS = ("tkinter", "fallback")
+# A backend that failed is probed again after this many seconds
+RETRY_SECONDS = 60.0
+# Starting Python, importing tkinter and opening a Tk root can be slow on a cold disk
+PROBE_TIMEOUT = 15.0
+
+PROBE_TKINTER = "import tkinter; tkinter.Tk().destroy()"
+
+def backend_order_from_env() -> list[str]:
+    """INTERACTIVE_FEEDBACK_BACKENDS: comma-separated preference order, default tkinter,fallback"""
+    order = []
+    for name in os.environ.get("INTERACTIVE_FEEDBACK_BACKENDS", ",".join(BACKENDS)).split(","):
+        name = name.strip()
+        if name in BACKENDS:
+            order.append(name)
+        elif name:
+            print(f"Unknown UI backend ignored: {name}", file=sys.stderr)
+    # The fallback can't fail, so there is always something to show
+    if "fallback" not in order:
+        order.append("fallback")
+    return order
+
+def get_system_python() -> str:
+    # Use system Python for tkinter to avoid Tcl/Tk issues
+    system_python = shutil.which("python3")
+    if not system_python:
+        system_python = "/usr/bin/python3"
+    return system_python
+
+@functools.lru_cache(maxsize=None)
+def _tcl_tk_library_env() -> tuple[tuple[str, str], ...]:
+    """TCL_LIBRARY/TK_LIBRARY for macOS, found once"""
+    if platform.system() != "Darwin":
+        return ()
+    possible_tcl_paths = [
+        '/System/Library/Frameworks/Tcl.framework/Versions/8.6/Resources/Scripts',
+        '/System/Library/Frameworks/Tcl.framework/Versions/8.5/Resources/Scripts',
+        '/usr/local/lib/tcl8.6',
+        '/opt/homebrew/lib/tcl8.6'
+    ]
+    possible_tk_paths = [
+        '/System/Library/Frameworks/Tk.framework/Versions/8.6/Resources/Scripts',
+        '/System/Library/Frameworks/Tk.framework/Versions/8.5/Resources/Scripts',
+        '/usr/local/lib/tk8.6',
+        '/opt/homebrew/lib/tk8.6'
+    ]
+    found = []
+    for tcl_path in possible_tcl_paths:
+        if os.path.exists(tcl_path):
+            found.append(('TCL_LIBRARY', tcl_path))
+            break
+    for tk_path in possible_tk_paths:
+        if os.path.exists(tk_path):
+            found.append(('TK_LIBRARY', tk_path))
+            break
+    return tuple(found)
+
+def get_tkinter_env() -> dict[str, str]:
+    # Set environment variables for Tcl/Tk
+    env = os.environ.copy()
+    env.update(_tcl_tk_library_env())
+    return env
+
+def display_key() -> Optional[tuple[Optional[str], Optional[str]]]:
+    """What a GUI would connect to, or None where there is always a display"""
+    if sys.platform in ("win32", "darwin"):
+        return None
+    return (os.environ.get("DISPLAY"), os.environ.get("WAYLAND_DISPLAY"))
+
+def has_display() -> bool:
+    key = display_key()
+    return key is None or any(key)
+
+class BackendStatus:
+    def __init__(self, available: bool, reason: str = ""):
+        self.available = available
+        self.reason = reason
+        self.checked_at = time.monotonic()
+        self.display = display_key()
+
+class UIBackends:
+    """Cached answer to "which feedback UI works here?"
+
+    The tkinter probe starts the system Python once, imports tkinter and
+    opens a Tk root; the outcome is kept. Without a display (Linux/BSD with
+    neither DISPLAY nor WAYLAND_DISPLAY) tkinter is skipped without a
+    probe. A cached result is re-validated lazily: when the display changes
+    or the interpreter disappears, and RETRY_SECONDS after a backend was
+    found broken or failed to launch.
+    """
+
+    def __init__(self, order: Optional[list[str]] = None):
+        self.order = order or backend_order_from_env()
+        self.python = get_system_python()
+        self._status: dict[str, BackendStatus] = {}
+        self._lock = threading.Lock()
+
+    def _fresh(self, backend: str) -> Optional[BackendStatus]:
+        status = self._status.get(backend)
+        if status is None or status.display != display_key():
+            return None
+        if not status.available and time.monotonic() - status.checked_at > RETRY_SECONDS:
+            return None
+        if status.available and not os.path.exists(self.python):
+            return None
+        return status
+
+    def _check(self, backend: str) -> BackendStatus:
+        if backend == "fallback":
+            return BackendStatus(True)
+        if not has_display():
+            return BackendStatus(False, "no display")
+        status = self._fresh(backend)
+        if status is not None:
+            return status
+        with self._lock:
+            # Another caller may have probed while we waited
+            status = self._fresh(backend)
+            if status is None:
+                status = self._probe_tkinter()
+                self._status[backend] = status
+            return status
+
+    def _probe_tkinter(self) -> BackendStatus:
+        if not os.path.exists(self.python):
+            self.python = get_system_python()
+        try:
+            completed = subprocess.run(
+                [self.python, "-c", PROBE_TKINTER],
+                env=get_tkinter_env(),
+                stdin=subprocess.DEVNULL,
+                capture_output=True,
+                text=True,
+                timeout=PROBE_TIMEOUT,
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            return BackendStatus(False, str(e))
+        if completed.returncode != 0:
+            lines = completed.stderr.strip().splitlines()
+            return BackendStatus(False, lines[-1] if lines else f"exit code {completed.returncode}")
+        return BackendStatus(True)
+
+    def select_now(self) -> str:
+        """First available backend in preference order; may block on a probe"""
+        for backend in self.order:
+            status = self._check(backend)
+            if status.available:
+                return backend
+        return "fallback"
+
+    async def select(self) -> str:
+        """Like select_now, but a probe runs off the event loop"""
+        for backend in self.order:
+            if backend == "fallback":
+                return backend
+            if not has_display():
+                continue
+            status = self._fresh(backend)
+            if status is None:
+                return await asyncio.to_thread(self.select_now)
+            if status.available:
+                return backend
+        return "fallback"
+
+    def mark_failed(self, backend: str, reason: str):
+        """A launch failed: skip the backend until it is re-validated"""
+        if backend != "fallback":
+            print(f"UI backend {backend} failed ({reason}), using the next one", file=sys.stderr)
+            self._status[backend] = BackendStatus(False, reason)
+
+    def prewarm(self):
+        """Run the probe in the background so the first call doesn't wait for it"""
+        threading.Thread(target=self.select_now, daemon=True).start()
+
+    def describe(self) -> dict:
+        return {
+            "order": self.order,
+            "python": self.python,
+            "display": has_display(),
+            "backends": {
+                name: {"available": status.available, "reason": status.reason}
+                for name, status in self._status.items()
+            },
+        }
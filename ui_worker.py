@@ -0,0 +1,183 @@
+# Persistent feedback UI worker
+# Keeps a single UI process alive across interactive_feedback calls so the
+# interpreter start, toolkit import and widget build are paid only once
+import sys
+import json
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+from result_channel import parse_event_line, parse_result_line
+
+# Receives the progress events a UI sends while its window is open
+EventHandler = Callable[[dict], Awaitable[None]]
+
+# Results carry the full command log on a single line
+STREAM_LIMIT = 256 * 1024 * 1024
+
+class UIWorkerError(Exception):
+    """Raised when the UI worker process dies or breaks the protocol"""
+
+class UIWorker:
+    """Client side of a long-lived feedback UI started with --worker
+
+    Requests are sent as one JSON object per line on the worker's stdin and
+    results come back as framed lines on its stdout. Only one request is in
+    flight at a time; the event loop stays free while the human is looking
+    at the window.
+    """
+
+    def __init__(self, args: list[str], env: Optional[dict[str, str]] = None):
+        self.args = args
+        self.env = env
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self._lock = asyncio.Lock()
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self):
+        """Start the worker process if it is not already running"""
+        if self.is_alive():
+            return
+        self.process = await asyncio.create_subprocess_exec(
+            *self.args,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            close_fds=True,
+            env=self.env,
+            limit=STREAM_LIMIT,
+        )
+
+    async def wait_ready(self, timeout: float = 60.0) -> bool:
+        """Start the worker and wait until it reports that it is ready for requests"""
+        await self.start()
+        try:
+            while True:
+                line = await asyncio.wait_for(self.process.stdout.readline(), timeout)
+                if not line:
+                    return False
+                event = parse_event_line(line.decode("utf-8", errors="replace"))
+                if event is not None and event.get("type") == "ready":
+                    return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def request(
+        self,
+        project_directory: str,
+        prompt: str,
+        project_settings: Optional[dict] = None,
+        on_event: Optional[EventHandler] = None,
+    ) -> dict:
+        """Show the worker's window for one request and wait for the result"""
+        async with self._lock:
+            await self.start()
+            process = self.process
+            request = {"project_directory": project_directory, "prompt": prompt}
+            if project_settings is not None:
+                request["project_settings"] = project_settings
+            message = json.dumps(request)
+            try:
+                process.stdin.write(message.encode("utf-8") + b"\n")
+                await process.stdin.drain()
+                result = None
+                while result is None:
+                    line = await process.stdout.readline()
+                    if not line:
+                        break
+                    text = line.decode("utf-8")
+                    event = parse_event_line(text)
+                    if event is not None:
+                        if on_event is not None:
+                            await on_event(event)
+                        continue
+                    result = parse_result_line(text)
+            except asyncio.CancelledError:
+                # The MCP request was cancelled: take the window down with it
+                self.kill()
+                raise
+            except (OSError, ValueError) as e:
+                # JSONDecodeError is a ValueError too
+                self.kill()
+                raise UIWorkerError(f"Feedback UI worker protocol failed: {e}") from e
+
+            if result is None:
+                exit_code = await process.wait()
+                self.process = None
+                raise UIWorkerError(f"Feedback UI worker exited with code {exit_code}")
+            return result
+
+    def kill(self):
+        """Kill the worker immediately; the next request starts a new one"""
+        process, self.process = self.process, None
+        if process is not None and process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+
+    async def stop(self, timeout: float = 2.0):
+        """Ask the worker to exit by closing its stdin, killing it if needed"""
+        process = self.process
+        if process is None:
+            return
+        process.stdin.close()
+        try:
+            await asyncio.wait_for(process.wait(), timeout)
+        except asyncio.TimeoutError:
+            self.kill()
+        self.process = None
+
+def read_requests(stream=None):
+    """Worker side: yield requests read from stdin until the server goes away"""
+    stream = stream or sys.stdin
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+async def _read_stdout_events(stdout: asyncio.StreamReader, on_event: EventHandler) -> bytes:
+    """Hand progress events to on_event as they arrive, return everything else"""
+    output = []
+    while line := await stdout.readline():
+        event = parse_event_line(line.decode("utf-8", errors="replace"))
+        if event is None:
+            output.append(line)
+        else:
+            await on_event(event)
+    return b"".join(output)
+
+async def run_ui_process(
+    args: list[str],
+    env: Optional[dict[str, str]] = None,
+    on_event: Optional[EventHandler] = None,
+) -> tuple[int, str, str]:
+    """Run a one-shot UI process without blocking the event loop"""
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        stdin=asyncio.subprocess.DEVNULL,
+        close_fds=True,
+        env=env,
+        limit=STREAM_LIMIT,
+    )
+    try:
+        if on_event is None:
+            stdout, stderr = await process.communicate()
+        else:
+            stdout, stderr = await asyncio.gather(
+                _read_stdout_events(process.stdout, on_event),
+                process.stderr.read(),
+            )
+            await process.wait()
+    except asyncio.CancelledError:
+        # The MCP request was cancelled: close the window with it
+        process.kill()
+        raise
+    return (
+        process.returncode,
+        stdout.decode("utf-8", errors="replace"),
+        stderr.decode("utf-8", errors="replace"),
+    )